@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Compare sequential and concurrent key vault lookups
+against a fake SecretClient with an artificial latency.
+
+    PYTHONPATH=. python benchmarks/bench_concurrent_fetch.py --fields 40 --latency 0.05
+"""
+
+import argparse
+import time
+
+from fake_vault import FakeVaultClient, make_settings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--fields", type=int, default=40)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8, 16])
+    args = parser.parse_args()
+
+    secrets = {f"field{i}": f"value{i}" for i in range(args.fields)}
+    fields = {name: [name] for name in secrets}
+    print(f"fields={args.fields} latency={args.latency * 1000:.0f}ms")
+    for max_workers in args.workers:
+        client = FakeVaultClient(secrets, args.latency)
+        settings_cls = make_settings(
+            fields, client, azure_keyvault_max_workers=max_workers
+        )
+        started = time.perf_counter()
+        settings = settings_cls()
+        elapsed = time.perf_counter() - started
+        assert settings.dict() == secrets
+        print(
+            f"max_workers={max_workers:<3} calls={client.calls:<4} "
+            f"elapsed={elapsed:.3f}s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Measure the construction of settings classes with 1 to 500 fields in every
+loading mode against a fake key vault with a configurable round-trip time,
+jitter, ratio of missing secrets (404) and ratio of throttled requests (429).
+
+For every mode and number of fields it reports the median and the maximum
+construction time, the time to access all the fields afterwards (only
+significant for the lazy mode), the key vault requests, the 404 and 429
+responses and the peak memory allocated during one construction.
+
+A `--resolved-ratio` part of the fields is passed to the constructor in every
+mode, the skip-resolved mode doesn't fetch them. The aload mode constructs
+the settings with `aload()` and the asyncio client, the file-backend mode
+reads the secrets from a `FileBackend` instead of the key vault.
+
+    PYTHONPATH=. python benchmarks/bench_construction.py --fields 1 10 100 500
+    PYTHONPATH=. python benchmarks/bench_construction.py --throttle-ratio 0.05 --json
+
+With `--scheduler` every mode uses a `VaultScheduler`, which retries the
+throttled requests instead of failing the construction.
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import statistics
+import tempfile
+import time
+import tracemalloc
+from functools import partial
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Type
+
+from fake_vault import VAULT_URL, FakeVaultClient, make_settings
+
+from pydantic_azure_secrets import (
+    AzureVaultSettings,
+    FileBackend,
+    SecretCache,
+    SecretSnapshot,
+    VaultScheduler,
+)
+
+
+def modes(
+    args: argparse.Namespace, tmp_dir: Path
+) -> Dict[str, Callable[[Dict[str, str]], Dict[str, Any]]]:
+    """
+    Config options per mode, as factories of the secrets of the key vault
+    so that every run gets its own cache, snapshot and backend.
+    """
+    run_ids = itertools.count()
+
+    def file_backend(secrets: Dict[str, str]) -> Dict[str, Any]:
+        path = tmp_dir / f"backend-{next(run_ids)}.json"
+        FileBackend.write(path, VAULT_URL, secrets)
+        backend = FileBackend(VAULT_URL, path)
+        return {"get_azure_backend": classmethod(lambda cls, vault_url: backend)}
+
+    return {
+        "sequential": lambda secrets: {},
+        "threads": lambda secrets: {"azure_keyvault_max_workers": args.workers},
+        "skip-resolved": lambda secrets: {
+            "azure_keyvault_max_workers": args.workers,
+            "azure_keyvault_skip_resolved": True,
+        },
+        "list": lambda secrets: {
+            "azure_keyvault_max_workers": args.workers,
+            "azure_keyvault_list_secrets": True,
+        },
+        "aload": lambda secrets: {"azure_keyvault_max_workers": args.workers},
+        "lazy": lambda secrets: {
+            "azure_keyvault_max_workers": args.workers,
+            "azure_keyvault_lazy": True,
+        },
+        "cache": lambda secrets: {
+            "azure_keyvault_max_workers": args.workers,
+            "azure_keyvault_cache": SecretCache(maxsize=2048),
+        },
+        "snapshot": lambda secrets: {
+            "azure_keyvault_max_workers": args.workers,
+            "azure_keyvault_snapshot": SecretSnapshot(
+                tmp_dir / f"snapshot-{next(run_ids)}",
+                SecretSnapshot.generate_key(),
+                background_refresh=False,
+            ),
+        },
+        "file-backend": file_backend,
+    }
+
+
+# Modes which are measured after a first construction fills them
+WARM_MODES = {"cache", "snapshot"}
+# Modes which construct the settings with `aload()`
+ASYNC_MODES = {"aload"}
+
+
+def aload(settings_cls: Type[AzureVaultSettings], **values: Any) -> AzureVaultSettings:
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(settings_cls.aload(**values))
+    finally:
+        loop.close()
+
+
+def bench(
+    args: argparse.Namespace,
+    mode: str,
+    make_config: Callable[[Dict[str, str]], Dict[str, Any]],
+    n_fields: int,
+) -> Dict[str, Any]:
+    n_found = n_fields - round(n_fields * args.not_found_ratio)
+    fields = {f"field{i}": [f"field{i}"] for i in range(n_fields)}
+    secrets = {f"field{i}": f"value{i}" for i in range(n_found)}
+    resolved = {
+        f"field{i}": f"init{i}" for i in range(round(n_fields * args.resolved_ratio))
+    }
+    config = make_config(secrets)
+    client = FakeVaultClient(
+        secrets,
+        latency=args.rtt,
+        jitter=args.jitter,
+        throttle_ratio=args.throttle_ratio,
+        retry_after=args.retry_after,
+        seed=args.seed,
+    )
+    if args.scheduler:
+        config["azure_keyvault_scheduler"] = VaultScheduler(
+            rate=args.rate, backoff=args.retry_after
+        )
+    settings_cls = make_settings(fields, client, **config)
+    construct: Callable[[], AzureVaultSettings] = partial(settings_cls, **resolved)
+    if mode in ASYNC_MODES:
+        construct = partial(aload, settings_cls, **resolved)
+    result: Dict[str, Any] = {"mode": mode, "fields": n_fields}
+
+    try:
+        if mode in WARM_MODES:
+            construct()
+        client.calls = client.not_found = client.throttled = 0
+
+        timings: List[float] = []
+        access_timings: List[float] = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            settings = construct()
+            timings.append(time.perf_counter() - started)
+            started = time.perf_counter()
+            settings.dict()
+            access_timings.append(time.perf_counter() - started)
+
+        calls = {
+            "calls": client.calls / args.repeat,
+            "404s": client.not_found / args.repeat,
+            "429s": client.throttled / args.repeat,
+        }
+        tracemalloc.start()
+        construct().dict()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    except Exception as e:  # pylint: disable=broad-except
+        result["error"] = f"{e.__class__.__name__}: {e}"
+        return result
+
+    result.update(
+        median=statistics.median(timings),
+        max=max(timings),
+        access=statistics.median(access_timings),
+        peak_kib=peak / 1024,
+        **calls,
+    )
+    return result
+
+
+def print_result(result: Dict[str, Any]) -> None:
+    prefix = f"{result['mode']:<13} {result['fields']:>6}"
+    if "error" in result:
+        print(f"{prefix}  failed: {result['error']}")
+        return
+    print(
+        f"{prefix} {result['median'] * 1000:>10.1f} {result['max'] * 1000:>10.1f} "
+        f"{result['access'] * 1000:>10.1f} {result['calls']:>7.0f} "
+        f"{result['404s']:>6.0f} {result['429s']:>6.0f} {result['peak_kib']:>9.0f}"
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--fields", type=int, nargs="+", default=[1, 10, 100, 500])
+    parser.add_argument("--modes", nargs="+", help="default: all the modes")
+    parser.add_argument("--rtt", type=float, default=0.005, help="seconds")
+    parser.add_argument("--jitter", type=float, default=0.002, help="seconds")
+    parser.add_argument("--not-found-ratio", type=float, default=0.2)
+    parser.add_argument("--resolved-ratio", type=float, default=0.2)
+    parser.add_argument("--throttle-ratio", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=float, default=1.0, help="seconds")
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--scheduler", action="store_true")
+    parser.add_argument("--rate", type=float, default=100.0, help="per second")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="print JSON lines")
+    args = parser.parse_args(argv)
+    # "not found" warnings of the 404 ratio
+    logging.getLogger("pydantic_azure_secrets").setLevel(logging.ERROR)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        all_modes = modes(args, Path(tmp_dir))
+        selected = args.modes or list(all_modes)
+        if not args.json:
+            print(
+                f"rtt={args.rtt * 1000:.1f}ms jitter={args.jitter * 1000:.1f}ms "
+                f"404 ratio={args.not_found_ratio:.0%} "
+                f"resolved ratio={args.resolved_ratio:.0%} "
+                f"429 ratio={args.throttle_ratio:.0%} repeat={args.repeat}"
+            )
+            print(
+                f"{'mode':<13} {'fields':>6} {'median ms':>10} {'max ms':>10} "
+                f"{'access ms':>10} {'calls':>7} {'404s':>6} {'429s':>6} "
+                f"{'peak KiB':>9}"
+            )
+        for mode in selected:
+            for n_fields in args.fields:
+                result = bench(args, mode, all_modes[mode], n_fields)
+                if args.json:
+                    print(json.dumps(result))
+                else:
+                    print_result(result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Measure the import time of pydantic_azure_secrets with `python -X importtime`
+in fresh interpreters, and check that the azure SDK and the slow standard
+modules (asyncio, threads pools, HTTP) are not imported until they are used.
+
+It reports the median cumulative import time of the package, of pydantic
+alone for reference, and the slowest modules imported by the package.
+The exit code is 1 when the median is over `--budget` milliseconds
+(60 by default) or when one of these modules is imported.
+
+    PYTHONPATH=. python benchmarks/bench_import.py --budget 60
+"""
+
+import argparse
+import re
+import statistics
+import subprocess
+import sys
+from typing import Dict, List
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+DEFAULT_BUDGET = 60.0
+# imported on the first use only
+DEFERRED_MODULES = (
+    "azure",
+    "asyncio",
+    "concurrent.futures",
+    "http.client",
+    "http.server",
+    "socketserver",
+    "urllib.request",
+)
+
+
+def import_times(module: str) -> Dict[str, int]:
+    """
+    Cumulative import time of every module imported by `module`, in µs.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            times[match.group(4)] = int(match.group(2))
+    return times
+
+
+def median_ms(runs: List[Dict[str, int]], module: str) -> float:
+    return statistics.median(run[module] for run in runs) / 1000
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument(
+        "--budget",
+        type=float,
+        default=DEFAULT_BUDGET,
+        help=f"maximum median import time, in ms ({DEFAULT_BUDGET:.0f})",
+    )
+    args = parser.parse_args()
+
+    package = "pydantic_azure_secrets"
+    runs = [import_times(package) for _ in range(args.runs)]
+    reference = [import_times("pydantic") for _ in range(args.runs)]
+
+    elapsed = median_ms(runs, package)
+    print(f"{package}: {elapsed:.1f}ms (median of {args.runs} runs)")
+    print(f"pydantic: {median_ms(reference, 'pydantic'):.1f}ms")
+
+    # the modules imported at the startup of the interpreter, e.g. by site
+    startup = import_times("sys")
+    print(f"slowest modules imported by {package}:")
+    slowest = sorted(
+        (item for item in runs[-1].items() if item[0] not in {package, *startup}),
+        key=lambda item: item[1],
+        reverse=True,
+    )
+    for module, cumulative in slowest[: args.top]:
+        print(f"  {module}: {cumulative / 1000:.1f}ms")
+
+    failed = False
+    deferred = sorted(
+        module
+        for module in runs[-1]
+        if module not in startup
+        and any(
+            module == prefix or module.startswith(f"{prefix}.")
+            for prefix in DEFERRED_MODULES
+        )
+    )
+    if deferred:
+        print(f"imported before their first use: {', '.join(deferred[:5])}")
+        failed = True
+    if elapsed > args.budget:
+        print(f"over the budget of {args.budget:.0f}ms")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Measure the memory used by the construction of settings with one large
+secret, e.g. a certificate bundle, as a `SecretStr` field and as
+a `SecretFile` field, for several secret sizes.
+
+Every measurement runs in a fresh interpreter. The settings are
+constructed twice and both instances are kept, like `SettingsRefresher`
+which keeps the current settings until the new ones are validated. It
+reports the increase of the peak RSS during the constructions and of the
+RSS retained afterwards. The fake key vault decodes a JSON response body
+on every request, like the SDK.
+
+    PYTHONPATH=. python benchmarks/bench_large_secret.py --sizes 1 8 32 128
+"""
+
+import argparse
+import gc
+import json
+import os
+import resource
+import subprocess
+import sys
+from typing import Any, Dict, Optional
+
+from azure.keyvault.secrets import KeyVaultSecret, SecretProperties
+from fake_vault import VAULT_URL
+from pydantic import SecretStr
+
+from pydantic_azure_secrets import AzureVaultSettings, SecretFile
+
+MODES = {"str": SecretStr, "file": SecretFile}
+NAME = "bundle"
+MB = 1 << 20
+
+
+class BodyVaultClient:
+    """
+    Stand-in for SecretClient which holds the HTTP response body of every
+    secret and decodes it on every request.
+    """
+
+    def __init__(self, bodies: Dict[str, bytearray]) -> None:
+        self.vault_url = VAULT_URL
+        self.bodies = bodies
+
+    def get_secret(self, name: str, **kwargs: Any) -> KeyVaultSecret:
+        value = json.loads(self.bodies[name])["value"]
+        properties = SecretProperties(None, f"{VAULT_URL}secrets/{name}/version1")
+        return KeyVaultSecret(properties, value)
+
+
+def make_body(size: int) -> bytearray:
+    # built by chunks, so that the baseline peak RSS is not doubled
+    body = bytearray(b'{"value": "')
+    for start in range(0, size, MB):
+        body.extend(b"x" * min(MB, size - start))
+    body.extend(b'"}')
+    return body
+
+
+def make_settings(mode: str, client: BodyVaultClient) -> Any:
+    class Config:
+        azure_keyvault = VAULT_URL
+
+        @classmethod
+        def get_azure_client(cls, azure_keyvault: Optional[str]) -> Any:
+            return client
+
+    namespace = {"__annotations__": {NAME: MODES[mode]}, "Config": Config}
+    return type("LargeSecretSettings", (AzureVaultSettings,), namespace)
+
+
+def current_rss() -> int:
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def peak_rss() -> int:
+    # kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def measure(mode: str, size: int) -> Dict[str, float]:
+    client = BodyVaultClient({NAME: make_body(16)})
+    settings_cls = make_settings(mode, client)
+    settings_cls()  # warm up
+    client.bodies[NAME] = make_body(size)
+
+    gc.collect()
+    rss, peak = current_rss(), peak_rss()
+    kept = [settings_cls(), settings_cls()]
+    gc.collect()
+    assert len(kept) == 2
+    return {
+        "peak_increase": (peak_rss() - peak) / MB,
+        "retained": (current_rss() - rss) / MB,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=float, nargs="+", default=[1, 8, 32, 128])
+    parser.add_argument("--modes", nargs="+", default=list(MODES), choices=MODES)
+    parser.add_argument("--json", action="store_true")
+    parser.add_argument("--child", nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        mode, size = args.child
+        print(json.dumps(measure(mode, int(size))))
+        return
+
+    if not args.json:
+        print(f"{'size MB':>8} {'mode':>5} {'peak +MB':>9} {'retained MB':>12}")
+    for size_mb in args.sizes:
+        for mode in args.modes:
+            result = subprocess.run(
+                [sys.executable, __file__, "--child", mode, str(int(size_mb * MB))],
+                stdout=subprocess.PIPE,
+                universal_newlines=True,
+                check=True,
+            )
+            measurement = json.loads(result.stdout)
+            if args.json:
+                print(json.dumps({"size_mb": size_mb, "mode": mode, **measurement}))
+            else:
+                print(
+                    f"{size_mb:>8g} {mode:>5} {measurement['peak_increase']:>9.1f} "
+                    f"{measurement['retained']:>12.1f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
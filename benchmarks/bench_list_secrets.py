@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Compare probing every `env` name with get_secret against listing
+the secret names once (`azure_keyvault_list_secrets`) on a fake key vault
+where most of the probed names do not exist.
+
+    PYTHONPATH=. python benchmarks/bench_list_secrets.py --fields 40 --names 4
+"""
+
+import argparse
+import time
+
+from fake_vault import FakeVaultClient, make_settings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--fields", type=int, default=40)
+    parser.add_argument(
+        "--names", type=int, default=4, help="env names per field, one exists"
+    )
+    parser.add_argument(
+        "--unrelated", type=int, default=100, help="other secrets in the vault"
+    )
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+
+    fields = {
+        f"field{i}": [f"variant{n}_field{i}" for n in range(args.names)]
+        for i in range(args.fields)
+    }
+    secrets = {f"variant0-field{i}": f"value{i}" for i in range(args.fields)}
+    secrets.update({f"unrelated-{i}": "value" for i in range(args.unrelated)})
+    miss_ratio = 1 - 1 / args.names
+    print(
+        f"fields={args.fields} names/field={args.names} "
+        f"miss ratio={miss_ratio:.0%} vault size={len(secrets)} "
+        f"latency={args.latency * 1000:.0f}ms"
+    )
+
+    for list_secrets in (False, True):
+        for max_workers in (None, args.workers):
+            client = FakeVaultClient(secrets, args.latency)
+            settings_cls = make_settings(
+                fields,
+                client,
+                azure_keyvault_list_secrets=list_secrets,
+                azure_keyvault_max_workers=max_workers,
+            )
+            started = time.perf_counter()
+            settings = settings_cls()
+            elapsed = time.perf_counter() - started
+            assert settings.field0 == "value0"
+            print(
+                f"{'list' if list_secrets else 'probe':<5} "
+                f"max_workers={max_workers or 1:<3} calls={client.calls:<4} "
+                f"404s={client.not_found:<4} elapsed={elapsed:.3f}s"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""
+Fake key vault clients for the benchmarks
+"""
+
+import asyncio
+import random
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple, Type
+
+from azure.core.exceptions import HttpResponseError, ResourceNotFoundError
+from azure.keyvault.secrets import KeyVaultSecret, SecretProperties
+
+from pydantic_azure_secrets import AzureVaultSettings
+
+VAULT_URL = "https://benchmark.vault.azure.net/"
+
+
+class ThrottledResponse:
+    """
+    The parts of an HTTP response read by HttpResponseError.
+    """
+
+    status_code = 429
+    reason = "Too Many Requests"
+    request: Any = None
+
+    def __init__(self, retry_after: float) -> None:
+        self.headers = {"Retry-After": str(retry_after)}
+
+    def text(self) -> str:
+        return ""
+
+
+class FakeVaultClient:
+    """
+    Thread-safe stand-in for SecretClient which sleeps `latency` seconds
+    (plus a random `jitter`) per request and counts the requests.
+    A `throttle_ratio` part of the requests fails with 429 Too Many Requests
+    after the same latency, asking to retry after `retry_after` seconds.
+    """
+
+    def __init__(
+        self,
+        secrets: Dict[str, str],
+        latency: float = 0.0,
+        page_size: int = 25,
+        jitter: float = 0.0,
+        throttle_ratio: float = 0.0,
+        retry_after: float = 1.0,
+        seed: Optional[int] = None,
+    ) -> None:
+        self.vault_url = VAULT_URL
+        self.secrets = {name.lower(): value for name, value in secrets.items()}
+        self.latency = latency
+        self.page_size = page_size
+        self.jitter = jitter
+        self.throttle_ratio = throttle_ratio
+        self.retry_after = retry_after
+        self.calls = 0
+        self.not_found = 0
+        self.throttled = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _start_request(self) -> Tuple[float, bool]:
+        """
+        Count a request, return its latency and whether it is throttled.
+        """
+        with self._lock:
+            self.calls += 1
+            delay = self.latency + self._random.uniform(0, self.jitter)
+            throttled = self._random.random() < self.throttle_ratio
+            if throttled:
+                self.throttled += 1
+        return delay, throttled
+
+    def _request(self) -> None:
+        delay, throttled = self._start_request()
+        time.sleep(delay)
+        if throttled:
+            raise HttpResponseError(response=ThrottledResponse(self.retry_after))
+
+    def get_secret(
+        self, name: str, version: Optional[str] = None, **kwargs: Any
+    ) -> KeyVaultSecret:
+        self._request()
+        return self._secret(name)
+
+    def list_properties_of_secrets(self, **kwargs: Any) -> Iterator[SecretProperties]:
+        for page in self._pages():
+            self._request()
+            yield from page
+
+    def _secret(self, name: str) -> KeyVaultSecret:
+        value = self.secrets.get(name.lower())
+        if value is None:
+            with self._lock:
+                self.not_found += 1
+            raise ResourceNotFoundError(f"{name} was not found")
+        return KeyVaultSecret(self._properties(name), value)
+
+    def _pages(self) -> Iterator[List[SecretProperties]]:
+        names = list(self.secrets)
+        for start in range(0, len(names), self.page_size):
+            yield [
+                self._properties(name) for name in names[start : start + self.page_size]
+            ]
+
+    def _properties(self, name: str) -> SecretProperties:
+        return SecretProperties(None, f"{VAULT_URL}secrets/{name}/version1")
+
+
+class AsyncFakeVaultClient:
+    """
+    asyncio stand-in for SecretClient, which serves the secrets of
+    a FakeVaultClient and counts the requests in it.
+    """
+
+    def __init__(self, client: FakeVaultClient) -> None:
+        self.vault_url = client.vault_url
+        self._client = client
+
+    async def _request(self) -> None:
+        delay, throttled = self._client._start_request()
+        await asyncio.sleep(delay)
+        if throttled:
+            raise HttpResponseError(
+                response=ThrottledResponse(self._client.retry_after)
+            )
+
+    async def get_secret(
+        self, name: str, version: Optional[str] = None, **kwargs: Any
+    ) -> KeyVaultSecret:
+        await self._request()
+        return self._client._secret(name)
+
+    async def list_properties_of_secrets(
+        self, **kwargs: Any
+    ) -> AsyncIterator[SecretProperties]:
+        for page in self._client._pages():
+            await self._request()
+            for properties in page:
+                yield properties
+
+    async def __aenter__(self) -> "AsyncFakeVaultClient":
+        return self
+
+    async def __aexit__(self, *args: Any) -> None:
+        pass
+
+
+class FakeAsyncCredential:
+    """
+    The credential is only entered and exited by `aload()`.
+    """
+
+    async def __aenter__(self) -> "FakeAsyncCredential":
+        return self
+
+    async def __aexit__(self, *args: Any) -> None:
+        pass
+
+
+def make_settings(
+    fields: Dict[str, List[str]], client: Any, **config: Any
+) -> Type[AzureVaultSettings]:
+    """
+    Settings class with a `str` field per item of `fields`,
+    which maps the field names to their `env` names.
+    `aload()` uses an AsyncFakeVaultClient of `client`.
+    """
+    fields_env = {name: {"env": env} for name, env in fields.items()}
+
+    class Config:
+        azure_keyvault = VAULT_URL
+        fields = fields_env
+
+        @classmethod
+        def get_azure_client(cls, azure_keyvault: Optional[str]) -> Any:
+            return client
+
+        @classmethod
+        def get_azure_async_credential(cls) -> Any:
+            return FakeAsyncCredential()
+
+        @classmethod
+        def get_azure_async_client(cls, azure_keyvault: str, credential: Any) -> Any:
+            return AsyncFakeVaultClient(client)
+
+    for option, value in config.items():
+        setattr(Config, option, value)
+
+    namespace: Dict[str, Any] = {
+        "__annotations__": {name: str for name in fields},
+        "Config": Config,
+    }
+    for name in fields:
+        namespace[name] = "default"
+    return type("BenchmarkSettings", (AzureVaultSettings,), namespace)
@@ -1,5 +1,52 @@
+import importlib
+import sys
+from typing import TYPE_CHECKING, Any
+
 from pydantic_azure_secrets.azure_vault_settings import AzureVaultSettings
+from pydantic_azure_secrets.backends import (
+    FileBackend,
+    InMemoryBackend,
+    KeyVaultBackend,
+    SecretBackend,
+)
+from pydantic_azure_secrets.cache import SecretCache
+from pydantic_azure_secrets.clients import ClientRegistry, shared_clients
+from pydantic_azure_secrets.instrumentation import (
+    LoadReport,
+    OpenTelemetryReporter,
+    PrometheusReporter,
+)
+from pydantic_azure_secrets.refresh import RefreshStats, SettingsRefresher
+from pydantic_azure_secrets.secret_file import SecretFile
+from pydantic_azure_secrets.singleflight import SingleFlight, single_flight
+from pydantic_azure_secrets.snapshot import SecretSnapshot
+from pydantic_azure_secrets.throttling import DeadlineExceeded, VaultScheduler
+
+if TYPE_CHECKING:
+    from pydantic_azure_secrets.sidecar import HttpBackend, SidecarServer
 
 __version__ = '0.1.0'
 
 VERSION = __version__
+
+# The HTTP client and server modules take long to import, so the sidecar
+# is imported on the first access, see `__getattr__`
+LAZY_IMPORTS = {
+    "HttpBackend": "pydantic_azure_secrets.sidecar",
+    "SidecarServer": "pydantic_azure_secrets.sidecar",
+}
+
+
+def __getattr__(name: str) -> Any:
+    if name not in LAZY_IMPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    value = getattr(importlib.import_module(LAZY_IMPORTS[name]), name)
+    globals()[name] = value
+    return value
+
+
+if sys.version_info < (3, 7):
+    # Modules have no `__getattr__` before Python 3.7
+    for _name in LAZY_IMPORTS:
+        __getattr__(_name)
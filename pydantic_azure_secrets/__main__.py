@@ -0,0 +1,5 @@
+import sys
+
+from pydantic_azure_secrets.cli import main
+
+sys.exit(main())
@@ -1,113 +1,905 @@
+import importlib
 import logging
-import logging.config
+import os
+import sys
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Any, Dict, Optional, Union
+from types import MappingProxyType
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    ClassVar,
+    ContextManager,
+    Dict,
+    FrozenSet,
+    Hashable,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Tuple,
+    Type,
+    TypeVar,
+    Union,
+    cast,
+)
 
-from azure.core.exceptions import ResourceNotFoundError
-from azure.identity import DefaultAzureCredential
-from azure.keyvault.secrets import SecretClient
-from pydantic import BaseSettings
-from pydantic.utils import deep_update  # pylint: disable=no-name-in-module
+if TYPE_CHECKING:
+    from azure.core.credentials import TokenCredential
+    from azure.core.credentials_async import AsyncTokenCredential
+    from azure.keyvault.secrets import KeyVaultSecret, SecretClient, SecretProperties
+    from azure.keyvault.secrets.aio import SecretClient as AsyncSecretClient
+    from pydantic.typing import ReprArgs, TupleGenerator
+
+from pydantic import BaseModel, BaseSettings, PrivateAttr
+from pydantic.env_settings import SettingsError, env_file_sentinel
+from pydantic.fields import SHAPE_SINGLETON, ModelField, Undefined
+from pydantic.main import _missing
+from pydantic.utils import (  # pylint: disable=no-name-in-module
+    deep_update,
+    lenient_issubclass,
+)
+
+from pydantic_azure_secrets.backends import SecretBackend
+from pydantic_azure_secrets.cache import InstanceCache, SecretCache
+from pydantic_azure_secrets.clients import shared_clients
+from pydantic_azure_secrets.fetching import SecretFetcher
+from pydantic_azure_secrets.instrumentation import LoadReport, measure
+from pydantic_azure_secrets.lazy import DEFERRED, DeferredFields
+from pydantic_azure_secrets.reload import reload_settings
+from pydantic_azure_secrets.secret_file import SecretFile
+from pydantic_azure_secrets.secret_names import (
+    AzureKeyVaults,
+    NestedSecret,
+    VaultSecrets,
+    field_vault_urls,
+    first_secret,
+    flatten,
+    nested_secrets,
+    secret_names,
+    set_nested,
+    split_known_secrets,
+    vault_requests,
+    vault_urls,
+)
+from pydantic_azure_secrets.snapshot import SecretSnapshot
+from pydantic_azure_secrets.throttling import VaultScheduler
 
 logger = logging.getLogger(__name__)
 
+# The azure SDK takes long to import, so its classes are imported on the
+# first use, e.g. by `Config.get_azure_client()`, see `__getattr__`
+SDK_IMPORTS = {
+    "DefaultAzureCredential": ("azure.identity", "DefaultAzureCredential"),
+    "AsyncAzureCredential": ("azure.identity.aio", "DefaultAzureCredential"),
+    "SecretClient": ("azure.keyvault.secrets", "SecretClient"),
+    "AsyncSecretClient": ("azure.keyvault.secrets.aio", "SecretClient"),
+}
+
+SettingsT = TypeVar("SettingsT", bound="AzureVaultSettings")
+
 
 class AzureVaultSettings(BaseSettings):
     """
-    The behaviour of this class is exactly like pydantic.BaseSettings, except
-    the Field value priority:
-    https://pydantic-docs.helpmanual.io/usage/settings/#field-value-priority
-    The latest step is to check azure key vault, e.g.:
-
-    In the case where a value is specified for the same Settings field in
-    multiple ways, the selected value is determined as follows
-    (in descending order of priority):
+    pydantic.BaseSettings which looks up the fields in azure key vault too.
+    The value of a field is taken from (in descending order of priority):
         1. Arguments passed to the Settings class initialiser.
         2. Environment variables, e.g. my_prefix_special_function
-    as described above.
         3. Variables loaded from a dotenv (.env) file.
         4. Variables loaded from the secrets directory.
         5. Variables loaded from the keyvault.
         6. The default field values for the Settings model.
 
+    The key vault secret names of a field are its `env` names with dashes
+    instead of underscores. The `Config.azure_keyvault_*` options (the key
+    vaults, parallel fetching, caching, lazy fields etc.) and the other
+    features (`aload()`, `cached()`, `preload()`, `reload()`) are described
+    in the README.
+
     The implementation details are the same as in this version of pydantic:
     https://github.com/samuelcolvin/pydantic/blob/00a128a3609dac82dfe0cdb4200bbf2011aa5f83/pydantic/env_settings.py
     """
 
+    # The key vault secret names of every field, from the highest priority
+    # to the lowest, computed once per class
+    __azure_secret_names__: ClassVar[Mapping[str, Tuple[str, ...]]] = MappingProxyType(
+        {}
+    )
+    # The secrets of the nested fields of every field by their path,
+    # see `Config.azure_keyvault_nested_delimiter`
+    __azure_nested_secret_names__: ClassVar[
+        Mapping[str, Tuple[NestedSecret, ...]]
+    ] = MappingProxyType({})
+    # The secret names of the `SecretFile` fields, lowercase
+    __azure_secret_file_names__: ClassVar[FrozenSet[str]] = frozenset()
+    # The secrets fetched by `preload()`, set on the class itself
+    __azure_preloaded__: ClassVar[Optional[Dict[str, VaultSecrets]]] = None
+    # The instances returned by `cached()`, one cache per class
+    __azure_cached__: ClassVar[InstanceCache] = InstanceCache()
+
+    # The secrets fetched for this instance by key vault URL and name,
+    # None for the names which were not found
+    _azure_secrets: Dict[str, VaultSecrets] = PrivateAttr()
+    # The fields fetched on the first access, see `Config.azure_keyvault_lazy`
+    _azure_deferred: Optional[DeferredFields] = PrivateAttr()
+    # Set during the construction, see `Config.azure_keyvault_instrumentation`
+    _azure_report: LoadReport = PrivateAttr()
+    # The arguments of the construction, to resolve the fields again in `reload()`
+    _azure_sources: Dict[str, Any] = PrivateAttr()
+
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)  # type: ignore
+        cls.__azure_secret_names__ = MappingProxyType(
+            {name: secret_names(field) for name, field in cls.__fields__.items()}
+        )
+        delimiter = cls.__config__.azure_keyvault_nested_delimiter
+        nested = {
+            name: tuple(
+                nested_secrets(field, cls.__azure_secret_names__[name], delimiter)
+            )
+            for name, field in cls.__fields__.items()
+        }
+        cls.__azure_nested_secret_names__ = MappingProxyType(
+            {name: secrets for name, secrets in nested.items() if secrets}
+            if delimiter
+            else {}
+        )
+        cls.__azure_secret_file_names__ = frozenset(
+            name.lower()
+            for field_name, field in cls.__fields__.items()
+            if field.shape == SHAPE_SINGLETON
+            and lenient_issubclass(field.type_, SecretFile)
+            for name in cls.__azure_secret_names__[field_name]
+        )
+        cls.__azure_cached__ = InstanceCache(
+            cls.__config__.azure_keyvault_cached_maxsize
+        )
+
     def __init__(  # pylint: disable=no-self-argument
         __pydantic_self__,
-        _env_file: Union[Path, str, None] = str(object()),
+        _env_file: Union[Path, str, None] = env_file_sentinel,
         _env_file_encoding: Optional[str] = None,
         _secrets_dir: Union[Path, str, None] = None,
-        _azure_keyvault: Union[str, None] = None,
+        _azure_keyvault: AzureKeyVaults = None,
         **values: Any,
     ) -> None:
         # Uses something other than `self`
-        # the first arg to allow "self" as a settable attribute
-        super().__init__(
-            **__pydantic_self__._build_values(
+        # the first arg to allow "self" as a settable attribute.
+        # BaseSettings.__init__ is skipped on purpose: it would call
+        # `_build_values` once more and query the key vault twice.
+        with __pydantic_self__._instrumented():
+            values = __pydantic_self__._build_values(
                 values,
                 _env_file=_env_file,
                 _env_file_encoding=_env_file_encoding,
                 _secrets_dir=_secrets_dir,
                 _azure_keyvault=_azure_keyvault,
             )
+            with __pydantic_self__._measure("validation"):
+                deferred = getattr(__pydantic_self__, "_azure_deferred", None)
+                if deferred is not None:
+                    deferred.init(__pydantic_self__, values)
+                else:
+                    BaseModel.__init__(__pydantic_self__, **values)
+
+    def __getattr__(self, name: str) -> Any:
+        # Only called if there is no such attribute, e.g. for a deferred field
+        deferred = None
+        if not name.startswith("_"):
+            deferred = getattr(self, "_azure_deferred", None)
+        if deferred is None:
+            raise AttributeError(
+                f"{self.__class__.__name__!r} object has no attribute {name!r}"
+            )
+        return deferred.get(self, name)
+
+    def __getstate__(self) -> Dict[str, Any]:
+        self._resolve_deferred()
+        state = super().__getstate__()
+        # Unset private attributes would be unpickled as a copy of `Undefined`
+        state["__private_attribute_values__"] = {
+            name: value
+            for name, value in state["__private_attribute_values__"].items()
+            if value is not Undefined
+        }
+        return state
+
+    def __iter__(self) -> "TupleGenerator":
+        self._resolve_deferred()
+        yield from super().__iter__()
+
+    def _iter(self, *args: Any, **kwargs: Any) -> "TupleGenerator":
+        self._resolve_deferred()
+        yield from super()._iter(*args, **kwargs)
+
+    def __repr_args__(self) -> "ReprArgs":
+        # The deferred fields are shown, but not fetched
+        deferred = getattr(self, "_azure_deferred", None)
+        deferred_fields = deferred.fields if deferred is not None else {}
+        values = dict(super().__repr_args__())
+        return [
+            (name, values.pop(name) if name in values else DEFERRED)
+            for name in self.__fields__
+            if name in values or name in deferred_fields
+        ] + list(values.items())
+
+    @classmethod
+    async def aload(
+        cls: Type[SettingsT],
+        _env_file: Union[Path, str, None] = env_file_sentinel,
+        _env_file_encoding: Optional[str] = None,
+        _secrets_dir: Union[Path, str, None] = None,
+        _azure_keyvault: AzureKeyVaults = None,
+        **values: Any,
+    ) -> SettingsT:
+        """
+        Asynchronous alternative to the constructor, e.g.
+        `settings = await MySettings.aload()`.
+
+        The secrets are fetched with the asyncio key vault client,
+        so the event loop is not blocked. The values are validated
+        in the same way as in `__init__`.
+        """
+        settings = cls.__new__(cls)
+        with settings._instrumented():
+            values = await settings._abuild_values(
+                values,
+                _env_file=_env_file,
+                _env_file_encoding=_env_file_encoding,
+                _secrets_dir=_secrets_dir,
+                _azure_keyvault=_azure_keyvault,
+            )
+            with settings._measure("validation"):
+                BaseModel.__init__(settings, **values)
+        return settings
+
+    @classmethod
+    def _from_secrets(
+        cls: Type[SettingsT],
+        secrets: Mapping[str, Mapping[str, Optional["KeyVaultSecret"]]],
+        _env_file: Union[Path, str, None] = env_file_sentinel,
+        _env_file_encoding: Optional[str] = None,
+        _secrets_dir: Union[Path, str, None] = None,
+        _azure_keyvault: AzureKeyVaults = None,
+        **values: Any,
+    ) -> SettingsT:
+        """
+        Construct the settings like `__init__`, but take the key vault
+        secrets from `secrets` by key vault URL and name (None if a secret
+        was not found). Only the names missing in `secrets` are fetched.
+        """
+        settings = cls.__new__(cls)
+        with settings._instrumented():
+            values = settings._build_values(
+                values,
+                _env_file=_env_file,
+                _env_file_encoding=_env_file_encoding,
+                _secrets_dir=_secrets_dir,
+                _azure_keyvault=_azure_keyvault,
+                _azure_secrets=secrets,
+            )
+            with settings._measure("validation"):
+                BaseModel.__init__(settings, **values)
+        return settings
+
+    def reload(
+        self: SettingsT,
+        fields: Optional[Iterable[str]] = None,
+        changed_secret_names: Optional[Iterable[str]] = None,
+    ) -> SettingsT:
+        """
+        Return new settings where only some fields are resolved again from all
+        the sources, with the same arguments as these settings: the `fields`
+        by name and the fields which use any of the key vault secret names
+        `changed_secret_names`, e.g. on a secret rotation event.
+
+        Only the secrets of these names (all the names of `fields`) are fetched
+        again, the values of the other fields are shared with these settings.
+        The reloaded fields are validated again, then the root validators run.
+        """
+        fields = list(fields or ())
+        field_names = set(fields)
+        unknown = field_names - self.__fields__.keys()
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+
+        # Secret names are case-insensitive in the key vault
+        refetch_names = {name.lower() for name in changed_secret_names or ()}
+        keyvault_names = self._keyvault_names(self.__fields__.values())
+        field_names.update(
+            field_name
+            for field_name, names in keyvault_names.items()
+            if any(name.lower() in refetch_names for name in names)
+        )
+        refetch_names.update(
+            name.lower() for field_name in fields for name in keyvault_names[field_name]
+        )
+
+        settings = self.__class__.__new__(self.__class__)
+        with settings._instrumented():
+            reload_settings(settings, self, field_names, refetch_names)
+        return settings
+
+    def secret_properties(self) -> Dict[str, "SecretProperties"]:
+        """
+        The properties of the key vault secret of every field which was found
+        in the key vault: its `version`, `updated_on` timestamp etc. A secret
+        is listed even if its value is overridden by a source with a higher
+        priority.
+        """
+        secrets: Dict[str, VaultSecrets] = getattr(self, "_azure_secrets", {})
+        sources = getattr(self, "_azure_sources", None) or {}
+        vaults = vault_urls(
+            sources.get("_azure_keyvault") or self.__config__.azure_keyvault
+        )
+        properties = {}
+        for field in self.__fields__.values():
+            secret = first_secret(
+                secrets,
+                field_vault_urls(field, vaults),
+                list(self.__azure_secret_names__[field.name]),
+            )
+            if secret is not None:
+                properties[field.name] = secret.properties
+        return properties
+
+    def keyvault_secrets(self) -> Dict[str, Dict[str, "KeyVaultSecret"]]:
+        """
+        The secrets found in every key vault by name, including the secrets
+        whose values are overridden by a source with a higher priority.
+        """
+        secrets: Dict[str, VaultSecrets] = getattr(self, "_azure_secrets", {})
+        return {
+            vault_url: {
+                name: secret
+                for name, secret in vault_secrets.items()
+                if secret is not None
+            }
+            for vault_url, vault_secrets in secrets.items()
+        }
+
+    @classmethod
+    def keyvault_requests(
+        cls, azure_keyvault: AzureKeyVaults = None
+    ) -> Dict[str, List[str]]:
+        """
+        The secret names which the construction of the settings would request
+        from every key vault if no other source resolved the fields, e.g. to
+        grant access to them. `azure_keyvault` overrides
+        `Config.azure_keyvault` like the `_azure_keyvault` argument.
+        """
+        vaults = vault_urls(azure_keyvault or cls.__config__.azure_keyvault)
+        fields_vaults = {
+            field.name: field_vault_urls(field, vaults)
+            for field in cls.__fields__.values()
+        }
+        fields = [
+            field for field in cls.__fields__.values() if fields_vaults[field.name]
+        ]
+        return vault_requests(cls._keyvault_names(fields), fields_vaults)
+
+    @classmethod
+    def preload(cls: Type[SettingsT], **values: Any) -> SettingsT:
+        """
+        Fetch the key vault secrets once, e.g. in the master process of
+        a pre-fork server before the workers are forked, and return
+        the settings.
+
+        The next instances of this class, in this process and in its forked
+        children, take the key vault secrets from the preloaded ones and
+        fetch only the names which were not preloaded, so the children
+        usually don't query the key vault at all. The arguments are the same
+        as the constructor ones. Call `preload()` again to fetch the secrets
+        again, or `discard_preloaded()` to query the key vault as usual.
+        """
+        settings = cls._from_secrets({}, **values)
+        cls.__azure_preloaded__ = {
+            vault_url: dict(vault_secrets)
+            for vault_url, vault_secrets in settings._azure_secrets.items()
+        }
+        cls.invalidate_cached()
+        return settings
+
+    @classmethod
+    def discard_preloaded(cls) -> None:
+        cls.__azure_preloaded__ = None
+        cls.invalidate_cached()
+
+    @classmethod
+    def cached(
+        cls: Type[SettingsT],
+        _env_file: Union[Path, str, None] = env_file_sentinel,
+        _env_file_encoding: Optional[str] = None,
+        _secrets_dir: Union[Path, str, None] = None,
+        _azure_keyvault: AzureKeyVaults = None,
+        **values: Any,
+    ) -> SettingsT:
+        """
+        Return the settings constructed with the same arguments, if the other
+        sources didn't change since then, or construct them.
+
+        The instance is shared while the arguments, the environment variables
+        of the fields, the dotenv file, the files of the secrets directory
+        and the key vault URLs stay the same. Changes of the files are
+        detected with their inode, modification time and size. The key vault
+        is not queried: call `invalidate_cached()` when its secrets change,
+        `SettingsRefresher` does it on a rotation. At most
+        `Config.azure_keyvault_cached_maxsize` instances are kept per class.
+        """
+        instances = cls.__azure_cached__
+        key = cls._fingerprint(
+            values, _env_file, _env_file_encoding, _secrets_dir, _azure_keyvault
+        )
+        settings = instances.get(key)
+        if settings is None:
+            settings = instances.add(
+                key,
+                cls(
+                    _env_file=_env_file,
+                    _env_file_encoding=_env_file_encoding,
+                    _secrets_dir=_secrets_dir,
+                    _azure_keyvault=_azure_keyvault,
+                    **values,
+                ),
+            )
+        return cast(SettingsT, settings)
+
+    @classmethod
+    def invalidate_cached(cls) -> None:
+        """
+        Forget the instances returned by `cached()`.
+        """
+        cls.__azure_cached__.clear()
+
+    @classmethod
+    def _fingerprint(
+        cls,
+        init_kwargs: Dict[str, Any],
+        _env_file: Union[Path, str, None],
+        _env_file_encoding: Optional[str],
+        _secrets_dir: Union[Path, str, None],
+        _azure_keyvault: AzureKeyVaults,
+    ) -> Hashable:
+        # The same inputs as `_build_environ()` and `_build_secrets_files()`
+        config = cls.__config__
+        env_names = [
+            env_name
+            for field in cls.__fields__.values()
+            for env_name in field.field_info.extra["env_names"]
+        ]
+        if config.case_sensitive:
+            env_vars: Mapping[str, str] = os.environ
+        else:
+            env_vars = {key.lower(): value for key, value in os.environ.items()}
+        env_file = _env_file if _env_file != env_file_sentinel else config.env_file
+        secrets_dir = _secrets_dir or config.secrets_dir
+
+        return (
+            _freeze(init_kwargs),
+            tuple(env_vars.get(env_name) for env_name in env_names),
+            str(env_file) if env_file is not None else None,
+            _env_file_encoding or config.env_file_encoding,
+            _file_stat(Path(env_file).expanduser()) if env_file is not None else None,
+            str(secrets_dir) if secrets_dir is not None else None,
+            tuple(
+                _file_stat(Path(secrets_dir).expanduser() / env_name)
+                for env_name in env_names
+            )
+            if secrets_dir is not None
+            else (),
+            tuple(vault_urls(_azure_keyvault or config.azure_keyvault)),
         )
 
+    @classmethod
+    def _preloaded_secrets(cls) -> Optional[Dict[str, VaultSecrets]]:
+        # The secrets preloaded by a parent class may come from other key vaults
+        return cls.__dict__.get("__azure_preloaded__")  # type: ignore
+
+    @contextmanager
+    def _instrumented(self) -> Iterator[None]:
+        """
+        Report the construction to `Config.azure_keyvault_instrumentation`.
+        """
+        callback = self.__config__.azure_keyvault_instrumentation
+        if callback is None:
+            yield
+            return
+
+        report = LoadReport(self.__class__.__name__)
+        object.__setattr__(self, "_azure_report", report)
+        try:
+            yield
+        finally:
+            object.__delattr__(self, "_azure_report")
+            report.finish()
+            try:
+                callback(report)
+            except Exception:  # pylint: disable=broad-except
+                logger.exception("Settings instrumentation %r failed", callback)
+
+    def _measure(self, source: str) -> ContextManager[None]:
+        return measure(getattr(self, "_azure_report", None), source)
+
     def _build_values(
         self,
         init_kwargs: Dict[str, Any],
         _env_file: Union[Path, str, None] = None,
         _env_file_encoding: Optional[str] = None,
         _secrets_dir: Union[Path, str, None] = None,
-        _azure_keyvault: Union[str, None] = None,
+        _azure_keyvault: AzureKeyVaults = None,
+        _azure_secrets: Optional[
+            Mapping[str, Mapping[str, Optional["KeyVaultSecret"]]]
+        ] = None,
     ) -> Dict[str, Any]:
 
-        azure_keyvault = _azure_keyvault or self.__config__.azure_keyvault
-        secret_client = self.__config__.get_azure_client(azure_keyvault)
+        higher_priority_values = self._build_higher_priority_values(
+            init_kwargs, _env_file, _env_file_encoding, _secrets_dir
+        )
+        vaults = vault_urls(_azure_keyvault or self.__config__.azure_keyvault)
+        self._remember_sources(
+            init_kwargs, _env_file, _env_file_encoding, _secrets_dir, _azure_keyvault
+        )
+        self._remember_secrets({})
+        if _azure_secrets is None:
+            _azure_secrets = self._preloaded_secrets()
 
+        with self._measure("keyvault"):
+            keyvault_values = self._build_keyvault_values(
+                higher_priority_values, vaults, _azure_secrets
+            )
+        return deep_update(keyvault_values, *higher_priority_values)
+
+    def _build_keyvault_values(
+        self,
+        higher_priority_values: List[Dict[str, Any]],
+        vaults: List[str],
+        _azure_secrets: Optional[
+            Mapping[str, Mapping[str, Optional["KeyVaultSecret"]]]
+        ],
+    ) -> Dict[str, Any]:
+        fields = [
+            field
+            for field in self._keyvault_fields(higher_priority_values)
+            if field_vault_urls(field, vaults)
+        ]
+        if not fields:
+            return {}
+
+        if self.__config__.azure_keyvault_lazy and _azure_secrets is None:
+            self._defer_fields(fields, vaults)
+            return {}
+
+        return self._build_keyvault(fields, vaults, _azure_secrets)
+
+    async def _abuild_values(
+        self,
+        init_kwargs: Dict[str, Any],
+        _env_file: Union[Path, str, None] = None,
+        _env_file_encoding: Optional[str] = None,
+        _secrets_dir: Union[Path, str, None] = None,
+        _azure_keyvault: AzureKeyVaults = None,
+    ) -> Dict[str, Any]:
+        higher_priority_values = self._build_higher_priority_values(
+            init_kwargs, _env_file, _env_file_encoding, _secrets_dir
+        )
+        vaults = vault_urls(_azure_keyvault or self.__config__.azure_keyvault)
+        self._remember_sources(
+            init_kwargs, _env_file, _env_file_encoding, _secrets_dir, _azure_keyvault
+        )
+        self._remember_secrets({})
+        fields = [
+            field
+            for field in self._keyvault_fields(higher_priority_values)
+            if field_vault_urls(field, vaults)
+        ]
+        if not fields:
+            return deep_update(*higher_priority_values)
+
+        fields_names = self._keyvault_names(fields)
+        fields_vaults = {
+            field.name: field_vault_urls(field, vaults) for field in fields
+        }
+        secrets, missing = split_known_secrets(
+            vault_requests(fields_names, fields_vaults), self._preloaded_secrets()
+        )
+        with self._measure("keyvault"):
+            fetched = await SecretFetcher(self).afetch_vaults(missing)
+        for vault_url, vault_secrets in fetched.items():
+            secrets[vault_url].update(vault_secrets)
+
+        self._remember_secrets(secrets)
         return deep_update(
-            self._build_keyvault(secret_client),
-            self._build_secrets_files(_secrets_dir),
-            self._build_environ(_env_file, _env_file_encoding),
-            init_kwargs,
+            self._pick_secrets(fields_names, fields_vaults, secrets),
+            *higher_priority_values,
         )
 
+    def _build_higher_priority_values(
+        self,
+        init_kwargs: Dict[str, Any],
+        _env_file: Union[Path, str, None] = None,
+        _env_file_encoding: Optional[str] = None,
+        _secrets_dir: Union[Path, str, None] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Values of all the sources with a higher priority than the key vault,
+        from the lowest priority to the highest one.
+        """
+        with self._measure("secrets_dir"):
+            secrets_files = self._build_secrets_files(_secrets_dir)
+        with self._measure("environ"):
+            environ = self._build_environ(_env_file, _env_file_encoding)
+        return [secrets_files, environ, init_kwargs]
+
+    def _keyvault_fields(
+        self, higher_priority_values: List[Dict[str, Any]]
+    ) -> List[ModelField]:
+        fields = list(self.__fields__.values())
+        config = self.__config__
+        if config.azure_keyvault_skip_resolved or config.azure_keyvault_lazy:
+            fields = [
+                field
+                for field in fields
+                if not _is_resolved(field, higher_priority_values)
+            ]
+        return fields
+
+    @classmethod
+    def _keyvault_names(cls, fields: Iterable[ModelField]) -> Dict[str, List[str]]:
+        """
+        All the key vault secret names of every field,
+        including the names of its nested fields.
+        """
+        names = cls.__azure_secret_names__
+        nested = cls.__azure_nested_secret_names__
+        return {
+            field.name: [
+                *names[field.name],
+                *flatten(secret.names for secret in nested.get(field.name, ())),
+            ]
+            for field in fields
+        }
+
     def _build_keyvault(
-        self, secret_client: Optional[SecretClient] = None
-    ) -> Dict[str, Optional[str]]:
-        secrets: Dict[str, Optional[str]] = {}
+        self,
+        fields: Optional[Iterable[ModelField]] = None,
+        vaults: Optional[List[str]] = None,
+        known_secrets: Optional[
+            Mapping[str, Mapping[str, Optional["KeyVaultSecret"]]]
+        ] = None,
+    ) -> Dict[str, Any]:
+        if fields is None:
+            fields = self.__fields__.values()
+        if vaults is None:
+            vaults = vault_urls(self.__config__.azure_keyvault)
 
-        if secret_client is None:
-            return {}
+        fields_names = self._keyvault_names(fields)
+        fields_vaults = {
+            field.name: field_vault_urls(field, vaults) for field in fields
+        }
 
-        # Get secrets
-        for field in self.__fields__.values():
-            for env_name in field.field_info.extra["env_names"]:
-                az_field_name = env_name.replace("_", "-")
+        # Take the known secrets, fetch the others
+        secrets, missing = split_known_secrets(
+            vault_requests(fields_names, fields_vaults), known_secrets
+        )
+        fetcher = SecretFetcher(self)
+        clients = fetcher.get_clients(missing)
+        fetched = fetcher.fetch_vaults(
+            clients, {url: names for url, names in missing.items() if url in clients}
+        )
+        for vault_url, vault_secrets in fetched.items():
+            secrets[vault_url].update(vault_secrets)
+
+        self._remember_secrets(secrets)
+        return self._pick_secrets(fields_names, fields_vaults, secrets)
+
+    def _remember_secrets(self, secrets: Dict[str, VaultSecrets]) -> None:
+        # Called before the model is initialised, so `__setattr__` can't be used
+        object.__setattr__(self, "_azure_secrets", secrets)
+
+    def _remember_sources(
+        self,
+        init_kwargs: Dict[str, Any],
+        _env_file: Union[Path, str, None],
+        _env_file_encoding: Optional[str],
+        _secrets_dir: Union[Path, str, None],
+        _azure_keyvault: AzureKeyVaults,
+    ) -> None:
+        sources = {
+            "init_kwargs": init_kwargs,
+            "_env_file": _env_file,
+            "_env_file_encoding": _env_file_encoding,
+            "_secrets_dir": _secrets_dir,
+            "_azure_keyvault": _azure_keyvault,
+        }
+        object.__setattr__(self, "_azure_sources", sources)
+
+    def _defer_fields(self, fields: Iterable[ModelField], vaults: List[str]) -> None:
+        deferred = {
+            field.name: (field, field_vault_urls(field, vaults)) for field in fields
+        }
+        clients = SecretFetcher(self).get_clients(
+            dict.fromkeys(
+                flatten(field_vaults for _, field_vaults in deferred.values())
+            )
+        )
+        if clients:
+            object.__setattr__(
+                self, "_azure_deferred", DeferredFields(deferred, clients)
+            )
+
+    def _resolve_deferred(self) -> None:
+        deferred = getattr(self, "_azure_deferred", None)
+        if deferred is not None:
+            deferred.resolve(self)
+            # the lock can't be pickled
+            object.__setattr__(self, "_azure_deferred", None)
+
+    def _pick_secrets(
+        self,
+        fields_names: Dict[str, List[str]],
+        fields_vaults: Dict[str, List[str]],
+        fetched: Mapping[str, Mapping[str, Optional["KeyVaultSecret"]]],
+    ) -> Dict[str, Any]:
+        secrets: Dict[str, Any] = {}
+        # The complex values are parsed once, even if several fields use them
+        parsed: Dict[int, Any] = {}
+
+        def parse(secret: "KeyVaultSecret", is_complex: bool) -> Any:
+            if not is_complex or secret.value is None:
+                return secret.value
+            if id(secret) not in parsed:
                 try:
-                    secret = secret_client.get_secret(az_field_name)
-                    secrets[field.name] = secret.value
-                except ResourceNotFoundError:
-                    logger.warning(
-                        "%s was not found in: %s",
-                        field.name,
-                        self.__config__.azure_keyvault,
+                    parsed[id(secret)] = self.__config__.json_loads(secret.value)
+                except ValueError as e:
+                    raise SettingsError(
+                        f'error parsing JSON for "{secret.name}"'
+                    ) from e
+            return parsed[id(secret)]
+
+        # The names and the key vaults are in priority order, the first found wins
+        for field_name in fields_names:
+            vaults = fields_vaults[field_name]
+            names = list(self.__azure_secret_names__[field_name])
+            secret = first_secret(fetched, vaults, names)
+            value = _missing
+            if secret is not None:
+                value = parse(secret, self.__fields__[field_name].is_complex())
+
+            nested_values: Dict[str, Any] = {}
+            for nested in self.__azure_nested_secret_names__.get(field_name, ()):
+                nested_secret = first_secret(fetched, vaults, list(nested.names))
+                if nested_secret is not None:
+                    set_nested(
+                        nested_values,
+                        nested.path,
+                        parse(nested_secret, nested.is_complex),
                     )
+            if nested_values:
+                # the parsed values may be shared, deep_update copies them
+                value = (
+                    deep_update(value, nested_values)
+                    if isinstance(value, dict)
+                    else nested_values
+                )
+
+            if value is not _missing:
+                secrets[field_name] = value
+            else:
+                logger.warning("%s was not found in: %s", field_name, ", ".join(vaults))
 
         return secrets
 
     class Config(BaseSettings.Config):
-        azure_keyvault = None
+        azure_keyvault: AzureKeyVaults = None
+        azure_keyvault_skip_resolved = False
+        azure_keyvault_max_workers: Optional[int] = None
+        azure_keyvault_shared_client = False
+        azure_keyvault_cache: Optional[SecretCache] = None
+        azure_keyvault_snapshot: Optional[SecretSnapshot] = None
+        azure_keyvault_list_secrets = False
+        azure_keyvault_lazy = False
+        azure_keyvault_instrumentation: Optional[Callable[[LoadReport], None]] = None
+        azure_keyvault_scheduler: Optional[VaultScheduler] = None
+        azure_keyvault_single_flight = False
+        azure_keyvault_nested_delimiter: Optional[str] = None
+        azure_keyvault_cached_maxsize = 16
+        azure_keyvault_secret_files_dir: Optional[str] = None
+
+        @classmethod
+        def get_azure_credential(cls) -> "TokenCredential":
+            return _sdk("DefaultAzureCredential")()
 
         @classmethod
-        def get_azure_client(cls, azure_keyvault: Optional[str]) -> SecretClient:
-            secret_client = None
-            if azure_keyvault:
-                credential = DefaultAzureCredential()
-                secret_client = SecretClient(
+        def get_azure_client(
+            cls, azure_keyvault: Optional[str]
+        ) -> Optional["SecretClient"]:
+            if not azure_keyvault:
+                return None
+
+            def create_client(credential: "TokenCredential") -> "SecretClient":
+                return _sdk("SecretClient")(
                     vault_url=azure_keyvault, credential=credential
                 )
-            return secret_client
+
+            if cls.azure_keyvault_shared_client:
+                return shared_clients.get_client(
+                    azure_keyvault, create_client, cls.get_azure_credential
+                )
+            return create_client(cls.get_azure_credential())
+
+        @classmethod
+        def get_azure_backend(cls, azure_keyvault: str) -> Optional[SecretBackend]:
+            """
+            Return a `SecretBackend` to fetch the secrets of the key vault
+            from it instead of the azure SecretClient, e.g. a local cache.
+            """
+            return None
+
+        @classmethod
+        def get_azure_async_credential(cls) -> "AsyncTokenCredential":
+            return _sdk("AsyncAzureCredential")()
+
+        @classmethod
+        def get_azure_async_client(
+            cls, azure_keyvault: str, credential: "AsyncTokenCredential"
+        ) -> "AsyncSecretClient":
+            return _sdk("AsyncSecretClient")(
+                vault_url=azure_keyvault, credential=credential
+            )
 
     __config__: Config
+
+
+def __getattr__(name: str) -> Any:
+    """
+    Import the azure SDK classes of `SDK_IMPORTS` on the first access,
+    e.g. `mock.patch("pydantic_azure_secrets.azure_vault_settings.SecretClient")`.
+    """
+    if name not in SDK_IMPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    module_name, attribute = SDK_IMPORTS[name]
+    value = getattr(importlib.import_module(module_name), attribute)
+    globals()[name] = value
+    return value
+
+
+def _sdk(name: str) -> Any:
+    # The imported (or patched) class is a global of the module
+    return globals()[name] if name in globals() else __getattr__(name)
+
+
+if sys.version_info < (3, 7):
+    # Modules have no `__getattr__` before Python 3.7
+    for _name in SDK_IMPORTS:
+        __getattr__(_name)
+
+
+def _is_resolved(field: ModelField, sources: List[Dict[str, Any]]) -> bool:
+    return any(field.alias in source or field.name in source for source in sources)
+
+
+def _freeze(value: Any) -> Hashable:
+    # A hashable equivalent of the constructor arguments, with their types
+    # so that e.g. 1 and True are different
+    if isinstance(value, Mapping):
+        return frozenset((key, _freeze(item)) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return type(value), tuple(_freeze(item) for item in value)
+    if isinstance(value, (set, frozenset)):
+        return type(value), frozenset(_freeze(item) for item in value)
+    try:
+        hash(value)
+    except TypeError:
+        return type(value), repr(value)
+    return type(value), value
+
+
+def _file_stat(path: Path) -> Optional[Tuple[int, int, int]]:
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
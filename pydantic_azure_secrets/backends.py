@@ -0,0 +1,194 @@
+import json
+import threading
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Mapping, Optional, Tuple, Union
+
+from pydantic_azure_secrets.clients import normalize_vault_url
+from pydantic_azure_secrets.secret_file import value_text
+from pydantic_azure_secrets.snapshot import write_private_file
+
+if TYPE_CHECKING:
+    from azure.keyvault.secrets import KeyVaultSecret, SecretClient
+
+
+class SecretBackend(ABC):
+    """
+    Source of the secrets of one key vault, which returns several secrets
+    at once. Return it from `Config.get_azure_backend()` to use it instead
+    of the azure SecretClient.
+    """
+
+    vault_url: str
+
+    @abstractmethod
+    def get_many(self, names: List[str]) -> Dict[str, "KeyVaultSecret"]:
+        """
+        The secrets by name, the names which are not found are omitted.
+        """
+
+    async def aget_many(self, names: List[str]) -> Dict[str, "KeyVaultSecret"]:
+        import asyncio  # pylint: disable=C0415
+
+        # Most of the backends are local and fast, so a thread is enough
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(None, self.get_many, names)
+
+    def close(self) -> None:
+        pass
+
+
+class KeyVaultBackend(SecretBackend):
+    """
+    Azure key vault, the secrets are fetched in parallel
+    with a pool of `max_workers` threads.
+    """
+
+    def __init__(self, secret_client: "SecretClient", max_workers: int = 8) -> None:
+        self.vault_url = secret_client.vault_url
+        self.max_workers = max_workers
+        self._secret_client = secret_client
+
+    def get_many(self, names: List[str]) -> Dict[str, "KeyVaultSecret"]:
+        from concurrent.futures import ThreadPoolExecutor  # pylint: disable=C0415
+
+        if len(names) > 1 and self.max_workers > 1:
+            with ThreadPoolExecutor(
+                max_workers=min(self.max_workers, len(names)),
+                thread_name_prefix="azure-keyvault-backend",
+            ) as executor:
+                secrets = list(executor.map(self._get_secret, names))
+        else:
+            secrets = [self._get_secret(name) for name in names]
+        return {
+            name: secret for name, secret in zip(names, secrets) if secret is not None
+        }
+
+    def close(self) -> None:
+        self._secret_client.close()
+
+    def _get_secret(self, name: str) -> Optional["KeyVaultSecret"]:
+        from azure.core.exceptions import ResourceNotFoundError  # pylint: disable=C0415
+
+        try:
+            return self._secret_client.get_secret(name)
+        except ResourceNotFoundError:
+            return None
+
+
+class InMemoryBackend(SecretBackend):
+    """
+    Secrets kept in memory, e.g. in tests. Every `set()` of a secret
+    creates a new version of it.
+    """
+
+    def __init__(self, vault_url: str, secrets: Optional[Mapping[str, str]] = None):
+        self.vault_url = vault_url
+        self._lock = threading.Lock()
+        self._secrets: Dict[str, "KeyVaultSecret"] = {}
+        for name, value in (secrets or {}).items():
+            self.set(name, value)
+
+    def get_many(self, names: List[str]) -> Dict[str, "KeyVaultSecret"]:
+        with self._lock:
+            found = {name: self._secrets.get(name.lower()) for name in names}
+        return {name: secret for name, secret in found.items() if secret is not None}
+
+    def set(self, name: str, value: str) -> None:
+        with self._lock:
+            secret = self._secrets.get(name.lower())
+            version = (
+                int(secret.properties.version or 0) + 1 if secret is not None else 1
+            )
+            self._secrets[name.lower()] = _secret(
+                self.vault_url, name, value, str(version)
+            )
+
+    def delete(self, name: str) -> None:
+        with self._lock:
+            self._secrets.pop(name.lower(), None)
+
+
+class FileBackend(SecretBackend):
+    """
+    Secrets of several key vaults in a JSON file, e.g. a node-local cache
+    written by one process with `FileBackend.write()` and read by many.
+
+    The file is parsed again only when it changes, otherwise the secrets
+    are served from memory. Secrets of other key vaults are ignored.
+    """
+
+    def __init__(self, vault_url: str, path: Union[Path, str]) -> None:
+        self.vault_url = vault_url
+        self.path = Path(path).expanduser()
+        self._lock = threading.Lock()
+        self._stat: Optional[Tuple[int, int, int]] = None
+        self._secrets: Dict[str, "KeyVaultSecret"] = {}
+
+    def get_many(self, names: List[str]) -> Dict[str, "KeyVaultSecret"]:
+        secrets = self._load()
+        found = {name: secrets.get(name.lower()) for name in names}
+        return {name: secret for name, secret in found.items() if secret is not None}
+
+    @staticmethod
+    def write(
+        path: Union[Path, str],
+        vault_url: str,
+        secrets: Mapping[str, Union[str, "KeyVaultSecret"]],
+    ) -> None:
+        """
+        Save the secrets of the key vault in the file, atomically and readable
+        by the owner only. The secrets of the other key vaults are kept.
+        """
+        path = Path(path).expanduser()
+        try:
+            vaults = json.loads(path.read_text())["vaults"]
+        except FileNotFoundError:
+            vaults = {}
+        vaults[normalize_vault_url(vault_url)] = {
+            name: _as_dict(vault_url, name, secret) for name, secret in secrets.items()
+        }
+        write_private_file(path, json.dumps({"vaults": vaults}).encode())
+
+    def _load(self) -> Dict[str, "KeyVaultSecret"]:
+        try:
+            stat = self.path.stat()
+        except FileNotFoundError:
+            return {}
+
+        with self._lock:
+            # a new version of the file is a new inode, see `write()`
+            key = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+            if self._stat != key:
+                vaults = json.loads(self.path.read_text())["vaults"]
+                entries = vaults.get(normalize_vault_url(self.vault_url), {})
+                self._secrets = {
+                    name.lower(): _secret(
+                        self.vault_url, name, entry["value"], entry.get("version")
+                    )
+                    for name, entry in entries.items()
+                }
+                self._stat = key
+            return self._secrets
+
+
+def _secret(
+    vault_url: str, name: str, value: Optional[str], version: Optional[str] = None
+) -> "KeyVaultSecret":
+    from azure.keyvault.secrets import (  # pylint: disable=C0415
+        KeyVaultSecret,
+        SecretProperties,
+    )
+
+    secret_id = f"{vault_url.rstrip('/')}/secrets/{name}"
+    if version:
+        secret_id = f"{secret_id}/{version}"
+    return KeyVaultSecret(SecretProperties(None, secret_id), value)
+
+
+def _as_dict(
+    vault_url: str, name: str, secret: Union[str, "KeyVaultSecret"]
+) -> Dict[str, Optional[str]]:
+    if isinstance(secret, str):
+        secret = _secret(vault_url, name, secret)
+    return {"value": value_text(secret.value), "version": secret.properties.version}
@@ -0,0 +1,186 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Hashable,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+)
+
+from pydantic_azure_secrets.clients import normalize_vault_url, register_after_fork
+
+CacheKey = Tuple[str, str, Optional[str]]
+
+
+class CachedSecret(NamedTuple):
+    # None means that the secret was not found in the key vault
+    secret: Optional[Any]
+    expires_at: float
+
+
+class SecretCache:
+    """
+    Thread-safe in-memory cache of key vault secrets, keyed by
+    (vault URL, secret name, version).
+
+    Every entry expires after `ttl` seconds, secrets which were not found
+    in the key vault are cached for `not_found_ttl` seconds. When the cache
+    holds more than `maxsize` entries, the least recently used ones
+    are evicted. `hits` and `misses` count the lookups.
+
+    The same instance can be set as `Config.azure_keyvault_cache`
+    of several settings classes to share the cached secrets between them.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        ttl: float = 300.0,
+        not_found_ttl: float = 60.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.not_found_ttl = not_found_ttl
+        self.hits = 0
+        self.misses = 0
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[CacheKey, CachedSecret]" = OrderedDict()
+
+    def get(
+        self, vault_url: str, name: str, version: Optional[str] = None
+    ) -> Optional[CachedSecret]:
+        key = _key(vault_url, name, version)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at <= self._clock():
+                del self._entries[key]
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def set(
+        self,
+        vault_url: str,
+        name: str,
+        secret: Optional[Any],
+        version: Optional[str] = None,
+    ) -> None:
+        ttl = self.ttl if secret is not None else self.not_found_ttl
+        if ttl <= 0 or self.maxsize <= 0:
+            return
+
+        key = _key(vault_url, name, version)
+        with self._lock:
+            self._entries[key] = CachedSecret(secret, self._clock() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def get_many(
+        self, vault_url: str, names: Iterable[str]
+    ) -> Tuple[Dict[str, Optional[Any]], List[str]]:
+        """
+        Split the names into the cached secrets and the names to fetch.
+        """
+        cached: Dict[str, Optional[Any]] = {}
+        missing: List[str] = []
+        for name in names:
+            entry = self.get(vault_url, name)
+            if entry is None:
+                missing.append(name)
+            else:
+                cached[name] = entry.secret
+        return cached, missing
+
+    def invalidate(self, vault_url: str, name: Optional[str] = None) -> None:
+        vault_url = normalize_vault_url(vault_url)
+        if name is not None:
+            name = name.lower()
+        with self._lock:
+            for key in list(self._entries):
+                if key[0] == vault_url and name in (None, key[1]):
+                    del self._entries[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class InstanceCache:
+    """
+    Thread-safe LRU cache of settings instances by the fingerprint of
+    their inputs, see `AzureVaultSettings.cached()`. It holds at most
+    `maxsize` instances. `hits` and `misses` count the lookups.
+
+    It is emptied in every forked child process: the instances may hold
+    the key vault clients of the parent, see `Config.azure_keyvault_lazy`.
+    """
+
+    def __init__(self, maxsize: int = 16) -> None:
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        register_after_fork(self, InstanceCache._after_fork)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            instance = self._entries.get(key)
+            if instance is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return instance
+
+    def add(self, key: Hashable, instance: Any) -> Any:
+        """
+        Cache the instance and return it, or return the instance cached
+        for the same key by another thread in the meantime.
+        """
+        if self.maxsize <= 0:
+            return instance
+        with self._lock:
+            instance = self._entries.setdefault(key, instance)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+            return instance
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _after_fork(self) -> None:
+        self._lock = threading.Lock()
+        self.clear()
+
+
+def _key(vault_url: str, name: str, version: Optional[str]) -> CacheKey:
+    # Secret names are case-insensitive
+    return normalize_vault_url(vault_url), name.lower(), version
@@ -0,0 +1,287 @@
+"""
+Command line interface, e.g. to resolve the key vault secrets once in
+a deployment pipeline instead of in every replica at startup:
+
+    python -m pydantic_azure_secrets export app.settings:Settings --dotenv .env
+    python -m pydantic_azure_secrets export app.settings:Settings --secrets-dir run
+    python -m pydantic_azure_secrets export app.settings:Settings --dry-run
+
+The exported files are read by the sources with a higher priority than
+the key vault (dotenv file, secrets directory), so the replicas don't query
+the key vault at all.
+"""
+
+import argparse
+import importlib
+import json
+import logging
+import os
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Type
+
+from pydantic import ValidationError
+from pydantic.env_settings import SettingsError
+from pydantic.fields import ModelField
+from pydantic.utils import lenient_issubclass
+
+from pydantic_azure_secrets.azure_vault_settings import AzureVaultSettings
+from pydantic_azure_secrets.backends import FileBackend
+from pydantic_azure_secrets.instrumentation import LoadReport
+from pydantic_azure_secrets.secret_file import SecretFile
+from pydantic_azure_secrets.snapshot import write_private_file
+
+DEFAULT_MAX_WORKERS = 16
+
+
+class ExportError(Exception):
+    pass
+
+
+def load_settings_class(path: str) -> Type[AzureVaultSettings]:
+    """
+    Import the settings class from "module:Class".
+    """
+    module_name, _, class_name = path.partition(":")
+    if not module_name or not class_name:
+        raise ExportError(f"{path!r} is not in the module:Class format")
+    obj: Any = importlib.import_module(module_name)
+    for attr in class_name.split("."):
+        obj = getattr(obj, attr, None)
+    if not lenient_issubclass(obj, AzureVaultSettings):
+        raise ExportError(f"{path} is not an AzureVaultSettings subclass")
+    return obj  # type: ignore
+
+
+class Export:
+    """
+    The values of the fields found in the key vault, with the secrets by
+    key vault and the `LoadReport` of the construction.
+    """
+
+    def __init__(
+        self,
+        settings: AzureVaultSettings,
+        keyvault_values: Dict[str, Any],
+        report: LoadReport,
+    ) -> None:
+        self.settings = settings
+        self.keyvault_values = keyvault_values
+        self.report = report
+
+    def variables(self, files_dir: Path, allow_complex: bool = True) -> Dict[str, str]:
+        """
+        The values by environment variable name, as the dotenv file and
+        the secrets directory sources read them. A `SecretFile` value is
+        the path of a file, so the secret is written to a file of
+        `files_dir` and its absolute path is exported.
+        """
+        config = self.settings.__config__
+        variables = {}
+        for field_name, value in self.keyvault_values.items():
+            field = self.settings.__fields__[field_name]
+            if value is None:
+                continue
+            if isinstance(value, SecretFile):
+                if not files_dir.exists():
+                    files_dir.mkdir(mode=0o700, parents=True)
+                path = files_dir / _env_name(field)
+                write_private_file(path, value.read_bytes())
+                value = str(path.resolve())
+            elif field.is_complex():
+                if not allow_complex:
+                    raise ExportError(
+                        f"{field_name} is not parsed from JSON when it is read from "
+                        f"the secrets directory, use --dotenv instead"
+                    )
+                if not isinstance(value, str):
+                    value = config.json_dumps(value)
+            variables[_env_name(field)] = value
+        return variables
+
+    def write_dotenv(self, path: Path) -> int:
+        lines = []
+        for name, value in self.variables(_files_dir(path)).items():
+            if "${" in value:
+                # python-dotenv expands ${VAR} even in quoted values
+                raise ExportError(
+                    f"{name} cannot be written to a dotenv file, "
+                    f"use --secrets-dir instead"
+                )
+            escaped = (
+                value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+            )
+            lines.append(f'{name}="{escaped}"\n')
+        write_private_file(path, "".join(lines).encode())
+        return len(lines)
+
+    def write_secrets_dir(self, path: Path) -> int:
+        variables = self.variables(_files_dir(path), allow_complex=False)
+        if not path.exists():
+            path.mkdir(mode=0o700, parents=True)
+        for name, value in variables.items():
+            write_private_file(path / name, value.encode())
+        return len(variables)
+
+    def write_file_backend(self, path: Path) -> int:
+        count = 0
+        for vault_url, secrets in self.settings.keyvault_secrets().items():
+            FileBackend.write(path, vault_url, secrets)
+            count += len(secrets)
+        return count
+
+
+def resolve(
+    settings_cls: Type[AzureVaultSettings],
+    vaults: Optional[List[str]] = None,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+) -> Export:
+    """
+    Construct and validate the settings, fetching the secrets of all
+    the fields concurrently, and return the values found in the key vault.
+    """
+    reports: List[LoadReport] = []
+    keyvault_values: Dict[str, Any] = {}
+
+    class ExportSettings(settings_cls):  # type: ignore
+        def _build_keyvault(self, *args: Any, **kwargs: Any) -> Dict[str, Any]:
+            values = super()._build_keyvault(*args, **kwargs)
+            keyvault_values.update(values)
+            return values
+
+        class Config:
+            # the other sources of the pipeline are not the ones of the replicas
+            azure_keyvault_skip_resolved = False
+            azure_keyvault_lazy = False
+            azure_keyvault_max_workers = max_workers
+            azure_keyvault_instrumentation = reports.append
+
+    ExportSettings.__name__ = settings_cls.__name__
+    settings = ExportSettings(_azure_keyvault=vaults or None)
+    return Export(settings, keyvault_values, reports[0])
+
+
+def _files_dir(path: Path) -> Path:
+    # next to the export, e.g. .env.files/ for .env
+    return path.with_name(f"{path.name}.files")
+
+
+def _env_name(field: ModelField) -> str:
+    env_names = field.field_info.extra["env_names"]
+    # pydantic looks up the env names of a list in order, a set in any order
+    return env_names[0] if isinstance(env_names, list) else min(env_names)
+
+
+def format_report(report: LoadReport, slowest: int = 5) -> List[str]:
+    latencies = report.secret_latencies
+    lines = [
+        f"{report.settings_name} resolved in {report.total:.3f}s",
+        *(
+            f"  {source}: {duration:.3f}s"
+            for source, duration in report.durations.items()
+        ),
+        f"  key vault requests: {len(latencies)}, not found: {report.not_found}, "
+        f"retries: {report.retries}, cache hits: {report.cache_hits}",
+    ]
+    for name in sorted(latencies, key=latencies.__getitem__, reverse=True)[:slowest]:
+        lines.append(f"  {name}: {latencies[name]:.3f}s")
+    return lines
+
+
+def export(args: argparse.Namespace) -> int:
+    settings_cls = load_settings_class(args.settings)
+
+    if args.dry_run:
+        requests = settings_cls.keyvault_requests(args.keyvault)
+        for vault_url, names in requests.items():
+            print(vault_url)
+            for name in names:
+                print(f"  {name}")
+        return 0
+
+    result = resolve(settings_cls, args.keyvault, args.max_workers)
+    for line in format_report(result.report):
+        print(line, file=sys.stderr)
+
+    if args.dotenv:
+        count = result.write_dotenv(Path(args.dotenv))
+        print(f"{count} values written to {args.dotenv}", file=sys.stderr)
+    if args.secrets_dir:
+        count = result.write_secrets_dir(Path(args.secrets_dir))
+        print(f"{count} values written to {args.secrets_dir}", file=sys.stderr)
+    if args.file_backend:
+        count = result.write_file_backend(Path(args.file_backend))
+        print(f"{count} secrets written to {args.file_backend}", file=sys.stderr)
+    if args.json:
+        print(json.dumps(result.report.as_dict()))
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m pydantic_azure_secrets")
+    commands = parser.add_subparsers(dest="command")
+    commands.required = True
+
+    export_parser = commands.add_parser(
+        "export",
+        help="resolve the key vault secrets of a settings class once",
+        description=(
+            "Construct the settings, fetching the key vault secrets of all the "
+            "fields concurrently, and write the values found in the key vault "
+            "where the dotenv file or the secrets directory source reads them."
+        ),
+    )
+    export_parser.add_argument("settings", help="the settings class, module:Class")
+    export_parser.add_argument(
+        "--dotenv", metavar="PATH", help="write the values to a dotenv file"
+    )
+    export_parser.add_argument(
+        "--secrets-dir",
+        metavar="PATH",
+        help="write every value to a file of the secrets directory",
+    )
+    export_parser.add_argument(
+        "--file-backend",
+        metavar="PATH",
+        help="write the secrets to the JSON file of a FileBackend",
+    )
+    export_parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="list the secret names which would be requested from every key vault",
+    )
+    export_parser.add_argument(
+        "--keyvault",
+        metavar="URL",
+        action="append",
+        help="query this key vault instead of Config.azure_keyvault, repeatable",
+    )
+    export_parser.add_argument(
+        "--max-workers",
+        type=int,
+        default=DEFAULT_MAX_WORKERS,
+        metavar="N",
+        help=f"fetch the secrets with N threads ({DEFAULT_MAX_WORKERS})",
+    )
+    export_parser.add_argument(
+        "--json", action="store_true", help="print the LoadReport as JSON"
+    )
+    export_parser.set_defaults(handler=export)
+    return parser
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if not args.dry_run and not (args.dotenv or args.secrets_dir or args.file_backend):
+        parser.error("one of --dotenv, --secrets-dir, --file-backend or --dry-run")
+
+    logging.basicConfig(level=logging.WARNING)
+    # like `python -m`, e.g. for the `pydantic-azure-secrets` console script
+    if os.getcwd() not in sys.path:
+        sys.path.insert(0, os.getcwd())
+    try:
+        return int(args.handler(args))
+    except (ExportError, SettingsError, ValidationError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
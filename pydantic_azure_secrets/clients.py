@@ -0,0 +1,104 @@
+import logging
+import os
+import threading
+import weakref
+from typing import Any, Callable, Dict, Hashable, Tuple, TypeVar
+
+logger = logging.getLogger(__name__)
+
+ClientT = TypeVar("ClientT")
+ObjT = TypeVar("ObjT")
+
+
+def register_after_fork(obj: ObjT, callback: Callable[[ObjT], None]) -> None:
+    """
+    Call `callback(obj)` in the child process after `os.fork()`,
+    as long as `obj` is alive.
+    """
+    if not hasattr(os, "register_at_fork"):
+        # Python 3.6 and Windows
+        return
+
+    ref = weakref.ref(obj)
+
+    def after_in_child() -> None:
+        alive = ref()
+        if alive is not None:
+            callback(alive)
+
+    os.register_at_fork(after_in_child=after_in_child)
+
+
+class ClientRegistry:
+    """
+    Thread-safe registry of azure credentials and key vault clients.
+
+    A credential is created once per credential factory and a client once per
+    vault URL and credential, so access tokens and HTTP connection pools are
+    reused by all the settings classes which use the same key vault.
+
+    `close()` closes and forgets everything, e.g. at the end of the tests.
+    `reset()` only forgets the objects without closing them. It is called
+    in every forked child process, which must not use the sockets and
+    the access tokens of its parent.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._credentials: Dict[Hashable, Any] = {}
+        self._clients: Dict[Tuple[str, Hashable], Any] = {}
+        register_after_fork(self, ClientRegistry._after_fork)
+
+    def get_client(
+        self,
+        vault_url: str,
+        client_factory: Callable[[Any], ClientT],
+        credential_factory: Callable[[], Any],
+    ) -> ClientT:
+        # The bound classmethods of the subclasses are all different,
+        # but they share a credential unless the factory is overridden
+        credential_key = getattr(credential_factory, "__func__", credential_factory)
+        client_key = (normalize_vault_url(vault_url), credential_key)
+
+        with self._lock:
+            client = self._clients.get(client_key)
+            if client is None:
+                credential = self._credentials.get(credential_key)
+                if credential is None:
+                    credential = credential_factory()
+                    self._credentials[credential_key] = credential
+                client = client_factory(credential)
+                self._clients[client_key] = client
+            return client  # type: ignore
+
+    def close(self) -> None:
+        with self._lock:
+            objects = [*self._clients.values(), *self._credentials.values()]
+            self._clients.clear()
+            self._credentials.clear()
+
+        for obj in objects:
+            try:
+                obj.close()
+            except Exception:  # pylint: disable=broad-except
+                logger.warning("Failed to close %r", obj, exc_info=True)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._clients.clear()
+            self._credentials.clear()
+
+    def _after_fork(self) -> None:
+        # The lock may have been held by another thread of the parent
+        self._lock = threading.Lock()
+        self.reset()
+
+    def __len__(self) -> int:
+        return len(self._clients)
+
+
+shared_clients = ClientRegistry()
+
+
+def normalize_vault_url(vault_url: str) -> str:
+    return vault_url.rstrip("/").lower()
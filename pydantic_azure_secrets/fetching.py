@@ -0,0 +1,479 @@
+import time
+from contextlib import contextmanager
+from functools import partial
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    FrozenSet,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+    Union,
+    cast,
+)
+
+from pydantic_azure_secrets.backends import SecretBackend
+from pydantic_azure_secrets.clients import normalize_vault_url
+from pydantic_azure_secrets.secret_file import SecretFile, value_text
+from pydantic_azure_secrets.secret_names import VaultSecrets
+from pydantic_azure_secrets.singleflight import single_flight
+from pydantic_azure_secrets.throttling import SDK_REQUEST_OPTIONS
+
+if TYPE_CHECKING:
+    from azure.core.credentials_async import AsyncTokenCredential
+    from azure.keyvault.secrets import KeyVaultSecret, SecretClient, SecretProperties
+    from azure.keyvault.secrets.aio import SecretClient as AsyncSecretClient
+
+    from pydantic_azure_secrets.azure_vault_settings import AzureVaultSettings
+
+DEFAULT_ASYNC_CONCURRENCY = 10
+
+# Where the secrets of a key vault are fetched from
+SecretSource = Union["SecretClient", SecretBackend]
+T = TypeVar("T")
+
+
+class SecretFetcher:
+    """
+    Fetches the key vault secrets of a settings instance as its `Config`
+    sets it up: from the snapshot, the cache, the backends or the key vault
+    clients, with the scheduler, in parallel, reporting every request.
+    """
+
+    def __init__(self, settings: "AzureVaultSettings") -> None:
+        self.config = settings.__config__
+        # Set during the construction only
+        self.report = getattr(settings, "_azure_report", None)
+        self.secret_file_names: FrozenSet[str] = settings.__azure_secret_file_names__
+
+    def get_clients(self, vaults: Iterable[str]) -> Dict[str, SecretSource]:
+        clients: Dict[str, SecretSource] = {}
+        for vault_url in vaults:
+            secret_client = self.config.get_azure_backend(
+                vault_url
+            ) or self.config.get_azure_client(vault_url)
+            if secret_client is not None:
+                clients[vault_url] = secret_client
+        return clients
+
+    def fetch_vaults(
+        self, clients: Dict[str, SecretSource], requests: Dict[str, List[str]]
+    ) -> Dict[str, VaultSecrets]:
+        """
+        Fetch the names from several key vaults concurrently,
+        None for the names which were not found.
+        """
+        # imported on the first use, like the azure SDK
+        from concurrent.futures import ThreadPoolExecutor  # pylint: disable=C0415
+
+        def fetch(vault_url: str) -> VaultSecrets:
+            names = requests[vault_url]
+            fetched = self.fetch_secrets(clients[vault_url], names)
+            return {name: fetched.get(name) for name in names}
+
+        if len(requests) > 1:
+            with ThreadPoolExecutor(
+                max_workers=len(requests), thread_name_prefix="azure-keyvault-vault"
+            ) as executor:
+                return dict(zip(requests, executor.map(fetch, requests)))
+        return {vault_url: fetch(vault_url) for vault_url in requests}
+
+    async def afetch_vaults(
+        self, requests: Dict[str, List[str]]
+    ) -> Dict[str, VaultSecrets]:
+        """
+        The same as `fetch_vaults` with the asyncio key vault clients,
+        which are created and closed here.
+        """
+        import asyncio  # pylint: disable=C0415
+
+        config = self.config
+        backends = {
+            vault_url: config.get_azure_backend(vault_url) for vault_url in requests
+        }
+
+        async def fetch(
+            vault_url: str, credential: Optional["AsyncTokenCredential"]
+        ) -> VaultSecrets:
+            names = requests[vault_url]
+            backend = backends[vault_url]
+            if backend is not None:
+                fetched = await self.afetch_from_snapshot(
+                    vault_url, names, partial(self.afetch_backend_secrets, backend)
+                )
+            else:
+                # the credential is created if any key vault has no backend
+                async with config.get_azure_async_client(
+                    vault_url, cast("AsyncTokenCredential", credential)
+                ) as secret_client:
+                    fetched = await self.afetch_from_snapshot(
+                        vault_url, names, partial(self.afetch_secrets, secret_client)
+                    )
+            return {name: fetched.get(name) for name in names}
+
+        # the key vaults are queried concurrently
+        if any(backend is None for backend in backends.values()):
+            async with config.get_azure_async_credential() as credential:
+                results = await asyncio.gather(
+                    *(fetch(url, credential) for url in requests)
+                )
+        else:
+            results = await asyncio.gather(*(fetch(url, None) for url in requests))
+        return dict(zip(requests, results))
+
+    def fetch_secrets(
+        self, secret_client: SecretSource, names: List[str]
+    ) -> Dict[str, "KeyVaultSecret"]:
+        """
+        Fetch the secrets by names, from `Config.azure_keyvault_snapshot`
+        if it is set and fresh, otherwise from the key vault.
+        Names which are not found in the key vault are omitted.
+        """
+        snapshot = self.config.azure_keyvault_snapshot
+        if snapshot is None:
+            return self.fetch_keyvault_secrets(secret_client, names)
+
+        secrets = snapshot.fetch(
+            secret_client.vault_url,
+            list(dict.fromkeys(names)),
+            partial(self.fetch_keyvault_secrets, secret_client),
+        )
+        # the snapshot holds the values themselves
+        return {
+            name: self.to_secret_file(name, secret) for name, secret in secrets.items()
+        }
+
+    def fetch_keyvault_secrets(
+        self, secret_client: SecretSource, names: List[str]
+    ) -> Dict[str, "KeyVaultSecret"]:
+        """
+        Fetch the secrets by names, in parallel if
+        `Config.azure_keyvault_max_workers` is set.
+        Names which are not found in the key vault are omitted.
+        """
+        from concurrent.futures import ThreadPoolExecutor  # pylint: disable=C0415
+
+        cached, unique_names = self._cached_secrets(secret_client, names)
+        if isinstance(secret_client, SecretBackend):
+            with self._measure_backend(unique_names) as fetched:
+                if unique_names:
+                    fetched.update(secret_client.get_many(unique_names))
+            return self._store_secrets(
+                secret_client,
+                cached,
+                unique_names,
+                [fetched.get(name) for name in unique_names],
+            )
+        scheduler = self.config.azure_keyvault_scheduler
+        deadline = scheduler.start() if scheduler is not None else None
+        names_to_fetch = unique_names
+        if self.config.azure_keyvault_list_secrets and unique_names:
+            names_to_fetch = _existing_names(
+                unique_names,
+                self._call_keyvault(
+                    secret_client,
+                    partial(_list_secrets_properties, secret_client),
+                    deadline,
+                ),
+            )
+
+        max_workers = self.config.azure_keyvault_max_workers
+        get_secret = partial(
+            self._get_keyvault_secret, secret_client, deadline=deadline
+        )
+
+        if max_workers and max_workers > 1 and len(names_to_fetch) > 1:
+            with ThreadPoolExecutor(
+                max_workers=min(max_workers, len(names_to_fetch)),
+                thread_name_prefix="azure-keyvault",
+            ) as executor:
+                secrets = list(executor.map(get_secret, names_to_fetch))
+        else:
+            secrets = [get_secret(name) for name in names_to_fetch]
+
+        fetched = dict(zip(names_to_fetch, secrets))
+        return self._store_secrets(
+            secret_client,
+            cached,
+            unique_names,
+            [fetched.get(name) for name in unique_names],
+        )
+
+    async def afetch_from_snapshot(
+        self,
+        vault_url: str,
+        names: List[str],
+        fetch: Callable[[List[str]], Awaitable[Dict[str, "KeyVaultSecret"]]],
+    ) -> Dict[str, "KeyVaultSecret"]:
+        """
+        The same as `fetch_secrets` with a coroutine function `fetch`.
+        """
+        snapshot = self.config.azure_keyvault_snapshot
+        if snapshot is None:
+            return await fetch(names)
+
+        secrets = await snapshot.afetch(vault_url, list(dict.fromkeys(names)), fetch)
+        # the snapshot holds the values themselves
+        return {
+            name: self.to_secret_file(name, secret) for name, secret in secrets.items()
+        }
+
+    async def afetch_secrets(
+        self, secret_client: "AsyncSecretClient", names: List[str]
+    ) -> Dict[str, "KeyVaultSecret"]:
+        """
+        Fetch the secrets by names concurrently, at most
+        `Config.azure_keyvault_max_workers` requests at a time.
+        Names which are not found in the key vault are omitted.
+        """
+        import asyncio  # pylint: disable=C0415
+
+        from azure.core.exceptions import ResourceNotFoundError  # pylint: disable=C0415
+
+        cached, unique_names = self._cached_secrets(secret_client, names)
+        scheduler = self.config.azure_keyvault_scheduler
+        deadline = scheduler.start() if scheduler is not None else None
+        report = self.report
+        on_retry = report.record_retry if report is not None else None
+        options = SDK_REQUEST_OPTIONS if scheduler is not None else {}
+
+        async def call_keyvault(request: Callable[[], Awaitable[T]]) -> T:
+            if scheduler is None:
+                return await request()
+            return await scheduler.acall(
+                secret_client.vault_url, request, deadline, on_retry
+            )
+
+        names_to_fetch = unique_names
+        if self.config.azure_keyvault_list_secrets and unique_names:
+
+            async def list_secrets_properties() -> List["SecretProperties"]:
+                return [
+                    properties
+                    async for properties in secret_client.list_properties_of_secrets(
+                        **options
+                    )
+                ]
+
+            names_to_fetch = _existing_names(
+                unique_names, await call_keyvault(list_secrets_properties)
+            )
+
+        semaphore = asyncio.Semaphore(
+            self.config.azure_keyvault_max_workers or DEFAULT_ASYNC_CONCURRENCY
+        )
+
+        single_flight_key = None
+        if self.config.azure_keyvault_single_flight:
+            single_flight_key = partial(_single_flight_key, secret_client.vault_url)
+
+        async def get_secret(name: str) -> Optional["KeyVaultSecret"]:
+            async def request() -> Optional["KeyVaultSecret"]:
+                try:
+                    return await secret_client.get_secret(name, **options)
+                except ResourceNotFoundError:
+                    return None
+
+            async with semaphore:
+                started = time.perf_counter()
+                if single_flight_key is None:
+                    secret = await call_keyvault(request)
+                else:
+                    secret = await single_flight.ado(
+                        single_flight_key(name), partial(call_keyvault, request)
+                    )
+                if report is not None:
+                    latency = time.perf_counter() - started
+                    report.record_secret(name, latency, secret is not None)
+                return secret
+
+        secrets = await asyncio.gather(*(get_secret(name) for name in names_to_fetch))
+        fetched = dict(zip(names_to_fetch, secrets))
+        return self._store_secrets(
+            secret_client,
+            cached,
+            unique_names,
+            [fetched.get(name) for name in unique_names],
+        )
+
+    async def afetch_backend_secrets(
+        self, backend: SecretBackend, names: List[str]
+    ) -> Dict[str, "KeyVaultSecret"]:
+        cached, unique_names = self._cached_secrets(backend, names)
+        with self._measure_backend(unique_names) as fetched:
+            if unique_names:
+                fetched.update(await backend.aget_many(unique_names))
+        return self._store_secrets(
+            backend, cached, unique_names, [fetched.get(name) for name in unique_names]
+        )
+
+    def to_secret_file(self, name: str, secret: "KeyVaultSecret") -> "KeyVaultSecret":
+        """
+        Replace the value of a secret of a `SecretFile` field by the handle
+        of a file, so that the value itself is not kept in memory.
+        """
+        if (
+            secret.value is None
+            or isinstance(secret.value, SecretFile)
+            or name.lower() not in self.secret_file_names
+        ):
+            return secret
+
+        from azure.keyvault.secrets import KeyVaultSecret  # pylint: disable=C0415
+
+        handle = SecretFile.for_secret(
+            secret, self.config.azure_keyvault_secret_files_dir
+        )
+        return KeyVaultSecret(secret.properties, handle)  # type: ignore
+
+    @contextmanager
+    def _measure_backend(self, names: List[str]) -> Iterator[VaultSecrets]:
+        """
+        Report the names fetched at once from a backend,
+        all of them with the latency of the batch.
+        """
+        fetched: VaultSecrets = {}
+        started = time.perf_counter()
+        yield fetched
+        if self.report is not None:
+            latency = time.perf_counter() - started
+            for name in names:
+                self.report.record_secret(name, latency, fetched.get(name) is not None)
+
+    def _cached_secrets(
+        self,
+        secret_client: Union["SecretClient", "AsyncSecretClient", SecretBackend],
+        names: List[str],
+    ) -> Tuple[Dict[str, Optional["KeyVaultSecret"]], List[str]]:
+        """
+        Split the names into the secrets from `Config.azure_keyvault_cache`
+        and the unique names which must be fetched from the key vault.
+        """
+        unique_names = list(dict.fromkeys(names))
+        cache = self.config.azure_keyvault_cache
+        if cache is None:
+            return {}, unique_names
+
+        cached, missing = cache.get_many(secret_client.vault_url, unique_names)
+        if self.report is not None:
+            self.report.record_cache(len(cached), len(missing))
+        return (
+            {
+                name: self._from_cache(name, secret) if secret is not None else None
+                for name, secret in cached.items()
+            },
+            missing,
+        )
+
+    def _get_keyvault_secret(
+        self, secret_client: "SecretClient", name: str, deadline: Optional[float] = None
+    ) -> Optional["KeyVaultSecret"]:
+        started = time.perf_counter()
+        request = partial(
+            self._call_keyvault,
+            secret_client,
+            partial(_get_secret, secret_client, name),
+            deadline,
+        )
+        if self.config.azure_keyvault_single_flight:
+            key = _single_flight_key(secret_client.vault_url, name)
+            secret = single_flight.do(key, request)
+        else:
+            secret = request()
+        if self.report is not None:
+            latency = time.perf_counter() - started
+            self.report.record_secret(name, latency, secret is not None)
+        return secret
+
+    def _call_keyvault(
+        self,
+        secret_client: "SecretClient",
+        request: Callable[..., T],
+        deadline: Optional[float] = None,
+    ) -> T:
+        """
+        Send the request with `Config.azure_keyvault_scheduler` if it is set.
+        """
+        scheduler = self.config.azure_keyvault_scheduler
+        if scheduler is None:
+            return request()
+
+        return scheduler.call(
+            secret_client.vault_url,
+            partial(request, **SDK_REQUEST_OPTIONS),
+            deadline,
+            self.report.record_retry if self.report is not None else None,
+        )
+
+    def _store_secrets(
+        self,
+        secret_client: Union["SecretClient", "AsyncSecretClient", SecretBackend],
+        cached: Dict[str, Optional["KeyVaultSecret"]],
+        names: List[str],
+        secrets: List[Optional["KeyVaultSecret"]],
+    ) -> Dict[str, "KeyVaultSecret"]:
+        secrets = [
+            self.to_secret_file(name, secret) if secret is not None else None
+            for name, secret in zip(names, secrets)
+        ]
+        cache = self.config.azure_keyvault_cache
+        if cache is not None:
+            for name, secret in zip(names, secrets):
+                cache.set(secret_client.vault_url, name, secret)
+
+        fetched = {**cached, **dict(zip(names, secrets))}
+        return {name: secret for name, secret in fetched.items() if secret is not None}
+
+    def _from_cache(self, name: str, secret: "KeyVaultSecret") -> "KeyVaultSecret":
+        """
+        The cached secret as this class declares it: the cache may be shared
+        with classes which declare the same secret with another type.
+        """
+        if (
+            isinstance(secret.value, SecretFile)
+            and name.lower() not in self.secret_file_names
+        ):
+            from azure.keyvault.secrets import KeyVaultSecret  # pylint: disable=C0415
+
+            return KeyVaultSecret(secret.properties, value_text(secret.value))
+        return self.to_secret_file(name, secret)
+
+
+def _existing_names(
+    names: List[str], secrets_properties: Iterable["SecretProperties"]
+) -> List[str]:
+    # Secret names are case-insensitive in the key vault
+    existing = {
+        properties.name.lower()
+        for properties in secrets_properties
+        if properties.name is not None
+    }
+    return [name for name in names if name.lower() in existing]
+
+
+def _single_flight_key(vault_url: str, name: str) -> Tuple[str, str]:
+    # Secret names are case-insensitive in the key vault
+    return normalize_vault_url(vault_url), name.lower()
+
+
+def _list_secrets_properties(
+    secret_client: "SecretClient", **kwargs: Any
+) -> List["SecretProperties"]:
+    return list(secret_client.list_properties_of_secrets(**kwargs))
+
+
+def _get_secret(
+    secret_client: "SecretClient", name: str, **kwargs: Any
+) -> Optional["KeyVaultSecret"]:
+    from azure.core.exceptions import ResourceNotFoundError  # pylint: disable=C0415
+
+    try:
+        return secret_client.get_secret(name, **kwargs)
+    except ResourceNotFoundError:
+        return None
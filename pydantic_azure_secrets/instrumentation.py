@@ -0,0 +1,174 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+
+class LoadReport:
+    """
+    Timings and counters of one settings construction.
+
+    Only the names of the sources and of the secrets are reported,
+    never their values:
+        - `durations`: seconds spent per source ("secrets_dir", "environ",
+    "keyvault") and in the "validation";
+        - `secret_latencies`: seconds per key vault request, by secret name;
+        - `cache_hits`, `cache_misses`: lookups in `Config.azure_keyvault_cache`;
+        - `not_found`: secrets which were not found in the key vault;
+        - `retries`: throttled key vault requests retried by `VaultScheduler`.
+    """
+
+    def __init__(self, settings_name: str) -> None:
+        self.settings_name = settings_name
+        self.started_at = time.time()
+        self.total = 0.0
+        self.durations: Dict[str, float] = {}
+        self.secret_latencies: Dict[str, float] = {}
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.not_found = 0
+        self.retries = 0
+        self._started = time.perf_counter()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def measure(self, source: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self.durations[source] = self.durations.get(source, 0.0) + elapsed
+
+    def record_secret(self, name: str, latency: float, found: bool) -> None:
+        with self._lock:
+            self.secret_latencies[name] = latency
+            if not found:
+                self.not_found += 1
+
+    def record_cache(self, hits: int, misses: int) -> None:
+        with self._lock:
+            self.cache_hits += hits
+            self.cache_misses += misses
+
+    def record_retry(self) -> None:
+        with self._lock:
+            self.retries += 1
+
+    def finish(self) -> None:
+        self.total = time.perf_counter() - self._started
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "settings": self.settings_name,
+            "started_at": self.started_at,
+            "total": self.total,
+            "durations": dict(self.durations),
+            "secret_latencies": dict(self.secret_latencies),
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+            "not_found": self.not_found,
+            "retries": self.retries,
+        }
+
+
+@contextmanager
+def measure(report: Optional[LoadReport], source: str) -> Iterator[None]:
+    """
+    `report.measure(source)`, or nothing if there is no report.
+    """
+    if report is None:
+        yield
+    else:
+        with report.measure(source):
+            yield
+
+
+class OpenTelemetryReporter:
+    """
+    Reports every construction as an OpenTelemetry span with the durations,
+    the latencies of the key vault requests and the counters as attributes:
+
+        class Config:
+            azure_keyvault_instrumentation = OpenTelemetryReporter()
+    """
+
+    def __init__(self, tracer: Optional[Any] = None) -> None:
+        if tracer is None:
+            try:
+                from opentelemetry import trace  # pylint: disable=C0415
+            except ImportError as e:
+                raise ImportError(
+                    "opentelemetry is not installed, "
+                    "run `pip install opentelemetry-api`"
+                ) from e
+            tracer = trace.get_tracer(__name__)
+        self.tracer = tracer
+
+    def __call__(self, report: LoadReport) -> None:
+        started_at = int(report.started_at * 1e9)
+        span = self.tracer.start_span(
+            f"{report.settings_name} load", start_time=started_at
+        )
+        for source, duration in report.durations.items():
+            span.set_attribute(f"azure_keyvault.duration.{source}", duration)
+        for name, latency in report.secret_latencies.items():
+            span.set_attribute(f"azure_keyvault.secret_latency.{name}", latency)
+        span.set_attribute("azure_keyvault.cache_hits", report.cache_hits)
+        span.set_attribute("azure_keyvault.cache_misses", report.cache_misses)
+        span.set_attribute("azure_keyvault.not_found", report.not_found)
+        span.set_attribute("azure_keyvault.retries", report.retries)
+        span.end(end_time=started_at + int(report.total * 1e9))
+
+
+class PrometheusReporter:
+    """
+    Aggregates the reports into Prometheus-style counters, `render()`
+    returns them in the Prometheus text exposition format:
+
+        reporter = PrometheusReporter()
+
+        class Config:
+            azure_keyvault_instrumentation = reporter
+
+        reporter.render()
+    """
+
+    def __init__(self, prefix: str = "pydantic_azure_secrets") -> None:
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._metrics: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = {}
+
+    def __call__(self, report: LoadReport) -> None:
+        settings = (("settings", report.settings_name),)
+        with self._lock:
+            self._inc("loads_total", settings, 1)
+            self._inc("load_seconds_sum", settings, report.total)
+            for source, duration in report.durations.items():
+                labels = settings + (("source", source),)
+                self._inc("source_seconds_sum", labels, duration)
+            for name, latency in report.secret_latencies.items():
+                labels = settings + (("secret", name),)
+                self._inc("secret_fetch_seconds_sum", labels, latency)
+                self._inc("secret_fetch_seconds_count", labels, 1)
+            self._inc("cache_hits_total", settings, report.cache_hits)
+            self._inc("cache_misses_total", settings, report.cache_misses)
+            self._inc("not_found_total", settings, report.not_found)
+            self._inc("retries_total", settings, report.retries)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = sorted(self._metrics.items())
+
+        lines: List[str] = []
+        for (name, labels), value in metrics:
+            labels_text = ",".join(f'{label}="{text}"' for label, text in labels)
+            lines.append(f"{self.prefix}_{name}{{{labels_text}}} {value}")
+        return "\n".join(lines) + "\n"
+
+    def _inc(
+        self, name: str, labels: Tuple[Tuple[str, str], ...], value: float
+    ) -> None:
+        key = (name, labels)
+        self._metrics[key] = self._metrics.get(key, 0) + value
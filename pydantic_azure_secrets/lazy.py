@@ -0,0 +1,163 @@
+import threading
+from typing import TYPE_CHECKING, Any, Dict, List, Mapping, Optional, Tuple
+
+from pydantic import ValidationError
+from pydantic.error_wrappers import ErrorWrapper
+from pydantic.errors import MissingError
+from pydantic.fields import ModelField
+from pydantic.main import validate_model
+
+from pydantic_azure_secrets.fetching import SecretFetcher, SecretSource
+from pydantic_azure_secrets.secret_names import VaultSecrets, vault_requests
+
+if TYPE_CHECKING:
+    from azure.keyvault.secrets import KeyVaultSecret
+
+    from pydantic_azure_secrets.azure_vault_settings import AzureVaultSettings
+
+
+class DeferredFields:
+    """
+    The fields of a settings instance which are fetched from the key vault
+    and validated on the first access, see `Config.azure_keyvault_lazy`.
+
+    The lock is held while a field is fetched and validated, so that
+    concurrent readers fetch every field once.
+    """
+
+    def __init__(
+        self,
+        fields: Dict[str, Tuple[ModelField, List[str]]],
+        clients: Dict[str, SecretSource],
+    ) -> None:
+        # The deferred fields with their key vaults by name
+        self.fields = fields
+        self.clients = clients
+        self.lock = threading.Lock()
+
+    def init(self, settings: "AzureVaultSettings", values: Dict[str, Any]) -> None:
+        """
+        The same as `BaseModel.__init__`, but the deferred fields are neither
+        required nor validated, they are validated on the first access.
+        """
+        deferred_aliases = {field.alias for field, _ in self.fields.values()}
+
+        values, fields_set, validation_error = validate_model(
+            settings.__class__, values
+        )
+        if validation_error:
+            errors = [
+                error
+                for error in validation_error.raw_errors
+                if _error_location(error) not in deferred_aliases
+            ]
+            if errors:
+                raise ValidationError(errors, settings.__class__)
+
+        object.__setattr__(
+            settings,
+            "__dict__",
+            {k: v for k, v in values.items() if k not in self.fields},
+        )
+        object.__setattr__(settings, "__fields_set__", fields_set - self.fields.keys())
+        settings._init_private_attributes()
+
+    def get(self, settings: "AzureVaultSettings", name: str) -> Any:
+        """
+        The value of the field, fetched and validated if it is deferred.
+        """
+        with self.lock:
+            if name in settings.__dict__:
+                # resolved by a concurrent reader
+                return settings.__dict__[name]
+            if name not in self.fields:
+                raise AttributeError(
+                    f"{settings.__class__.__name__!r} object has no attribute {name!r}"
+                )
+            value = self._validate(settings, name, self._fetch(settings, [name]))
+            del self.fields[name]
+            return value
+
+    def resolve(self, settings: "AzureVaultSettings") -> None:
+        """
+        Fetch and validate all the remaining fields.
+        """
+        with self.lock:
+            if self.fields:
+                # The secrets of all the remaining fields are fetched at once,
+                # so that `Config.azure_keyvault_max_workers` applies
+                fetched = self._fetch(settings, list(self.fields))
+                for name in self.fields:
+                    self._validate(settings, name, fetched)
+                self.fields.clear()
+            # keep the order of the fields
+            object.__setattr__(
+                settings,
+                "__dict__",
+                {name: settings.__dict__[name] for name in settings.__fields__},
+            )
+
+    def _fetch(
+        self, settings: "AzureVaultSettings", names: List[str]
+    ) -> Dict[str, VaultSecrets]:
+        """
+        Fetch the secrets of the deferred fields by name from their key vaults.
+        """
+        fields_names = settings._keyvault_names(self.fields[name][0] for name in names)
+        fields_vaults = {name: self.fields[name][1] for name in names}
+        requests = vault_requests(fields_names, fields_vaults)
+        fetched = SecretFetcher(settings).fetch_vaults(
+            self.clients,
+            {url: names for url, names in requests.items() if url in self.clients},
+        )
+        for vault_url, vault_secrets in fetched.items():
+            settings._azure_secrets.setdefault(vault_url, {}).update(vault_secrets)
+        return fetched
+
+    def _validate(
+        self,
+        settings: "AzureVaultSettings",
+        name: str,
+        fetched: Mapping[str, Mapping[str, Optional["KeyVaultSecret"]]],
+    ) -> Any:
+        """
+        Validate the deferred field with the fetched secrets and set it.
+        """
+        field, vaults = self.fields[name]
+        secrets = settings._pick_secrets(
+            settings._keyvault_names([field]), {name: vaults}, fetched
+        )
+        if name in secrets:
+            value = secrets[name]
+            settings.__fields_set__.add(name)
+        elif field.required:
+            raise ValidationError(
+                [ErrorWrapper(MissingError(), loc=field.alias)], settings.__class__
+            )
+        else:
+            value = field.get_default()
+
+        value, errors = field.validate(
+            value, settings.__dict__, loc=field.alias, cls=settings.__class__
+        )
+        if errors:
+            raise ValidationError([errors], settings.__class__)
+
+        settings.__dict__[name] = value
+        return value
+
+
+class _DeferredValue:
+    def __repr__(self) -> str:
+        return "<deferred>"
+
+
+# Shown by `repr()` instead of the values of the deferred fields
+DEFERRED = _DeferredValue()
+
+
+def _error_location(error: Any) -> Any:
+    # field errors are wrapped in (nested) lists
+    while isinstance(error, list):
+        error = error[0]
+    return error.loc_tuple()[0]
@@ -0,0 +1,288 @@
+import logging
+import threading
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Generic,
+    List,
+    NamedTuple,
+    Optional,
+    Type,
+    TypeVar,
+)
+
+from pydantic import ValidationError
+
+from pydantic_azure_secrets.azure_vault_settings import AzureVaultSettings
+from pydantic_azure_secrets.backends import SecretBackend
+from pydantic_azure_secrets.fetching import SecretFetcher, SecretSource
+from pydantic_azure_secrets.secret_file import value_size, value_text
+
+if TYPE_CHECKING:
+    from azure.keyvault.secrets import KeyVaultSecret, SecretClient, SecretProperties
+
+logger = logging.getLogger(__name__)
+
+SettingsT = TypeVar("SettingsT", bound=AzureVaultSettings)
+
+Subscriber = Callable[[SettingsT, SettingsT], None]
+
+
+class RefreshStats(NamedTuple):
+    # key vault secret names compared with their properties
+    checked: int = 0
+    # secret values fetched again, as they changed or from a `SecretBackend`
+    fetched: int = 0
+    # requests for the values which were not sent, as the versions matched
+    calls_saved: int = 0
+    # UTF-8 size of the values which were not downloaded again
+    bytes_saved: int = 0
+
+    def __add__(self, other: Any) -> "RefreshStats":
+        if not isinstance(other, RefreshStats):
+            return NotImplemented
+        return RefreshStats(*(a + b for a, b in zip(self, other)))
+
+
+class SettingsRefresher(Generic[SettingsT]):
+    """
+    Keeps an instance of an AzureVaultSettings subclass up to date
+    when the secrets are rotated in the key vault.
+
+    Every `interval` seconds the background thread lists the properties of
+    the secrets of every key vault once and compares their `updated_on`
+    timestamps with the secrets used by the current settings. Only the
+    changed secrets are fetched again, then the new settings are validated
+    and swapped in, and the subscribers are called with the old and the new
+    settings. A `SecretBackend` can't list the properties of its secrets:
+    all the values are fetched again and compared, and nothing is saved.
+
+    `last_stats` is a `RefreshStats` with the secrets checked and fetched by
+    the last refresh, and the requests and bytes which were saved by not
+    fetching the unchanged ones; `total_stats` sums all the refreshes.
+
+        refresher = SettingsRefresher(MySettings, interval=60)
+        refresher.subscribe(lambda old, new: reconnect(new))
+        refresher.start()
+        ...
+        refresher.settings.token
+    """
+
+    def __init__(
+        self,
+        settings_cls: Type[SettingsT],
+        interval: float = 300.0,
+        **init_kwargs: Any,
+    ) -> None:
+        self.settings_cls = settings_cls
+        self.interval = interval
+        self._init_kwargs = init_kwargs
+        self._settings = settings_cls(**init_kwargs)
+        self._subscribers: List[Subscriber[SettingsT]] = []
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._secret_clients: Dict[str, Optional[SecretSource]] = {}
+        self.last_stats = RefreshStats()
+        self.total_stats = RefreshStats()
+
+    @property
+    def settings(self) -> SettingsT:
+        return self._settings
+
+    def subscribe(self, callback: Subscriber[SettingsT]) -> Callable[[], None]:
+        """
+        Call `callback(old_settings, new_settings)` after every swap.
+        Returns a function which unsubscribes the callback.
+        """
+        with self._lock:
+            self._subscribers.append(callback)
+
+        def unsubscribe() -> None:
+            with self._lock:
+                if callback in self._subscribers:
+                    self._subscribers.remove(callback)
+
+        return unsubscribe
+
+    def start(self) -> "SettingsRefresher[SettingsT]":
+        if self._thread is None or not self._thread.is_alive():
+            self._stopped.clear()
+            self._thread = threading.Thread(
+                target=self._run, name="azure-keyvault-refresher", daemon=True
+            )
+            self._thread.start()
+        return self
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def __enter__(self) -> "SettingsRefresher[SettingsT]":
+        return self.start()
+
+    def __exit__(self, *args: Any) -> None:
+        self.stop()
+
+    def refresh(self) -> bool:
+        """
+        Check the secrets once, return True if the settings were swapped.
+        """
+        settings = self._settings
+        secrets = getattr(settings, "_azure_secrets", None)
+        if not secrets:
+            return False
+
+        new_secrets: Dict[str, Dict[str, Optional["KeyVaultSecret"]]] = {}
+        changed_vaults = []
+        stats = RefreshStats()
+        for vault_url, vault_secrets in secrets.items():
+            new_secrets[vault_url] = dict(vault_secrets)
+            secret_client = self._get_secret_client(vault_url)
+            if secret_client is None or not vault_secrets:
+                continue
+
+            if isinstance(secret_client, SecretBackend):
+                fetched = self._fetch_backend_secrets(
+                    settings, secret_client, vault_secrets
+                )
+                changed = [
+                    name
+                    for name, secret in vault_secrets.items()
+                    if _is_changed_value(secret, fetched.get(name))
+                ]
+                # all the values were downloaded, nothing was saved
+                stats += RefreshStats(
+                    checked=len(vault_secrets), fetched=len(vault_secrets)
+                )
+            else:
+                changed = self._changed_secrets(secret_client, vault_secrets)
+                stats += _refresh_stats(vault_secrets, changed)
+            if not changed:
+                continue
+
+            logger.info("Secrets changed in %s: %s", vault_url, ", ".join(changed))
+            changed_vaults.append(vault_url)
+            cache = self.settings_cls.__config__.azure_keyvault_cache
+            if cache is not None:
+                for name in changed:
+                    cache.invalidate(vault_url, name)
+
+            if not isinstance(secret_client, SecretBackend):
+                fetched = SecretFetcher(settings).fetch_keyvault_secrets(
+                    secret_client, changed
+                )
+            new_secrets[vault_url].update({name: fetched.get(name) for name in changed})
+
+        self.last_stats = stats
+        self.total_stats += stats
+        logger.debug("Refreshed %s: %s", self.settings_cls.__name__, stats)
+        if not changed_vaults:
+            return False
+
+        try:
+            new_settings = self.settings_cls._from_secrets(
+                new_secrets, **self._init_kwargs
+            )
+        except ValidationError:
+            logger.exception("Keeping the current settings, the new ones are invalid")
+            return False
+
+        with self._lock:
+            old_settings, self._settings = self._settings, new_settings
+            subscribers = list(self._subscribers)
+        self.settings_cls.invalidate_cached()
+
+        for callback in subscribers:
+            try:
+                callback(old_settings, new_settings)
+            except Exception:  # pylint: disable=broad-except
+                logger.exception("Settings subscriber %r failed", callback)
+        return True
+
+    def _get_secret_client(self, vault_url: str) -> Optional[SecretSource]:
+        if vault_url not in self._secret_clients:
+            config = self.settings_cls.__config__
+            self._secret_clients[vault_url] = config.get_azure_backend(
+                vault_url
+            ) or config.get_azure_client(vault_url)
+        return self._secret_clients[vault_url]
+
+    def _changed_secrets(
+        self,
+        secret_client: "SecretClient",
+        secrets: Dict[str, Optional["KeyVaultSecret"]],
+    ) -> List[str]:
+        properties = {
+            secret_properties.name.lower(): secret_properties
+            for secret_properties in secret_client.list_properties_of_secrets()
+            if secret_properties.name is not None
+        }
+        return [
+            name
+            for name, secret in secrets.items()
+            if _is_changed(secret, properties.get(name.lower()))
+        ]
+
+    @staticmethod
+    def _fetch_backend_secrets(
+        settings: AzureVaultSettings,
+        backend: SecretBackend,
+        secrets: Dict[str, Optional["KeyVaultSecret"]],
+    ) -> Dict[str, "KeyVaultSecret"]:
+        # backends can't list the properties of the secrets, the values are
+        # fetched and compared instead
+        fetched = backend.get_many(list(secrets))
+        fetcher = SecretFetcher(settings)
+        return {
+            name: fetcher.to_secret_file(name, secret)
+            for name, secret in fetched.items()
+        }
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            try:
+                self.refresh()
+            except Exception:  # pylint: disable=broad-except
+                logger.exception("Failed to refresh %s", self.settings_cls.__name__)
+
+
+def _is_changed(
+    secret: Optional["KeyVaultSecret"], properties: Optional["SecretProperties"]
+) -> bool:
+    if secret is None or properties is None:
+        # created or deleted
+        return secret is not None or properties is not None
+    # The listed properties have no version, but every new version
+    # of a secret updates its timestamp
+    return bool(secret.properties.updated_on != properties.updated_on)
+
+
+def _is_changed_value(
+    secret: Optional["KeyVaultSecret"], new_secret: Optional["KeyVaultSecret"]
+) -> bool:
+    if secret is None or new_secret is None:
+        return secret is not None or new_secret is not None
+    if secret.properties.version and new_secret.properties.version:
+        return bool(secret.properties.version != new_secret.properties.version)
+    return value_text(secret.value) != value_text(new_secret.value)
+
+
+def _refresh_stats(
+    secrets: Dict[str, Optional["KeyVaultSecret"]], changed: List[str]
+) -> RefreshStats:
+    changed_names = set(changed)
+    unchanged = [
+        secret for name, secret in secrets.items() if name not in changed_names
+    ]
+    return RefreshStats(
+        checked=len(secrets),
+        fetched=len(changed),
+        calls_saved=len(unchanged),
+        bytes_saved=sum(
+            value_size(secret.value) for secret in unchanged if secret is not None
+        ),
+    )
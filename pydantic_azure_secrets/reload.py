@@ -0,0 +1,182 @@
+from typing import TYPE_CHECKING, Any, Dict, List, Set
+
+from pydantic import Extra, ValidationError
+from pydantic.env_settings import env_file_sentinel
+from pydantic.error_wrappers import ErrorWrapper
+from pydantic.errors import MissingError
+from pydantic.main import ROOT_KEY, _missing
+from pydantic.utils import deep_update
+
+from pydantic_azure_secrets.lazy import DeferredFields
+from pydantic_azure_secrets.secret_names import (
+    VaultSecrets,
+    field_vault_urls,
+    vault_urls,
+)
+
+if TYPE_CHECKING:
+    from pydantic_azure_secrets.azure_vault_settings import AzureVaultSettings
+
+
+def reload_settings(
+    settings: "AzureVaultSettings",
+    old_settings: "AzureVaultSettings",
+    field_names: Set[str],
+    refetch_names: Set[str],
+) -> None:
+    """
+    Initialise the new `settings` from `old_settings`,
+    see `AzureVaultSettings.reload()`.
+    """
+    sources = getattr(old_settings, "_azure_sources", None) or {"init_kwargs": {}}
+    higher_priority_values = settings._build_higher_priority_values(
+        sources["init_kwargs"],
+        sources.get("_env_file", env_file_sentinel),
+        sources.get("_env_file_encoding"),
+        sources.get("_secrets_dir"),
+    )
+    vaults = vault_urls(
+        sources.get("_azure_keyvault") or settings.__config__.azure_keyvault
+    )
+    object.__setattr__(settings, "_azure_sources", sources)
+    settings._remember_secrets({})
+
+    old_secrets: Dict[str, VaultSecrets] = getattr(old_settings, "_azure_secrets", {})
+    known_secrets = {
+        vault_url: {
+            name: secret
+            for name, secret in vault_secrets.items()
+            if name.lower() not in refetch_names
+        }
+        for vault_url, vault_secrets in old_secrets.items()
+    }
+    fields = [
+        field
+        for field in settings._keyvault_fields(higher_priority_values)
+        if field.name in field_names and field_vault_urls(field, vaults)
+    ]
+    cache = settings.__config__.azure_keyvault_cache
+    if cache is not None:
+        for field in fields:
+            for vault_url in field_vault_urls(field, vaults):
+                for name in refetch_names:
+                    cache.invalidate(vault_url, name)
+
+    with settings._measure("keyvault"):
+        keyvault_values = (
+            settings._build_keyvault(fields, vaults, known_secrets) if fields else {}
+        )
+    fetched = settings._azure_secrets
+    settings._remember_secrets(
+        {
+            vault_url: {
+                **known_secrets.get(vault_url, {}),
+                **fetched.get(vault_url, {}),
+            }
+            for vault_url in {**known_secrets, **fetched}
+        }
+    )
+
+    with settings._measure("validation"):
+        _validate_reloaded(
+            settings,
+            old_settings,
+            deep_update(keyvault_values, *higher_priority_values),
+            field_names,
+        )
+
+
+def _validate_reloaded(
+    settings: "AzureVaultSettings",
+    old_settings: "AzureVaultSettings",
+    input_data: Dict[str, Any],
+    field_names: Set[str],
+) -> None:
+    """
+    The same as `BaseModel.__init__`, but only the fields `field_names`
+    are validated, the other values are taken from `old_settings`. The pre
+    root validators get the values of `old_settings` updated with the input,
+    the field validators the values of the previous fields.
+    """
+    cls = settings.__class__
+    deferred = getattr(old_settings, "_azure_deferred", None)
+    old_values = old_settings.__dict__
+    # Built in field order, so a validator only sees the previous fields
+    values: Dict[str, Any] = {}
+    fields_set = old_settings.__fields_set__ - field_names
+    errors: List[Any] = []
+    aliases = {name: field.alias for name, field in cls.__fields__.items()}
+    input_data = {
+        **{
+            aliases.get(name, name): value
+            for name, value in old_values.items()
+            if name not in field_names
+        },
+        **input_data,
+    }
+    for validator in cls.__pre_root_validators__:
+        try:
+            input_data = validator(cls, input_data)
+        except (ValueError, TypeError, AssertionError) as e:
+            raise ValidationError([ErrorWrapper(e, loc=ROOT_KEY)], cls)
+
+    for name, field in cls.__fields__.items():
+        if name not in field_names:
+            if name in old_values:
+                values[name] = old_values[name]
+            continue
+
+        value = input_data.get(field.alias, _missing)
+        if value is _missing and cls.__config__.allow_population_by_field_name:
+            value = input_data.get(field.name, _missing)
+        if value is _missing:
+            if field.required:
+                errors.append(ErrorWrapper(MissingError(), loc=field.alias))
+                continue
+            value = field.get_default()
+        else:
+            fields_set.add(name)
+
+        value, field_errors = field.validate(value, values, loc=field.alias, cls=cls)
+        if field_errors:
+            errors.append(field_errors)
+        else:
+            values[name] = value
+
+    if cls.__config__.extra == Extra.allow:
+        known_keys = {*aliases, *aliases.values()}
+        values.update(
+            (key, value) for key, value in input_data.items() if key not in known_keys
+        )
+
+    for skip_on_failure, validator in cls.__post_root_validators__:
+        if skip_on_failure and errors:
+            continue
+        try:
+            values = validator(cls, values)
+        except (ValueError, TypeError, AssertionError) as e:
+            errors.append(ErrorWrapper(e, loc=ROOT_KEY))
+    if errors:
+        raise ValidationError(errors, cls)
+
+    # The extra values are kept after the fields, like by `validate_model`
+    fields_values = {name: values[name] for name in cls.__fields__ if name in values}
+    if cls.__config__.extra == Extra.allow:
+        fields_values.update(values)
+    object.__setattr__(settings, "__dict__", fields_values)
+    object.__setattr__(settings, "__fields_set__", fields_set)
+    settings._init_private_attributes()
+
+    # The deferred fields which are still not resolved stay deferred
+    if deferred is not None:
+        still_deferred = {
+            name: deferred_field
+            for name, deferred_field in deferred.fields.items()
+            if name not in field_names and name not in values
+        }
+        if still_deferred:
+            object.__setattr__(
+                settings,
+                "_azure_deferred",
+                DeferredFields(still_deferred, deferred.clients),
+            )
@@ -0,0 +1,175 @@
+import os
+import tempfile
+import threading
+import weakref
+from pathlib import Path
+from typing import IO, TYPE_CHECKING, Any, Callable, Iterator, Optional, Union
+
+from pydantic_azure_secrets.clients import register_after_fork
+
+if TYPE_CHECKING:
+    from azure.keyvault.secrets import KeyVaultSecret
+
+# The values are encoded and written in chunks of this number of characters,
+# so at most one chunk is copied at a time
+CHUNK_SIZE = 1 << 20
+
+# tmpfs on most Linux distributions, the files never reach the disk
+SHM_DIR = "/dev/shm"
+
+
+class SecretFile:
+    """
+    Handle of a large key vault secret, e.g. a certificate bundle, kept in
+    a file readable by the owner only instead of in memory.
+
+    Annotate a field with `SecretFile` and the value of its secret is written
+    to `Config.azure_keyvault_secret_files_dir` (tmpfs by default) when it is
+    fetched, so the settings, the fetched secrets and the cache only hold
+    this handle. The file is deleted when no handle refers to it anymore.
+    Handles of the same secret version are shared, so it is written once.
+
+    A string or a path from the other sources is the path of an existing
+    file, which is never deleted.
+    """
+
+    def __init__(self, path: Union[Path, str], size: Optional[int] = None) -> None:
+        self.path = Path(path)
+        self.size = size if size is not None else self.path.stat().st_size
+
+    @classmethod
+    def for_secret(
+        cls, secret: "KeyVaultSecret", directory: Optional[str] = None
+    ) -> "SecretFile":
+        """
+        Write the value of the secret to a new file, or return the handle
+        of the same secret version if there is one already.
+        """
+        value, secret_id = secret.value or "", secret.id
+        if not secret.properties.version or not secret_id:
+            # the value of an unknown version may change
+            return cls.write(value, directory)
+        handle = _handles.get(secret_id)
+        if handle is None:
+            handle = _handles.add(secret_id, cls.write(value, directory))
+        return handle
+
+    @classmethod
+    def write(cls, value: str, directory: Optional[str] = None) -> "SecretFile":
+        """
+        Write the value to a new file, which is deleted with the handle.
+        """
+        # mkstemp creates the file with 0600 permissions
+        fd, path = tempfile.mkstemp(
+            prefix="azure-keyvault-", dir=directory or default_directory()
+        )
+        size = 0
+        try:
+            with os.fdopen(fd, "wb") as file:
+                for start in range(0, len(value), CHUNK_SIZE):
+                    end = start + CHUNK_SIZE
+                    chunk = value[start:end].encode()
+                    file.write(chunk)
+                    size += len(chunk)
+        except BaseException:
+            os.unlink(path)
+            raise
+
+        handle = cls(path, size)
+        # a forked child must not delete the files of its parent
+        weakref.finalize(handle, _unlink, path, os.getpid())
+        return handle
+
+    def open(self) -> IO[bytes]:
+        return self.path.open("rb")
+
+    def read_bytes(self) -> bytes:
+        return self.path.read_bytes()
+
+    def read_text(self, encoding: str = "utf-8") -> str:
+        return self.path.read_text(encoding)
+
+    def __eq__(self, other: Any) -> bool:
+        return isinstance(other, SecretFile) and self.path == other.path
+
+    def __hash__(self) -> int:
+        return hash(self.path)
+
+    def __repr__(self) -> str:
+        return f"SecretFile('{self.path}', size={self.size})"
+
+    @classmethod
+    def __get_validators__(cls) -> Iterator[Callable[..., Any]]:
+        yield cls.validate
+
+    @classmethod
+    def validate(cls, value: Any) -> "SecretFile":
+        if isinstance(value, SecretFile):
+            return value
+        if not isinstance(value, (str, Path)):
+            raise TypeError("a SecretFile or the path of a file is required")
+        path = Path(value).expanduser()
+        if not path.is_file():
+            raise ValueError(f'file "{path}" does not exist')
+        return cls(path)
+
+
+def default_directory() -> Optional[str]:
+    if os.path.isdir(SHM_DIR) and os.access(SHM_DIR, os.W_OK):
+        return SHM_DIR
+    # the default temporary directory
+    return None
+
+
+def value_size(value: Union[str, SecretFile, None]) -> int:
+    """
+    The size of the encoded secret value, in bytes.
+    """
+    if value is None:
+        return 0
+    if isinstance(value, SecretFile):
+        return value.size
+    return len(value.encode())
+
+
+def value_text(value: Union[str, SecretFile, None]) -> Optional[str]:
+    return value.read_text() if isinstance(value, SecretFile) else value
+
+
+def _unlink(path: str, pid: int) -> None:
+    if os.getpid() == pid:
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+
+class _HandleRegistry:
+    """
+    The live handles by secret id, which includes the version.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._handles: "weakref.WeakValueDictionary[str, SecretFile]" = (
+            weakref.WeakValueDictionary()
+        )
+        register_after_fork(self, _HandleRegistry._after_fork)
+
+    def get(self, secret_id: str) -> Optional[SecretFile]:
+        with self._lock:
+            return self._handles.get(secret_id)
+
+    def add(self, secret_id: str, handle: SecretFile) -> SecretFile:
+        """
+        Register the handle and return it, or return the handle registered
+        by another thread in the meantime, the new one is deleted then.
+        """
+        with self._lock:
+            return self._handles.setdefault(secret_id, handle)
+
+    def _after_fork(self) -> None:
+        self._lock = threading.Lock()
+
+
+_handles = _HandleRegistry()
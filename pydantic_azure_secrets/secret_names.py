@@ -0,0 +1,203 @@
+import logging
+import re
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+    Union,
+)
+
+from pydantic import BaseModel
+from pydantic.fields import SHAPE_SINGLETON, ModelField
+from pydantic.utils import (  # pylint: disable=no-name-in-module
+    deep_update,
+    lenient_issubclass,
+)
+
+if TYPE_CHECKING:
+    from azure.keyvault.secrets import KeyVaultSecret
+
+logger = logging.getLogger(__name__)
+
+# Key vault secret names contain only alphanumeric characters and dashes
+SECRET_NAME_PATTERN = re.compile(r"^[0-9a-zA-Z-]{1,127}$")
+
+# One key vault URL or several ones, from the highest priority to the lowest
+AzureKeyVaults = Union[str, Sequence[str], None]
+# Secrets of a key vault by name, None if a secret was not found
+VaultSecrets = Dict[str, Optional["KeyVaultSecret"]]
+
+
+def flatten(names: Iterable[Iterable[str]]) -> List[str]:
+    return [name for field_names in names for name in field_names]
+
+
+def first_secret(
+    fetched: Mapping[str, Mapping[str, Optional["KeyVaultSecret"]]],
+    vaults: List[str],
+    names: List[str],
+) -> Optional["KeyVaultSecret"]:
+    for vault_url in vaults:
+        vault_secrets = fetched.get(vault_url, {})
+        for name in names:
+            secret = vault_secrets.get(name)
+            if secret is not None:
+                return secret
+    return None
+
+
+def secret_names(field: ModelField) -> Tuple[str, ...]:
+    """
+    The unique key vault secret names of the field, from the highest priority
+    to the lowest: `Field(..., azure_keyvault_names=...)` or the `env` names
+    in reverse order, as the last found `env` name wins.
+    """
+    extra = field.field_info.extra
+    explicit = "azure_keyvault_names" in extra
+    if explicit:
+        names = _as_list(extra["azure_keyvault_names"])
+    else:
+        env_names = list(extra["env_names"])
+        names = [env_name.replace("_", "-") for env_name in reversed(env_names)]
+
+    # Secret names are case-insensitive in the key vault
+    unique_names: Dict[str, str] = {}
+    for name in names:
+        if not SECRET_NAME_PATTERN.match(name):
+            if explicit:
+                logger.warning(
+                    "%s: %r is not a valid key vault secret name", field.name, name
+                )
+            continue
+        unique_names.setdefault(name.lower(), name)
+    return tuple(unique_names.values())
+
+
+class NestedSecret(NamedTuple):
+    # The aliases of the nested fields, from the outermost one
+    path: Tuple[str, ...]
+    # The key vault secret names, from the highest priority to the lowest
+    names: Tuple[str, ...]
+    # Parsed from JSON, like the complex environment variables
+    is_complex: bool
+
+
+def nested_secrets(
+    field: ModelField,
+    names: Tuple[str, ...],
+    delimiter: Optional[str],
+    path: Tuple[str, ...] = (),
+    models: Tuple[Type[BaseModel], ...] = (),
+) -> List[NestedSecret]:
+    """
+    The secrets of the nested fields of a model field, every one of them
+    is followed by the secrets of its own nested fields.
+    """
+    model = field.type_
+    if (
+        not delimiter
+        or field.shape != SHAPE_SINGLETON
+        or not lenient_issubclass(model, BaseModel)
+        # recursive models
+        or model in models
+    ):
+        return []
+
+    nested = []
+    for sub_field in model.__fields__.values():
+        sub_path = (*path, sub_field.alias)
+        sub_names = tuple(
+            sub_name
+            for sub_name in (
+                f"{name}{delimiter}{sub_field.alias.replace('_', '-')}"
+                for name in names
+            )
+            if SECRET_NAME_PATTERN.match(sub_name)
+        )
+        if sub_names:
+            nested.append(NestedSecret(sub_path, sub_names, sub_field.is_complex()))
+            nested.extend(
+                nested_secrets(
+                    sub_field, sub_names, delimiter, sub_path, (*models, model)
+                )
+            )
+    return nested
+
+
+def set_nested(values: Dict[str, Any], path: Tuple[str, ...], value: Any) -> None:
+    """
+    Set the value at the path of keys, copying the (shared) parsed dicts
+    on the way instead of modifying them.
+    """
+    for key in path[:-1]:
+        child = values.get(key)
+        values[key] = dict(child) if isinstance(child, dict) else {}
+        values = values[key]
+    if isinstance(values.get(path[-1]), dict) and isinstance(value, dict):
+        value = deep_update(values[path[-1]], value)
+    values[path[-1]] = value
+
+
+def _as_list(names: Union[str, Sequence[str], None]) -> List[str]:
+    if not names:
+        return []
+    if isinstance(names, str):
+        return [names]
+    return list(names)
+
+
+def vault_urls(azure_keyvault: AzureKeyVaults) -> List[str]:
+    return _as_list(azure_keyvault)
+
+
+def field_vault_urls(field: ModelField, vaults: List[str]) -> List[str]:
+    """
+    The key vaults of the field, `Field(..., azure_keyvault=...)`
+    overrides the key vaults of the settings.
+    """
+    if "azure_keyvault" in field.field_info.extra:
+        return vault_urls(field.field_info.extra["azure_keyvault"])
+    return vaults
+
+
+def vault_requests(
+    fields_names: Dict[str, List[str]], fields_vaults: Dict[str, List[str]]
+) -> Dict[str, List[str]]:
+    """
+    The unique names to look up in every key vault.
+    """
+    requests: Dict[str, List[str]] = {}
+    for field_name, names in fields_names.items():
+        for vault_url in fields_vaults[field_name]:
+            requests.setdefault(vault_url, []).extend(names)
+    return {
+        vault_url: list(dict.fromkeys(names)) for vault_url, names in requests.items()
+    }
+
+
+def split_known_secrets(
+    requests: Dict[str, List[str]],
+    known_secrets: Optional[Mapping[str, Mapping[str, Optional["KeyVaultSecret"]]]],
+) -> Tuple[Dict[str, VaultSecrets], Dict[str, List[str]]]:
+    """
+    Split the names to look up in every key vault into the known secrets
+    and the names which must be fetched.
+    """
+    known_secrets = known_secrets or {}
+    secrets: Dict[str, VaultSecrets] = {}
+    missing: Dict[str, List[str]] = {}
+    for vault_url, names in requests.items():
+        known = known_secrets.get(vault_url, {})
+        secrets[vault_url] = {name: known[name] for name in names if name in known}
+        missing_names = [name for name in names if name not in known]
+        if missing_names:
+            missing[vault_url] = missing_names
+    return secrets, missing
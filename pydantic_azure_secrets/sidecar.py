@@ -0,0 +1,253 @@
+import json
+import logging
+import os
+import socket
+import stat
+import threading
+from http.client import HTTPConnection
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from pathlib import Path
+from socketserver import TCPServer, ThreadingMixIn
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, List, Optional, Union
+from urllib.parse import urlsplit
+from urllib.request import Request, urlopen
+
+from pydantic_azure_secrets.backends import SecretBackend, _as_dict, _secret
+from pydantic_azure_secrets.cache import SecretCache
+from pydantic_azure_secrets.clients import normalize_vault_url
+
+if TYPE_CHECKING:
+    from azure.keyvault.secrets import KeyVaultSecret
+
+logger = logging.getLogger(__name__)
+
+SIDECAR_PATH = "/v1/secrets"
+UNIX_SCHEME = "unix://"
+
+
+class HttpBackend(SecretBackend):
+    """
+    Client of a `SidecarServer`, e.g. a node-local cache of the key vault
+    shared by all the processes of a host. `url` is `SidecarServer.url`:
+    `http://host:port` or `unix:///path/of/the/socket`.
+    """
+
+    def __init__(self, vault_url: str, url: str, timeout: float = 5.0) -> None:
+        self.vault_url = vault_url
+        self.url = url.rstrip("/") + SIDECAR_PATH
+        self.timeout = timeout
+
+    def get_many(self, names: List[str]) -> Dict[str, "KeyVaultSecret"]:
+        body = json.dumps({"vault_url": self.vault_url, "names": names}).encode()
+        headers = {"Content-Type": "application/json"}
+        try:
+            if self.url.startswith(UNIX_SCHEME):
+                entries = self._post_unix(body, headers)
+            else:
+                request = Request(self.url, body, headers=headers)
+                with urlopen(request, timeout=self.timeout) as response:
+                    entries = json.loads(response.read())["secrets"]
+        except OSError as e:
+            from azure.core.exceptions import (  # pylint: disable=C0415
+                ServiceRequestError,
+            )
+
+            raise ServiceRequestError(f"{self.url} is unreachable: {e}") from e
+
+        return {
+            name: _secret(self.vault_url, name, entry["value"], entry.get("version"))
+            for name, entry in entries.items()
+        }
+
+    def _post_unix(self, body: bytes, headers: Dict[str, str]) -> Dict[str, Any]:
+        socket_path = urlsplit(self.url).path[: -len(SIDECAR_PATH)]
+        connection = _UnixHTTPConnection(socket_path, self.timeout)
+        try:
+            connection.request("POST", SIDECAR_PATH, body, headers)
+            response = connection.getresponse()
+            if response.status != 200:
+                raise OSError(f"HTTP Error {response.status}: {response.reason}")
+            return json.loads(response.read())["secrets"]  # type: ignore
+        finally:
+            connection.close()
+
+
+class SidecarServer:
+    """
+    Local HTTP server which serves the secrets of the backends created with
+    `backend_factory(vault_url)` to the `HttpBackend` clients, with a
+    `SecretCache` in front of them. Only the key vaults `vault_urls` are
+    served, the requests of the other ones are answered with 403.
+
+    It has no authentication. With `socket_path`, it listens on a Unix
+    socket which only its user can connect to, otherwise on the loopback
+    interface by default: any local user can read the secrets then,
+    and it must not be exposed to other hosts.
+
+        with SidecarServer(
+            lambda url: KeyVaultBackend(SecretClient(url, cred)),
+            [VAULT_URL],
+            socket_path="/run/app/keyvault.sock",
+        ) as sidecar:
+            ...
+    """
+
+    def __init__(
+        self,
+        backend_factory: Callable[[str], SecretBackend],
+        vault_urls: Iterable[str],
+        host: str = "127.0.0.1",
+        port: int = 0,
+        cache: Optional[SecretCache] = None,
+        socket_path: Optional[Union[Path, str]] = None,
+    ) -> None:
+        self.backend_factory = backend_factory
+        self.vault_urls = frozenset(normalize_vault_url(url) for url in vault_urls)
+        self.cache = cache if cache is not None else SecretCache()
+        self._lock = threading.Lock()
+        self._backends: Dict[str, SecretBackend] = {}
+        self._thread: Optional[threading.Thread] = None
+        self.host = host
+        self.socket_path = str(socket_path) if socket_path is not None else None
+        self._server: _ThreadingHTTPServer
+        if self.socket_path is not None:
+            self._server = _UnixHTTPServer(self.socket_path)
+        else:
+            self._server = _ThreadingHTTPServer((host, port), _SidecarHandler)
+        self._server.sidecar = self
+
+    @property
+    def url(self) -> str:
+        if self.socket_path is not None:
+            return UNIX_SCHEME + self.socket_path
+        return f"http://{self.host}:{self._server.server_port}"
+
+    def start(self) -> "SidecarServer":
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._server.serve_forever,
+                name="azure-keyvault-sidecar",
+                daemon=True,
+            )
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._server.server_close()
+        if self.socket_path is not None and os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        with self._lock:
+            backends = list(self._backends.values())
+            self._backends.clear()
+        for backend in backends:
+            backend.close()
+
+    def __enter__(self) -> "SidecarServer":
+        return self.start()
+
+    def __exit__(self, *args: Any) -> None:
+        self.stop()
+
+    def get_many(self, vault_url: str, names: List[str]) -> Dict[str, "KeyVaultSecret"]:
+        cached, missing = self.cache.get_many(vault_url, names)
+        secrets = {
+            name: secret for name, secret in cached.items() if secret is not None
+        }
+        if missing:
+            fetched = self._backend(vault_url).get_many(missing)
+            for name in missing:
+                self.cache.set(vault_url, name, fetched.get(name))
+            secrets.update(fetched)
+        return secrets
+
+    def is_allowed(self, vault_url: str) -> bool:
+        return normalize_vault_url(vault_url) in self.vault_urls
+
+    def _backend(self, vault_url: str) -> SecretBackend:
+        key = normalize_vault_url(vault_url)
+        with self._lock:
+            backend = self._backends.get(key)
+            if backend is None:
+                backend = self._backends[key] = self.backend_factory(vault_url)
+            return backend
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    sidecar: SidecarServer
+
+
+class _UnixHTTPServer(_ThreadingHTTPServer):
+    def __init__(self, socket_path: str) -> None:
+        self.address_family = socket.AF_UNIX
+        # the socket of a previous server which was not stopped
+        if os.path.exists(socket_path) and stat.S_ISSOCK(os.stat(socket_path).st_mode):
+            os.unlink(socket_path)
+        super().__init__(socket_path, _SidecarHandler)  # type: ignore
+
+    def server_bind(self) -> None:
+        # HTTPServer.server_bind() expects a (host, port) address
+        TCPServer.server_bind(self)
+        # before listening, so that other users never can connect
+        os.chmod(self.server_address, 0o600)  # type: ignore
+
+
+class _UnixHTTPConnection(HTTPConnection):
+    def __init__(self, socket_path: str, timeout: float) -> None:
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self) -> None:
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+class _SidecarHandler(BaseHTTPRequestHandler):
+    server: _ThreadingHTTPServer
+
+    def do_POST(self) -> None:  # pylint: disable=invalid-name
+        if self.path != SIDECAR_PATH:
+            self.send_error(404)
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length))
+            vault_url, names = request["vault_url"], list(request["names"])
+            if not isinstance(vault_url, str):
+                raise TypeError(vault_url)
+        except (ValueError, KeyError, TypeError):
+            self.send_error(400)
+            return
+
+        if not self.server.sidecar.is_allowed(vault_url):
+            self.send_error(403)
+            return
+
+        try:
+            secrets = self.server.sidecar.get_many(vault_url, names)
+        except Exception:  # pylint: disable=broad-except
+            logger.exception("Failed to fetch the secrets of %s", vault_url)
+            self.send_error(502)
+            return
+
+        body = json.dumps(
+            {
+                "secrets": {
+                    name: _as_dict(vault_url, name, secret)
+                    for name, secret in secrets.items()
+                }
+            }
+        ).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:  # pylint: disable=W0622
+        logger.debug(format, *args)
@@ -0,0 +1,113 @@
+import threading
+from functools import partial
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Hashable,
+    Optional,
+    Tuple,
+    TypeVar,
+)
+
+from pydantic_azure_secrets.clients import register_after_fork
+
+if TYPE_CHECKING:
+    import asyncio
+
+T = TypeVar("T")
+
+
+class _Call:
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Lets the concurrent callers with the same key share one call:
+    the first caller runs it, the others wait and get its result or its
+    error. The next call with the key, after the shared one is finished,
+    runs again. In asyncio, the shared call runs in its own task, which
+    is not cancelled with its callers. Calls in threads and in asyncio
+    tasks are not shared with each other, nor with the calls of a forked
+    child process.
+    """
+
+    def __init__(self) -> None:
+        self.shared = 0
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._async_calls: Dict[Tuple[Any, Hashable], "asyncio.Future[Any]"] = {}
+        register_after_fork(self, SingleFlight._after_fork)
+
+    def do(self, key: Hashable, func: Callable[[], T]) -> T:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if call is None:
+                call = self._calls[key] = _Call()
+            else:
+                self.shared += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result  # type: ignore
+
+        try:
+            call.result = func()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result  # type: ignore
+
+    async def ado(self, key: Hashable, func: Callable[[], Awaitable[T]]) -> T:
+        import asyncio  # pylint: disable=C0415
+
+        loop = asyncio.get_event_loop()
+        # tasks can't be shared between event loops
+        loop_key = (loop, key)
+        with self._lock:
+            task = self._async_calls.get(loop_key)
+            if task is None:
+                # The shared call runs in its own task, so that cancelling
+                # any caller, the first one included, doesn't cancel it
+                task = self._async_calls[loop_key] = asyncio.ensure_future(func())
+                task.add_done_callback(partial(self._async_call_done, loop_key))
+            else:
+                self.shared += 1
+
+        return await asyncio.shield(task)  # type: ignore
+
+    def _async_call_done(
+        self, loop_key: Tuple[Any, Hashable], task: "asyncio.Future[Any]"
+    ) -> None:
+        with self._lock:
+            if self._async_calls.get(loop_key) is task:
+                del self._async_calls[loop_key]
+        # don't warn about the exception if all the callers were cancelled
+        if not task.cancelled():
+            task.exception()
+
+    def _after_fork(self) -> None:
+        # The calls of the other threads of the parent never finish in the child
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._async_calls = {}
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._calls) + len(self._async_calls)
+
+
+single_flight = SingleFlight()
@@ -0,0 +1,307 @@
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Union,
+    cast,
+)
+
+from pydantic_azure_secrets.clients import normalize_vault_url
+from pydantic_azure_secrets.secret_file import value_text
+from pydantic_azure_secrets.throttling import DeadlineExceeded
+
+if TYPE_CHECKING:
+    from azure.keyvault.secrets import KeyVaultSecret
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FORMAT = 1
+
+FetchSecrets = Callable[[List[str]], Dict[str, "KeyVaultSecret"]]
+AsyncFetchSecrets = Callable[[List[str]], Awaitable[Dict[str, "KeyVaultSecret"]]]
+
+
+class _SnapshotAttributes(NamedTuple):
+    # The attributes of `SecretProperties` which are kept in the snapshot
+    updated: Optional[datetime] = None
+    enabled: Optional[bool] = None
+    not_before: Optional[datetime] = None
+    expires: Optional[datetime] = None
+    created: Optional[datetime] = None
+    recovery_level: Optional[str] = None
+    recoverable_days: Optional[int] = None
+
+
+class SecretSnapshot:
+    """
+    Encrypted file with the secrets fetched from the key vault.
+
+    The file is encrypted with `cryptography.fernet.Fernet` and the `key`
+    supplied by the application, see `SecretSnapshot.generate_key()`.
+    It is written atomically and readable by the owner only.
+
+    If all the secrets in the snapshot are younger than `max_age` seconds,
+    they are used without querying the key vault. Once they are older than
+    `refresh_after` seconds, the snapshot is also refreshed in a background
+    thread (`background_refresh`), at most one refresh at a time.
+    Otherwise the secrets are fetched from the key vault and saved.
+    If the key vault cannot be reached, the snapshot is used as a fallback
+    as long as it is younger than `max_staleness` seconds.
+
+    `AzureVaultSettings.aload()` refreshes a snapshot older than
+    `refresh_after` before it returns instead, as its asyncio key vault
+    client is closed afterwards.
+    """
+
+    def __init__(
+        self,
+        path: Union[Path, str],
+        key: Union[bytes, str],
+        max_age: Optional[float] = 300.0,
+        max_staleness: Optional[float] = 86400.0,
+        background_refresh: bool = True,
+        refresh_after: float = 60.0,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        from cryptography.fernet import Fernet  # pylint: disable=C0415
+
+        self.path = Path(path).expanduser()
+        self.max_age = max_age
+        self.max_staleness = max_staleness
+        self.background_refresh = background_refresh
+        self.refresh_after = refresh_after
+        self._fernet = Fernet(key)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._refresh_thread: Optional[threading.Thread] = None
+
+    @staticmethod
+    def generate_key() -> bytes:
+        from cryptography.fernet import Fernet  # pylint: disable=C0415
+
+        return Fernet.generate_key()
+
+    def fetch(
+        self, vault_url: str, names: List[str], fetch: FetchSecrets
+    ) -> Dict[str, "KeyVaultSecret"]:
+        """
+        Get the secrets from the snapshot or with `fetch`,
+        which queries the key vault.
+        """
+        from azure.core.exceptions import AzureError  # pylint: disable=C0415
+
+        age, snapshot = self.load(vault_url, names)
+
+        if snapshot is not None and _within(age, self.max_age):
+            logger.debug("Using the snapshot %s of %s", self.path, vault_url)
+            if self._needs_refresh(age):
+                self._refresh_in_background(vault_url, names, fetch)
+            return snapshot
+
+        try:
+            secrets = fetch(names)
+        except (AzureError, DeadlineExceeded):
+            fallback = self._fallback(vault_url, age, snapshot)
+            if fallback is None:
+                raise
+            return fallback
+
+        self.save(vault_url, names, secrets)
+        return secrets
+
+    async def afetch(
+        self, vault_url: str, names: List[str], fetch: AsyncFetchSecrets
+    ) -> Dict[str, "KeyVaultSecret"]:
+        """
+        The same as `fetch()` with a coroutine function `fetch`, but the
+        snapshot is refreshed before returning instead of in background.
+        """
+        from azure.core.exceptions import AzureError  # pylint: disable=C0415
+
+        age, snapshot = self.load(vault_url, names)
+
+        fresh = snapshot is not None and _within(age, self.max_age)
+        if fresh and not self._needs_refresh(age):
+            logger.debug("Using the snapshot %s of %s", self.path, vault_url)
+            return cast(Dict[str, "KeyVaultSecret"], snapshot)
+
+        try:
+            secrets = await fetch(names)
+        except (AzureError, DeadlineExceeded):
+            fallback = snapshot if fresh else self._fallback(vault_url, age, snapshot)
+            if fallback is None:
+                raise
+            return fallback
+
+        self.save(vault_url, names, secrets)
+        return secrets
+
+    def load(
+        self, vault_url: str, names: List[str]
+    ) -> Tuple[float, Optional[Dict[str, "KeyVaultSecret"]]]:
+        """
+        Return the age of the oldest entry and the secrets found in
+        the snapshot, or None if some of the names are not in the snapshot.
+        """
+        from azure.keyvault.secrets import (  # pylint: disable=C0415
+            KeyVaultSecret,
+            SecretProperties,
+        )
+
+        entries = self._read().get(normalize_vault_url(vault_url), {})
+        if not names or any(name not in entries for name in names):
+            return 0.0, None
+
+        age = self._clock() - min(entries[name]["saved_at"] for name in names)
+        secrets = {
+            name: KeyVaultSecret(
+                SecretProperties(_attributes(entries[name]), entries[name]["id"]),
+                entries[name]["value"],
+            )
+            for name in names
+            if entries[name]["found"]
+        }
+        return age, secrets
+
+    def save(
+        self, vault_url: str, names: List[str], secrets: Dict[str, "KeyVaultSecret"]
+    ) -> None:
+        """
+        Save the fetched secrets and the names which were not found.
+        """
+        saved_at = self._clock()
+        with self._lock:
+            vaults = self._read()
+            entries = vaults.setdefault(normalize_vault_url(vault_url), {})
+            for name in names:
+                secret = secrets.get(name)
+                entries[name] = {
+                    "saved_at": saved_at,
+                    "found": secret is not None,
+                    "id": secret.id if secret is not None else None,
+                    "value": value_text(secret.value) if secret is not None else None,
+                    # compared by `SettingsRefresher` with the key vault
+                    "updated_on": _timestamp(secret) if secret is not None else None,
+                }
+            self._write(vaults)
+
+    def _needs_refresh(self, age: float) -> bool:
+        return self.background_refresh and age > self.refresh_after
+
+    def _fallback(
+        self,
+        vault_url: str,
+        age: float,
+        snapshot: Optional[Dict[str, "KeyVaultSecret"]],
+    ) -> Optional[Dict[str, "KeyVaultSecret"]]:
+        """
+        The snapshot to use when the key vault is unreachable,
+        None if it is missing or too old.
+        """
+        if snapshot is None or not _within(age, self.max_staleness):
+            return None
+        logger.warning(
+            "%s is unreachable, using the snapshot %s saved %.0fs ago",
+            vault_url,
+            self.path,
+            age,
+            exc_info=True,
+        )
+        return snapshot
+
+    def wait_for_refresh(self, timeout: Optional[float] = None) -> None:
+        thread = self._refresh_thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def _refresh_in_background(
+        self, vault_url: str, names: List[str], fetch: FetchSecrets
+    ) -> None:
+        def refresh() -> None:
+            try:
+                self.save(vault_url, names, fetch(names))
+            except Exception:  # pylint: disable=broad-except
+                logger.warning(
+                    "Failed to refresh the snapshot %s", self.path, exc_info=True
+                )
+
+        with self._lock:
+            if self._refresh_thread is not None and self._refresh_thread.is_alive():
+                return
+            self._refresh_thread = threading.Thread(
+                target=refresh, name="azure-keyvault-snapshot", daemon=True
+            )
+            self._refresh_thread.start()
+
+    def _read(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        from cryptography.fernet import InvalidToken  # pylint: disable=C0415
+
+        try:
+            data = json.loads(self._fernet.decrypt(self.path.read_bytes()))
+        except FileNotFoundError:
+            return {}
+        except (InvalidToken, ValueError):
+            logger.warning("Ignoring the snapshot %s: cannot decrypt it", self.path)
+            return {}
+
+        if data.get("format") != SNAPSHOT_FORMAT:
+            logger.warning("Ignoring the snapshot %s of unknown format", self.path)
+            return {}
+        return data["vaults"]  # type: ignore
+
+    def _write(self, vaults: Dict[str, Dict[str, Dict[str, Any]]]) -> None:
+        data = json.dumps({"format": SNAPSHOT_FORMAT, "vaults": vaults})
+        token = self._fernet.encrypt(data.encode())
+
+        write_private_file(self.path, token)
+
+
+def write_private_file(path: Path, data: bytes) -> None:
+    """
+    Write the file atomically and readable by the owner only.
+    """
+    # mkstemp creates the file with 0600 permissions,
+    # os.replace makes sure that readers never see a partial file
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{path.name}.", dir=str(path.parent))
+    try:
+        with os.fdopen(fd, "wb") as tmp_file:
+            tmp_file.write(data)
+            tmp_file.flush()
+            os.fsync(tmp_file.fileno())
+        os.replace(tmp_path, str(path))
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def _timestamp(secret: "KeyVaultSecret") -> Optional[float]:
+    updated_on = secret.properties.updated_on
+    return updated_on.timestamp() if updated_on is not None else None
+
+
+def _attributes(entry: Dict[str, Any]) -> Optional[_SnapshotAttributes]:
+    # the older entries were saved without a timestamp
+    timestamp = entry.get("updated_on")
+    if timestamp is None:
+        return None
+    updated = datetime.fromtimestamp(timestamp, timezone.utc)
+    return _SnapshotAttributes(updated=updated, enabled=True)
+
+
+def _within(age: float, limit: Optional[float]) -> bool:
+    return limit is not None and age <= limit
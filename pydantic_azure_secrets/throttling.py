@@ -0,0 +1,204 @@
+import logging
+import random
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, Optional, TypeVar
+
+from pydantic_azure_secrets.clients import normalize_vault_url
+
+if TYPE_CHECKING:
+    from azure.core.exceptions import HttpResponseError
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Key vault answers 429 Too Many Requests when it throttles the requests
+THROTTLED_STATUS_CODES = frozenset([429])
+
+# Per request options: let the SDK retry the connection errors,
+# but return the throttled responses to the scheduler at once
+SDK_REQUEST_OPTIONS: Dict[str, Any] = {"retry_status": 0}
+
+
+class DeadlineExceeded(TimeoutError):
+    """
+    The key vault was not queried before the deadline of the construction.
+    """
+
+
+class _TokenBucket:
+    """
+    Token bucket which lets the callers reserve a token in advance:
+    the tokens go negative and every caller waits for its own turn.
+    """
+
+    def __init__(self, rate: float, burst: int, now: float) -> None:
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = now
+        self.blocked_until = now
+
+    def reserve(self, now: float) -> float:
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        delay = max(0.0, self.blocked_until - now)
+        if self.tokens < 0:
+            delay += -self.tokens / self.rate
+        return delay
+
+
+class VaultScheduler:
+    """
+    Schedules the key vault requests of all the settings classes which
+    share it, so that many threads and replicas starting at once degrade
+    gracefully instead of failing with 429 Too Many Requests:
+        - a token bucket per key vault limits the requests to `rate`
+    per second, with bursts of up to `burst` requests;
+        - a throttled request blocks all the requests to the key vault for
+    `Retry-After` seconds (or an exponential backoff from `backoff` up to
+    `max_backoff` seconds without the header) plus a random jitter, halves
+    the rate (not below `min_rate`) and is retried up to `max_retries` times;
+    the rate grows back with every successful request;
+        - the key vault requests of one construction fail with
+    `DeadlineExceeded` after `deadline` seconds.
+    """
+
+    def __init__(
+        self,
+        rate: float = 100.0,
+        burst: int = 20,
+        min_rate: float = 1.0,
+        max_retries: int = 5,
+        backoff: float = 0.5,
+        max_backoff: float = 30.0,
+        deadline: Optional[float] = 60.0,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.deadline = deadline
+        self.throttled = 0
+        self._clock = clock
+        self._sleep = sleep
+        self._random = random.Random()
+        self._lock = threading.Lock()
+        self._buckets: Dict[str, _TokenBucket] = {}
+
+    def start(self) -> Optional[float]:
+        """
+        Return the deadline of a construction which starts now.
+        """
+        if self.deadline is None:
+            return None
+        return self._clock() + self.deadline
+
+    def call(
+        self,
+        vault_url: str,
+        request: Callable[[], T],
+        deadline: Optional[float] = None,
+        on_retry: Optional[Callable[[], None]] = None,
+    ) -> T:
+        from azure.core.exceptions import HttpResponseError  # pylint: disable=C0415
+
+        attempt = 0
+        while True:
+            self._sleep(self._reserve(vault_url, deadline))
+            try:
+                result = request()
+            except HttpResponseError as e:
+                self._throttled(vault_url, e, attempt)
+                attempt += 1
+                if on_retry is not None:
+                    on_retry()
+            else:
+                self._succeeded(vault_url)
+                return result
+
+    async def acall(
+        self,
+        vault_url: str,
+        request: Callable[[], Awaitable[T]],
+        deadline: Optional[float] = None,
+        on_retry: Optional[Callable[[], None]] = None,
+    ) -> T:
+        import asyncio  # pylint: disable=C0415
+
+        from azure.core.exceptions import HttpResponseError  # pylint: disable=C0415
+
+        attempt = 0
+        while True:
+            await asyncio.sleep(self._reserve(vault_url, deadline))
+            try:
+                result = await request()
+            except HttpResponseError as e:
+                self._throttled(vault_url, e, attempt)
+                attempt += 1
+                if on_retry is not None:
+                    on_retry()
+            else:
+                self._succeeded(vault_url)
+                return result
+
+    def _bucket(self, vault_url: str) -> _TokenBucket:
+        key = normalize_vault_url(vault_url)
+        if key not in self._buckets:
+            self._buckets[key] = _TokenBucket(self.rate, self.burst, self._clock())
+        return self._buckets[key]
+
+    def _reserve(self, vault_url: str, deadline: Optional[float]) -> float:
+        with self._lock:
+            now = self._clock()
+            delay = self._bucket(vault_url).reserve(now)
+        if deadline is not None and now + delay > deadline:
+            raise DeadlineExceeded(
+                f"{vault_url} cannot be queried before the deadline, "
+                f"the next request is scheduled in {delay:.1f}s"
+            )
+        return delay
+
+    def _throttled(
+        self, vault_url: str, error: "HttpResponseError", attempt: int
+    ) -> None:
+        if error.status_code not in THROTTLED_STATUS_CODES:
+            raise error
+        if attempt >= self.max_retries:
+            logger.warning("%s is still throttled after %d retries", vault_url, attempt)
+            raise error
+
+        delay = _retry_after(error)
+        if delay is None:
+            delay = min(self.max_backoff, self.backoff * 2 ** attempt)
+        # the jitter spreads the retries of the threads and the replicas
+        delay += self._random.uniform(0, self.backoff)
+        with self._lock:
+            self.throttled += 1
+            now = self._clock()
+            bucket = self._bucket(vault_url)
+            bucket.blocked_until = max(bucket.blocked_until, now + delay)
+            bucket.rate = max(self.min_rate, bucket.rate / 2)
+        logger.info("%s is throttled, retrying in %.1fs", vault_url, delay)
+
+    def _succeeded(self, vault_url: str) -> None:
+        with self._lock:
+            bucket = self._bucket(vault_url)
+            if bucket.rate < bucket.max_rate:
+                bucket.rate = min(bucket.max_rate, bucket.rate + bucket.max_rate / 20)
+
+
+def _retry_after(error: "HttpResponseError") -> Optional[float]:
+    headers = getattr(error.response, "headers", None) or {}
+    try:
+        return max(0.0, float(headers["Retry-After"]))
+    except (KeyError, TypeError, ValueError):
+        # missing or an HTTP date, which key vault does not send
+        return None
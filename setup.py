@@ -26,6 +26,9 @@ setuptools.setup(
     long_description_content_type="text/markdown",
     url="https://github.com/kewtree1408/pydantic-azure-secrets",
     packages=setuptools.find_packages(),
+    entry_points={
+        "console_scripts": ["pydantic-azure-secrets=pydantic_azure_secrets.cli:main"],
+    },
     classifiers=[
         "Programming Language :: Python :: 3",
         "License :: OSI Approved :: MIT License",
@@ -37,8 +40,10 @@ setuptools.setup(
         "python-dotenv==0.15.0",
         "azure-identity==1.5.0",
         "azure-keyvault-secrets==4.2.0",
+        "cryptography==3.3.1",
     ],
     extras_require={
+        "aio": ["aiohttp==3.7.3"],
         "test": [
             "pytest==6.2.1",
             "pytest-cov==2.11.1",
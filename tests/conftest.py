@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+
+import asyncio
+import threading
+import time
+from contextlib import ExitStack
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from unittest import mock
+
+import pytest
+from azure.core.exceptions import ResourceNotFoundError
+from azure.keyvault.secrets import KeyVaultSecret, SecretProperties
+
+from pydantic_azure_secrets import SecretBackend
+
+VAULT_URL = "https://pydenticlib-test.vault.azure.net/"
+UPDATED = datetime(2021, 1, 1, tzinfo=timezone.utc)
+
+
+class FakeSecretClient:
+    """
+    In-memory replacement of azure SecretClient
+    """
+
+    def __init__(self, secrets, latency=0.0, vault_url=VAULT_URL):
+        self.secrets = secrets
+        self.latency = latency
+        self.vault_url = vault_url
+        self.versions = {}
+        self.error = None
+        self.calls = []
+        self.threads = set()
+        self._lock = threading.Lock()
+
+    def get_secret(self, name, **kwargs):
+        with self._lock:
+            self.calls.append(name)
+            self.threads.add(threading.get_ident())
+        time.sleep(self.latency)
+        return self._secret(name)
+
+    def list_properties_of_secrets(self, **kwargs):
+        with self._lock:
+            self.calls.append("list_properties_of_secrets")
+        # like the key vault, the listed ids have no version
+        return [self._properties(name, versioned=False) for name in self.secrets]
+
+    def rotate(self, name, value):
+        self.secrets[name] = value
+        self.versions[name.lower()] = self.versions.get(name.lower(), 1) + 1
+
+    def _properties(self, name, versioned=True):
+        version = self.versions.get(name.lower(), 1)
+        secret_id = f"{self.vault_url.rstrip('/')}/secrets/{name}"
+        if versioned:
+            secret_id = f"{secret_id}/version{version}"
+        # every new version updates the timestamp of the secret
+        updated = UPDATED + timedelta(minutes=version)
+        attributes = SimpleNamespace(enabled=True, updated=updated)
+        return SecretProperties(attributes, secret_id)
+
+    def _secret(self, name):
+        if self.error is not None:
+            raise self.error
+        # secret names are case-insensitive
+        secrets = {key.lower(): value for key, value in self.secrets.items()}
+        if name.lower() not in secrets:
+            raise ResourceNotFoundError(f"{name} not found")
+        return KeyVaultSecret(self._properties(name), secrets[name.lower()])
+
+
+class FakeAsyncSecretClient(FakeSecretClient):
+    """
+    In-memory replacement of azure asyncio SecretClient
+    """
+
+    def __init__(self, secrets, latency=0.0, vault_url=VAULT_URL):
+        super().__init__(secrets, latency, vault_url)
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.closed = False
+
+    async def get_secret(self, name, **kwargs):
+        self.calls.append(name)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(self.latency)
+        self.in_flight -= 1
+        return self._secret(name)
+
+    async def list_properties_of_secrets(self, **kwargs):
+        for properties in super().list_properties_of_secrets():
+            yield properties
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        self.closed = True
+
+
+def run_async(coroutine):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+@pytest.fixture
+def patch_vault():
+    """
+    Serve the key vaults of settings classes from a fake until the end of
+    the test, and return the fake:
+
+        fake_client = patch_vault(FakeSecretClient(secrets), SettingsA, SettingsB)
+
+    A `SecretBackend`, e.g. `InMemoryBackend`, is returned by
+    `Config.get_azure_backend`, a `FakeAsyncSecretClient` by
+    `Config.get_azure_async_client` and any other fake by
+    `Config.get_azure_client`. A dict holds the fakes by key vault URL.
+    """
+    with ExitStack() as stack:
+
+        def patch(fake, *settings_classes):
+            def serve(vault_url, *args):
+                return fake.get(vault_url) if isinstance(fake, dict) else fake
+
+            sample = next(iter(fake.values())) if isinstance(fake, dict) else fake
+            if isinstance(sample, SecretBackend):
+                patches = {"get_azure_backend": serve}
+            elif isinstance(sample, FakeAsyncSecretClient):
+                patches = {
+                    "get_azure_async_credential": lambda: FakeAsyncSecretClient({}),
+                    "get_azure_async_client": serve,
+                }
+            else:
+                patches = {"get_azure_client": serve}
+
+            for settings_cls in settings_classes:
+                for method, side_effect in patches.items():
+                    stack.enter_context(
+                        mock.patch.object(
+                            settings_cls.__config__, method, side_effect=side_effect
+                        )
+                    )
+            return fake
+
+        yield patch
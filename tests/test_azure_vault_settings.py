@@ -1,5 +1,7 @@
 #!/usr/bin/env python3
 
+import subprocess
+import sys
 from typing import Any
 from unittest import mock
 
@@ -8,6 +10,7 @@ import pytest
 from pathlib import Path
 
 from pydantic_azure_secrets import AzureVaultSettings
+from tests.conftest import FakeAsyncSecretClient, FakeSecretClient, run_async
 
 PWD = Path(__file__).parent.absolute()
 
@@ -100,6 +103,33 @@ class SettingsAzureMissingFields(AzureVaultSettings):
         azure_keyvault = "https://pydenticlib-test.vault.azure.net/"
 
 
+class SettingsAzureKVSkipResolved(SettingsAzureKV):
+    """
+    Example of settings which query azure keyvault only
+    for the fields missing in other sources
+    """
+
+    class Config:
+        azure_keyvault_skip_resolved = True
+
+
+class SettingsAzureKVConcurrent(AzureVaultSettings):
+    """
+    Example of settings which fetch azure keyvault secrets in parallel
+    """
+
+    field1: str = pydantic.Field(
+        "default_value1", env=["first_field1", "second_field1", "third_field1"]
+    )
+    field2: str = "default_value2"
+    field3: str = "default_value3"
+
+    class Config:
+        env_prefix = "test_prefix_"
+        azure_keyvault = "https://pydenticlib-test.vault.azure.net/"
+        azure_keyvault_max_workers = 4
+
+
 @mock.patch("pydantic_azure_secrets.azure_vault_settings.SecretClient")
 @mock.patch("pydantic_azure_secrets.azure_vault_settings.DefaultAzureCredential")
 def test_very_simple(secret_client_mock, creds_mock):
@@ -245,20 +275,20 @@ def test_secret_dir_with_missing_fields(secret_client_mock, creds_mock, monkeypa
 def test_mocked_keyvault(secret_client_mock, creds_mock, monkeypatch):
     # This test check a mocked integration with Azure keyvault
     settings = SettingsAzureKV()
-    assert secret_client_mock.call_count == 2
-    assert creds_mock.call_count == 2
+    assert secret_client_mock.call_count == 1
+    assert creds_mock.call_count == 1
 
     settings = SettingsAzureKV(_env_file=PWD / "test_data/.dotenvfile")
-    assert secret_client_mock.call_count == 4
-    assert creds_mock.call_count == 4
+    assert secret_client_mock.call_count == 2
+    assert creds_mock.call_count == 2
 
     settings = SettingsAzureKV(
         _env_file=PWD / "test_data/.dotenvfile", _env_file_encoding="utf-8"
     )
     assert settings.field1 == "value1_from_.dotenvfile"
     assert settings.field2 == "value2_from_.dotenvfile"
-    assert secret_client_mock.call_count == 6
-    assert creds_mock.call_count == 6
+    assert secret_client_mock.call_count == 3
+    assert creds_mock.call_count == 3
 
     settings = SettingsAzureKV(
         _env_file=PWD / "test_data/.dotenvfile",
@@ -268,14 +298,14 @@ def test_mocked_keyvault(secret_client_mock, creds_mock, monkeypatch):
     )
     assert settings.field1 == "value1_from_.dotenvfile"
     assert settings.field2 == "value2_from_.dotenvfile"
-    assert secret_client_mock.call_count == 8
-    assert creds_mock.call_count == 8
+    assert secret_client_mock.call_count == 4
+    assert creds_mock.call_count == 4
 
     settings = SettingsAzureKV(_secrets_dir=PWD / "test_data/.secret_dir_init")
     assert settings.field1 == "value1_from_.secret_dir_init"
     assert settings.field2 == "value2_from_.secret_dir_init"
-    assert secret_client_mock.call_count == 10
-    assert creds_mock.call_count == 10
+    assert secret_client_mock.call_count == 5
+    assert creds_mock.call_count == 5
 
     settings = SettingsAzureKV(
         _secrets_dir=PWD / "test_data/.secret_dir_init",
@@ -283,22 +313,174 @@ def test_mocked_keyvault(secret_client_mock, creds_mock, monkeypatch):
     )
     assert settings.field1 == "value1_from_.secret_dir_init"
     assert settings.field2 == "value2_from_.secret_dir_init"
-    assert secret_client_mock.call_count == 12
-    assert creds_mock.call_count == 12
+    assert secret_client_mock.call_count == 6
+    assert creds_mock.call_count == 6
 
     settings = SettingsAzureKV(
         _azure_keyvault="https://pydantictestinit.vault.azure.net/",
     )
-    assert secret_client_mock.call_count == 14
-    assert creds_mock.call_count == 14
+    assert secret_client_mock.call_count == 7
+    assert creds_mock.call_count == 7
 
     monkeypatch.setenv("test_prefix_field1", "value1_from_environment", prepend=False)
     monkeypatch.setenv("test_PREFIX_field2", "value2_from_environment", prepend=False)
     settings = SettingsAzureKV()
     assert settings.field1 == "value1_from_environment"
     assert settings.field2 == "value2_from_environment"
-    assert secret_client_mock.call_count == 16
-    assert creds_mock.call_count == 16
+    assert secret_client_mock.call_count == 8
+    assert creds_mock.call_count == 8
+
+
+@mock.patch("pydantic_azure_secrets.azure_vault_settings.DefaultAzureCredential")
+@mock.patch("pydantic_azure_secrets.azure_vault_settings.SecretClient")
+def test_mocked_keyvault_skip_resolved(secret_client_mock, creds_mock, monkeypatch):
+    get_secret = secret_client_mock.return_value.get_secret
+    get_secret.return_value.value = "value_from_azureKV"
+
+    settings = SettingsAzureKVSkipResolved()
+    assert settings.field1 == "value_from_azureKV"
+    assert settings.field2 == "value_from_azureKV"
+    assert get_secret.call_count == 2
+
+    monkeypatch.setenv("test_prefix_field1", "value1_from_environment", prepend=False)
+    settings = SettingsAzureKVSkipResolved()
+    assert settings.field1 == "value1_from_environment"
+    assert settings.field2 == "value_from_azureKV"
+    assert get_secret.call_count == 3
+    get_secret.assert_called_with("test-prefix-field2")
+
+    settings = SettingsAzureKVSkipResolved(field2="value2_from_init")
+    assert settings.field1 == "value1_from_environment"
+    assert settings.field2 == "value2_from_init"
+    assert get_secret.call_count == 3
+    assert secret_client_mock.call_count == 2
+    assert creds_mock.call_count == 2
+
+
+@mock.patch("pydantic_azure_secrets.azure_vault_settings.DefaultAzureCredential")
+@mock.patch("pydantic_azure_secrets.azure_vault_settings.SecretClient")
+def test_mocked_keyvault_concurrent(secret_client_mock, creds_mock):
+    fake_client = FakeSecretClient(
+        {
+            "first-field1": "first_value1",
+            "second-field1": "second_value1",
+            "test-prefix-field2": "value2_from_azureKV",
+        },
+        latency=0.05,
+    )
+    secret_client_mock.return_value = fake_client
+
+    settings = SettingsAzureKVConcurrent()
+    # the last name from `env` wins, as with the sequential lookups
+    assert settings.field1 == "second_value1"
+    assert settings.field2 == "value2_from_azureKV"
+    assert settings.field3 == "default_value3"
+    assert sorted(fake_client.calls) == [
+        "first-field1",
+        "second-field1",
+        "test-prefix-field2",
+        "test-prefix-field3",
+        "third-field1",
+    ]
+    assert len(fake_client.threads) > 1
+
+
+@mock.patch("pydantic_azure_secrets.azure_vault_settings.AsyncAzureCredential")
+@mock.patch("pydantic_azure_secrets.azure_vault_settings.AsyncSecretClient")
+def test_mocked_keyvault_aload(secret_client_mock, creds_mock, monkeypatch):
+    fake_client = FakeAsyncSecretClient(
+        {
+            "first-field1": "first_value1",
+            "third-field1": "third_value1",
+            "test-prefix-field2": "value2_from_azureKV",
+            "test-prefix-field3": "value3_from_azureKV",
+        },
+        latency=0.01,
+    )
+    secret_client_mock.return_value = fake_client
+    creds_mock.return_value = FakeAsyncSecretClient({})
+
+    monkeypatch.setenv("test_prefix_field3", "value3_from_environment", prepend=False)
+    settings = run_async(SettingsAzureKVConcurrent.aload(field2="value2_from_init"))
+    assert isinstance(settings, SettingsAzureKVConcurrent)
+    assert settings.field1 == "third_value1"
+    assert settings.field2 == "value2_from_init"
+    assert settings.field3 == "value3_from_environment"
+    assert len(fake_client.calls) == 5
+    assert 1 < fake_client.max_in_flight <= 4
+    assert fake_client.closed
+    assert creds_mock.return_value.closed
+    secret_client_mock.assert_called_once_with(
+        vault_url="https://pydenticlib-test.vault.azure.net/",
+        credential=creds_mock.return_value,
+    )
+
+    with pytest.raises(pydantic.error_wrappers.ValidationError):
+        run_async(SettingsAzureKVConcurrent.aload(field2=["not", "a", "string"]))
+
+
+@mock.patch("pydantic_azure_secrets.azure_vault_settings.AsyncAzureCredential")
+@mock.patch("pydantic_azure_secrets.azure_vault_settings.AsyncSecretClient")
+def test_aload_without_keyvault(secret_client_mock, creds_mock):
+    settings = run_async(SettingsDotEnv.aload())
+    assert settings.field1 == "value1_from_test.env-file"
+    assert settings.field2 == "value2_from_test.env-file"
+    assert secret_client_mock.call_count == 0
+    assert creds_mock.call_count == 0
+
+
+@mock.patch("pydantic_azure_secrets.azure_vault_settings.DefaultAzureCredential")
+@mock.patch("pydantic_azure_secrets.azure_vault_settings.SecretClient")
+def test_mocked_keyvault_list_secrets(secret_client_mock, creds_mock):
+    fake_client = FakeSecretClient(
+        {
+            "First-Field1": "first_value1",
+            "test-prefix-field2": "value2_from_azureKV",
+            "unrelated-secret": "unrelated_value",
+        }
+    )
+    secret_client_mock.return_value = fake_client
+
+    class SettingsAzureKVListSecrets(SettingsAzureKVConcurrent):
+        class Config:
+            azure_keyvault_list_secrets = True
+
+    settings = SettingsAzureKVListSecrets()
+    assert settings.field1 == "first_value1"
+    assert settings.field2 == "value2_from_azureKV"
+    assert settings.field3 == "default_value3"
+    assert sorted(fake_client.calls) == [
+        "first-field1",
+        "list_properties_of_secrets",
+        "test-prefix-field2",
+    ]
+
+    fake_client = FakeAsyncSecretClient(fake_client.secrets)
+    with mock.patch(
+        "pydantic_azure_secrets.azure_vault_settings.AsyncSecretClient",
+        return_value=fake_client,
+    ), mock.patch(
+        "pydantic_azure_secrets.azure_vault_settings.AsyncAzureCredential",
+        return_value=FakeAsyncSecretClient({}),
+    ):
+        settings = run_async(SettingsAzureKVListSecrets.aload())
+    assert settings.field1 == "first_value1"
+    assert sorted(fake_client.calls) == [
+        "first-field1",
+        "list_properties_of_secrets",
+        "test-prefix-field2",
+    ]
+
+
+def test_azure_sdk_is_imported_on_demand():
+    code = (
+        "import sys, pydantic_azure_secrets\n"
+        "assert not any(m.startswith('azure') for m in sys.modules), 'imported'\n"
+        "assert 'asyncio' not in sys.modules and 'http.server' not in sys.modules\n"
+        "from pydantic_azure_secrets.azure_vault_settings import SecretClient\n"
+        "assert SecretClient.__module__.startswith('azure.keyvault.secrets')\n"
+    )
+    subprocess.run([sys.executable, "-c", code], cwd=str(PWD.parent), check=True)
 
 
 @pytest.mark.integration
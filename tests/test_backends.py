@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+
+import os
+import stat
+from typing import Any
+
+import pytest
+from azure.core.exceptions import ServiceRequestError
+
+from pydantic_azure_secrets import (
+    AzureVaultSettings,
+    FileBackend,
+    HttpBackend,
+    InMemoryBackend,
+    KeyVaultBackend,
+    SettingsRefresher,
+    SidecarServer,
+)
+from tests.conftest import VAULT_URL, FakeSecretClient, run_async
+
+OTHER_VAULT = "https://other.vault.azure.net/"
+
+in_memory = InMemoryBackend(VAULT_URL, {"test-prefix-field1": "value1_in_memory"})
+
+
+class SettingsInMemory(AzureVaultSettings):
+    """
+    Example of settings with the secrets of an in-memory backend
+    """
+
+    field1: Any = "default_value1"
+    field2: Any = "default_value2"
+
+    class Config:
+        env_prefix = "test_prefix_"
+        azure_keyvault = VAULT_URL
+
+        @classmethod
+        def get_azure_backend(cls, azure_keyvault):
+            return in_memory
+
+        @classmethod
+        def get_azure_client(cls, azure_keyvault):
+            raise AssertionError("the key vault must not be queried")
+
+
+def test_in_memory_backend():
+    settings = SettingsInMemory()
+    assert settings.field1 == "value1_in_memory"
+    assert settings.field2 == "default_value2"
+    assert run_async(SettingsInMemory.aload()) == settings
+
+    refresher = SettingsRefresher(SettingsInMemory)
+    assert not refresher.refresh()
+    in_memory.set("TEST-PREFIX-FIELD1", "rotated_value1")
+    assert refresher.refresh()
+    assert refresher.settings.field1 == "rotated_value1"
+    assert refresher.settings.secret_properties()["field1"].version == "2"
+    in_memory.set("test-prefix-field1", "value1_in_memory")
+
+
+def test_key_vault_backend():
+    fake_client = FakeSecretClient({"name1": "value1", "name2": "value2"}, latency=0.01)
+    backend = KeyVaultBackend(fake_client, max_workers=4)
+    secrets = backend.get_many(["name1", "name2", "missing"])
+    assert {name: secret.value for name, secret in secrets.items()} == {
+        "name1": "value1",
+        "name2": "value2",
+    }
+    assert sorted(fake_client.calls) == ["missing", "name1", "name2"]
+
+
+def test_file_backend(tmp_path):
+    path = tmp_path / "cache" / "secrets.json"
+    backend = FileBackend(VAULT_URL, path)
+    assert backend.get_many(["name1"]) == {}
+
+    FileBackend.write(path, VAULT_URL, {"Name1": "value1"})
+    FileBackend.write(path, OTHER_VAULT, {"name1": "other_value1"})
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+
+    secrets = backend.get_many(["name1", "name2"])
+    assert list(secrets) == ["name1"]
+    assert secrets["name1"].value == "value1"
+    # served from memory until the file changes
+    assert backend.get_many(["name1"])["name1"] is secrets["name1"]
+
+    FileBackend.write(path, VAULT_URL, {"name1": "value1_changed", "name2": "value2"})
+    secrets = backend.get_many(["name1", "name2"])
+    assert secrets["name1"].value == "value1_changed"
+    assert secrets["name2"].value == "value2"
+
+
+def test_http_sidecar():
+    backend = InMemoryBackend(VAULT_URL, {"name1": "value1"})
+    created = []
+
+    def backend_factory(vault_url):
+        created.append(vault_url)
+        return backend if vault_url == VAULT_URL else InMemoryBackend(vault_url)
+
+    with SidecarServer(backend_factory, [VAULT_URL, OTHER_VAULT]) as sidecar:
+        client = HttpBackend(VAULT_URL, sidecar.url)
+        secrets = client.get_many(["name1", "name2"])
+        assert {name: secret.value for name, secret in secrets.items()} == {
+            "name1": "value1"
+        }
+        assert secrets["name1"].properties.version == "1"
+
+        # served from the cache of the sidecar
+        backend.set("name1", "rotated_value1")
+        assert client.get_many(["name1"])["name1"].value == "value1"
+        assert sidecar.cache.hits == 1
+
+        assert HttpBackend(OTHER_VAULT, sidecar.url).get_many(["name1"]) == {}
+        assert created == [VAULT_URL, OTHER_VAULT]
+
+        # not an allowed key vault
+        with pytest.raises(ServiceRequestError, match="403"):
+            HttpBackend("https://unknown.vault.azure.net/", sidecar.url).get_many(
+                ["name1"]
+            )
+        assert created == [VAULT_URL, OTHER_VAULT]
+        url = sidecar.url
+
+    with pytest.raises(ServiceRequestError):
+        HttpBackend(VAULT_URL, url, timeout=1).get_many(["name1"])
+
+
+def test_unix_socket_sidecar(tmp_path):
+    backend = InMemoryBackend(VAULT_URL, {"name1": "value1"})
+    socket_path = tmp_path / "keyvault.sock"
+
+    with SidecarServer(
+        lambda vault_url: backend, [VAULT_URL], socket_path=socket_path
+    ) as sidecar:
+        assert sidecar.url == f"unix://{socket_path}"
+        assert stat.S_IMODE(os.stat(socket_path).st_mode) == 0o600
+        secrets = HttpBackend(VAULT_URL, sidecar.url).get_many(["name1", "name2"])
+        assert {name: secret.value for name, secret in secrets.items()} == {
+            "name1": "value1"
+        }
+        with pytest.raises(ServiceRequestError, match="403"):
+            HttpBackend(OTHER_VAULT, sidecar.url).get_many(["name1"])
+
+    assert not socket_path.exists()
+    with pytest.raises(ServiceRequestError):
+        HttpBackend(VAULT_URL, sidecar.url, timeout=1).get_many(["name1"])
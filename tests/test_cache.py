@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+
+from typing import Any
+from unittest import mock
+
+from pydantic_azure_secrets import AzureVaultSettings, SecretCache
+from tests.conftest import VAULT_URL, FakeSecretClient
+
+shared_cache = SecretCache(maxsize=16, ttl=60, not_found_ttl=10)
+
+
+class SettingsCached(AzureVaultSettings):
+    """
+    Example of settings which cache azure keyvault secrets
+    """
+
+    field1: Any = "default_value1"
+    field2: Any = "default_value2"
+
+    class Config:
+        env_prefix = "test_prefix_"
+        azure_keyvault = VAULT_URL
+        azure_keyvault_cache = shared_cache
+
+
+class OtherSettingsCached(SettingsCached):
+    """
+    Example of another settings class which shares the cache
+    """
+
+    field3: Any = "default_value3"
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_cache_ttl_and_not_found():
+    clock = FakeClock()
+    cache = SecretCache(ttl=60, not_found_ttl=10, clock=clock)
+    secret = mock.Mock(value="value")
+    cache.set(VAULT_URL, "found", secret)
+    cache.set(VAULT_URL, "missing", None)
+
+    assert cache.get(VAULT_URL, "FOUND").secret is secret
+    assert cache.get(VAULT_URL.rstrip("/"), "missing").secret is None
+    assert cache.get(VAULT_URL, "found", version="v1") is None
+    assert (cache.hits, cache.misses) == (2, 1)
+
+    clock.now = 30
+    assert cache.get(VAULT_URL, "found").secret is secret
+    assert cache.get(VAULT_URL, "missing") is None
+
+    clock.now = 61
+    assert cache.get(VAULT_URL, "found") is None
+    assert len(cache) == 0
+
+
+def test_cache_lru_eviction():
+    cache = SecretCache(maxsize=2)
+    cache.set(VAULT_URL, "first", mock.Mock())
+    cache.set(VAULT_URL, "second", mock.Mock())
+    cache.get(VAULT_URL, "first")
+    cache.set(VAULT_URL, "third", mock.Mock())
+
+    assert len(cache) == 2
+    assert cache.get(VAULT_URL, "second") is None
+    assert cache.get(VAULT_URL, "first") is not None
+    assert cache.get(VAULT_URL, "third") is not None
+
+    cache.invalidate(VAULT_URL, "first")
+    assert cache.get(VAULT_URL, "first") is None
+    # secret names are case-insensitive
+    cache.invalidate(VAULT_URL, "THIRD")
+    assert cache.get(VAULT_URL, "third") is None
+
+
+def test_settings_share_cache(patch_vault):
+    shared_cache.clear()
+    fake_client = patch_vault(
+        FakeSecretClient({"test-prefix-field1": "value1_from_azureKV"}),
+        SettingsCached,
+        OtherSettingsCached,
+    )
+
+    settings = SettingsCached()
+    assert settings.field1 == "value1_from_azureKV"
+    assert settings.field2 == "default_value2"
+    assert len(fake_client.calls) == 2
+
+    settings = SettingsCached()
+    assert settings.field1 == "value1_from_azureKV"
+    assert len(fake_client.calls) == 2
+
+    settings = OtherSettingsCached()
+    assert settings.field1 == "value1_from_azureKV"
+    assert settings.field3 == "default_value3"
+    assert fake_client.calls[2:] == ["test-prefix-field3"]
+
+    assert shared_cache.hits == 4
+    assert shared_cache.misses == 3
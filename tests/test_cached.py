@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+
+import os
+from typing import Any, List
+
+import pytest
+
+from pydantic_azure_secrets import AzureVaultSettings, SettingsRefresher
+from tests.conftest import VAULT_URL, FakeSecretClient
+
+
+class SettingsCached(AzureVaultSettings):
+    """
+    Example of settings constructed once for the same inputs
+    """
+
+    field1: Any = "default_value1"
+    field2: Any = "default_value2"
+    hosts: List[str] = []
+
+    class Config:
+        env_prefix = "test_prefix_"
+        azure_keyvault = VAULT_URL
+        azure_keyvault_cached_maxsize = 2
+
+
+@pytest.fixture
+def fake_client(patch_vault):
+    yield patch_vault(
+        FakeSecretClient({"test-prefix-field1": "value1_from_azureKV"}), SettingsCached
+    )
+    SettingsCached.invalidate_cached()
+
+
+def test_cached(fake_client):
+    settings = SettingsCached.cached()
+    assert settings.field1 == "value1_from_azureKV"
+    assert len(fake_client.calls) == 3
+
+    fake_client.calls.clear()
+    assert SettingsCached.cached() is settings
+    assert fake_client.calls == []
+    assert SettingsCached.__azure_cached__.hits == 1
+
+    assert SettingsCached.cached(hosts=["a"]) is SettingsCached.cached(hosts=["a"])
+    assert SettingsCached.cached(hosts=["a"]) is not settings
+    assert SettingsCached.cached(field2=1) is not SettingsCached.cached(field2=True)
+    # bounded, the least recently used instances are evicted
+    assert len(SettingsCached.__azure_cached__) == 2
+    assert SettingsCached.cached() is not settings
+
+    SettingsCached.invalidate_cached()
+    assert len(SettingsCached.__azure_cached__) == 0
+
+
+def test_cached_detects_changed_sources(fake_client, monkeypatch, tmp_path):
+    settings = SettingsCached.cached()
+    monkeypatch.setenv("TEST_PREFIX_FIELD2", "value2_from_environment")
+    changed = SettingsCached.cached()
+    assert changed.field2 == "value2_from_environment"
+    # an unrelated environment variable
+    monkeypatch.setenv("test_prefix_unknown", "value")
+    assert SettingsCached.cached() is changed
+    monkeypatch.delenv("TEST_PREFIX_FIELD2")
+    assert SettingsCached.cached() is not changed
+    assert SettingsCached.cached().field2 == settings.field2
+
+    env_file = tmp_path / "test.env"
+    env_file.write_text("test_prefix_field2=value2_from_dotenv\n")
+    assert SettingsCached.cached(_env_file=env_file).field2 == "value2_from_dotenv"
+    env_file.write_text("test_prefix_field2=value2_from_dotenv_changed\n")
+    assert (
+        SettingsCached.cached(_env_file=env_file).field2 == "value2_from_dotenv_changed"
+    )
+
+    secrets_dir = tmp_path / "secrets"
+    secrets_dir.mkdir()
+    cached = SettingsCached.cached(_secrets_dir=secrets_dir)
+    assert cached.field2 == "default_value2"
+    (secrets_dir / "test_prefix_field2").write_text("value2_from_secrets_dir")
+    cached = SettingsCached.cached(_secrets_dir=secrets_dir)
+    assert cached.field2 == "value2_from_secrets_dir"
+    assert SettingsCached.cached(_secrets_dir=secrets_dir) is cached
+
+    other_vault = "https://other.vault.azure.net/"
+    assert SettingsCached.cached(_azure_keyvault=other_vault) is not cached
+
+
+def test_cached_invalidated_on_rotation(fake_client):
+    settings = SettingsCached.cached()
+    refresher = SettingsRefresher(SettingsCached)
+    fake_client.rotate("test-prefix-field1", "value1_rotated")
+    assert refresher.refresh()
+    assert SettingsCached.cached() is not settings
+    assert SettingsCached.cached().field1 == "value1_rotated"
+
+
+@pytest.mark.skipif(
+    not hasattr(os, "register_at_fork"), reason="requires os.register_at_fork"
+)
+def test_cached_is_empty_in_forked_child(fake_client):
+    SettingsCached.cached()
+    pid = os.fork()
+    if pid == 0:
+        os._exit(len(SettingsCached.__azure_cached__))
+    _, status = os.waitpid(pid, 0)
+    assert os.WEXITSTATUS(status) == 0
+    assert len(SettingsCached.__azure_cached__) == 1
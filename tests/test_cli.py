@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+
+import json
+import os
+import stat
+from typing import Any, Dict, List
+from unittest import mock
+
+import pydantic
+import pytest
+
+from pydantic_azure_secrets import AzureVaultSettings, FileBackend, SecretFile
+from pydantic_azure_secrets.cli import main
+from tests.conftest import VAULT_URL, FakeSecretClient
+
+
+class SettingsExported(AzureVaultSettings):
+    """
+    Example of settings exported in a deployment pipeline
+    """
+
+    field1: str = "default_value1"
+    field2: str = pydantic.Field("default_value2", env=["first_field2", "old_field2"])
+    options: Dict[str, Any] = {}
+    hosts: List[str] = []
+
+    class Config:
+        env_prefix = "test_prefix_"
+        azure_keyvault = VAULT_URL
+        azure_keyvault_skip_resolved = True
+
+
+class SettingsExportedReader(SettingsExported):
+    # the replicas don't use the key vault, e.g. `azure_keyvault` is empty
+    class Config:
+        azure_keyvault = None
+
+        @classmethod
+        def get_azure_client(cls, azure_keyvault):
+            raise AssertionError("the key vault must not be queried")
+
+
+SECRETS = {
+    "test-prefix-field1": 'value1 "quoted"\nsecond line',
+    "old-field2": "value2_from_azureKV",
+    "test-prefix-options": '{"timeout": 1.5, "path": "C:\\\\tmp"}',
+}
+
+
+@pytest.fixture
+def fake_client(patch_vault):
+    return patch_vault(FakeSecretClient(dict(SECRETS)), SettingsExported)
+
+
+def test_export_dotenv(fake_client, tmp_path, capsys, monkeypatch):
+    # resolved in the pipeline, still exported for the replicas
+    monkeypatch.setenv("test_prefix_field1", "value1_from_environment")
+    path = tmp_path / "exported.env"
+    assert main(["export", f"{__name__}:SettingsExported", "--dotenv", str(path)]) == 0
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+    assert sorted(fake_client.calls) == [
+        "first-field2",
+        "old-field2",
+        "test-prefix-field1",
+        "test-prefix-hosts",
+        "test-prefix-options",
+    ]
+    assert "SettingsExported resolved in" in capsys.readouterr().err
+
+    monkeypatch.delenv("test_prefix_field1")
+    settings = SettingsExportedReader(_env_file=path)
+    assert settings.field1 == SECRETS["test-prefix-field1"]
+    assert settings.field2 == "value2_from_azureKV"
+    assert settings.options == {"timeout": 1.5, "path": "C:\\tmp"}
+    assert settings.hosts == []
+
+
+class SettingsExportedFlat(SettingsExported):
+    options: str = ""
+
+
+class SettingsExportedFlatReader(SettingsExportedFlat):
+    class Config:
+        azure_keyvault = None
+
+
+def test_export_secrets_dir(fake_client, tmp_path, capsys):
+    path = tmp_path / "secrets"
+    assert (
+        main(
+            [
+                "export",
+                f"{__name__}:SettingsExportedFlat",
+                "--secrets-dir",
+                str(path),
+                "--file-backend",
+                str(tmp_path / "secrets.json"),
+                "--json",
+            ]
+        )
+        == 0
+    )
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o700
+    assert sorted(os.listdir(path)) == [
+        "first_field2",
+        "test_prefix_field1",
+        "test_prefix_options",
+    ]
+    assert stat.S_IMODE(os.stat(path / "first_field2").st_mode) == 0o600
+    report = json.loads(capsys.readouterr().out)
+    assert report["not_found"] == 2
+
+    settings = SettingsExportedFlatReader(_secrets_dir=path)
+    assert settings.field1 == SECRETS["test-prefix-field1"]
+    assert settings.field2 == "value2_from_azureKV"
+    assert settings.options == SECRETS["test-prefix-options"]
+
+    backend = FileBackend(VAULT_URL, tmp_path / "secrets.json")
+    assert backend.get_many(["old-field2"])["old-field2"].value == "value2_from_azureKV"
+
+
+class SettingsExportedSecretFile(SettingsExportedFlat):
+    bundle: SecretFile
+
+
+class SettingsExportedSecretFileReader(SettingsExportedSecretFile):
+    class Config:
+        azure_keyvault = None
+
+
+@pytest.mark.parametrize("option", ["--dotenv", "--secrets-dir"])
+def test_export_secret_file(fake_client, tmp_path, option):
+    bundle = "-----BEGIN CERTIFICATE-----\n${not expanded}\n" * 100
+    fake_client.secrets["test-prefix-bundle"] = bundle
+    path = tmp_path / "exported"
+    assert (
+        main(["export", f"{__name__}:SettingsExportedSecretFile", option, str(path)])
+        == 0
+    )
+    # the secret is exported as the path of a file next to the export
+    bundle_path = tmp_path / "exported.files" / "test_prefix_bundle"
+    assert stat.S_IMODE(os.stat(bundle_path.parent).st_mode) == 0o700
+    assert stat.S_IMODE(os.stat(bundle_path).st_mode) == 0o600
+
+    if option == "--dotenv":
+        settings = SettingsExportedSecretFileReader(_env_file=path)
+    else:
+        settings = SettingsExportedSecretFileReader(_secrets_dir=path)
+    assert settings.bundle == SecretFile(bundle_path)
+    assert settings.bundle.read_text() == bundle
+    assert settings.field1 == SECRETS["test-prefix-field1"]
+
+
+def test_export_dry_run(capsys):
+    with mock.patch.object(
+        SettingsExported.__config__, "get_azure_client"
+    ) as get_azure_client:
+        assert main(["export", f"{__name__}:SettingsExported", "--dry-run"]) == 0
+    assert get_azure_client.call_count == 0
+    assert capsys.readouterr().out.split() == [
+        VAULT_URL,
+        "test-prefix-field1",
+        "old-field2",
+        "first-field2",
+        "test-prefix-options",
+        "test-prefix-hosts",
+    ]
+
+
+def test_keyvault_requests_and_secrets(fake_client):
+    other_vault = "https://other.vault.azure.net/"
+    assert SettingsExported.keyvault_requests(other_vault) == {
+        other_vault: [
+            "test-prefix-field1",
+            "old-field2",
+            "first-field2",
+            "test-prefix-options",
+            "test-prefix-hosts",
+        ]
+    }
+
+    settings = SettingsExported(field1="value1_from_init")
+    secrets = settings.keyvault_secrets()
+    assert list(secrets) == [VAULT_URL]
+    assert {name: secret.value for name, secret in secrets[VAULT_URL].items()} == {
+        "old-field2": SECRETS["old-field2"],
+        "test-prefix-options": SECRETS["test-prefix-options"],
+    }
+
+
+def test_export_errors(fake_client, tmp_path, capsys):
+    assert main(["export", f"{__name__}:Missing", "--dry-run"]) == 1
+    assert main(["export", __name__, "--dry-run"]) == 1
+
+    fake_client.secrets["test-prefix-field1"] = "${HOME}"
+    path = tmp_path / "exported.env"
+    assert main(["export", f"{__name__}:SettingsExported", "--dotenv", str(path)]) == 1
+    assert not path.exists()
+    assert "use --secrets-dir" in capsys.readouterr().err
+
+    # complex values are not parsed from the secrets directory by pydantic
+    path = tmp_path / "secrets"
+    args = ["export", f"{__name__}:SettingsExported", "--secrets-dir", str(path)]
+    assert main(args) == 1
+    assert not path.exists()
+    assert "use --dotenv" in capsys.readouterr().err
+
+    with pytest.raises(SystemExit):
+        main(["export", f"{__name__}:SettingsExported"])
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+
+from typing import Any
+from unittest import mock
+
+import pytest
+
+from pydantic_azure_secrets import AzureVaultSettings, ClientRegistry, shared_clients
+
+
+class SettingsSharedClient(AzureVaultSettings):
+    """
+    Example of settings which reuse azure credential and keyvault client
+    """
+
+    field1: Any = "default_value1"
+
+    class Config:
+        env_prefix = "test_prefix_"
+        azure_keyvault = "https://pydenticlib-test.vault.azure.net/"
+        azure_keyvault_shared_client = True
+
+
+class OtherSettingsSharedClient(SettingsSharedClient):
+    """
+    Example of another settings class with the same keyvault
+    """
+
+    field2: Any = "default_value2"
+
+
+@pytest.fixture(autouse=True)
+def reset_shared_clients():
+    shared_clients.reset()
+    yield
+    shared_clients.reset()
+
+
+@mock.patch("pydantic_azure_secrets.azure_vault_settings.DefaultAzureCredential")
+@mock.patch("pydantic_azure_secrets.azure_vault_settings.SecretClient")
+def test_shared_client(secret_client_mock, creds_mock):
+    SettingsSharedClient()
+    SettingsSharedClient()
+    OtherSettingsSharedClient(_azure_keyvault="https://pydenticlib-test.vault.azure.net")
+    assert secret_client_mock.call_count == 1
+    assert creds_mock.call_count == 1
+    assert secret_client_mock.return_value.get_secret.call_count == 4
+
+    OtherSettingsSharedClient(_azure_keyvault="https://pydantictestinit.vault.azure.net/")
+    assert secret_client_mock.call_count == 2
+    assert creds_mock.call_count == 1
+    assert len(shared_clients) == 2
+
+    shared_clients.close()
+    assert secret_client_mock.return_value.close.call_count == 2
+    assert creds_mock.return_value.close.call_count == 1
+    assert len(shared_clients) == 0
+
+    SettingsSharedClient()
+    assert secret_client_mock.call_count == 3
+    assert creds_mock.call_count == 2
+
+
+def test_registry_reset_does_not_close():
+    registry = ClientRegistry()
+    credential = mock.Mock()
+    credential_factory = mock.Mock(return_value=credential)
+    client = registry.get_client(
+        "https://vault.azure.net/", lambda cred: mock.Mock(cred=cred), credential_factory
+    )
+    assert client.cred is credential
+    assert (
+        registry.get_client("https://vault.azure.net", mock.Mock(), credential_factory)
+        is client
+    )
+    assert credential_factory.call_count == 1
+
+    registry.reset()
+    assert len(registry) == 0
+    assert client.close.call_count == 0
+    assert credential.close.call_count == 0
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+
+from typing import Any
+from unittest import mock
+
+import pytest
+
+from pydantic_azure_secrets import (
+    AzureVaultSettings,
+    InMemoryBackend,
+    OpenTelemetryReporter,
+    PrometheusReporter,
+    SecretCache,
+)
+from tests.conftest import VAULT_URL
+
+reports = []
+prometheus = PrometheusReporter()
+
+
+class SettingsInstrumented(AzureVaultSettings):
+    """
+    Example of settings which report the timings of the construction
+    """
+
+    field1: Any = "default_value1"
+    field2: Any = "default_value2"
+    field3: int
+
+    class Config:
+        env_prefix = "test_prefix_"
+        azure_keyvault = VAULT_URL
+        azure_keyvault_cache = SecretCache()
+
+        @staticmethod
+        def azure_keyvault_instrumentation(report):
+            reports.append(report)
+            prometheus(report)
+
+
+@pytest.fixture
+def backend(patch_vault):
+    reports.clear()
+    SettingsInstrumented.__config__.azure_keyvault_cache.clear()
+    return patch_vault(
+        InMemoryBackend(
+            VAULT_URL,
+            {"test-prefix-field1": "value1_from_azureKV", "test-prefix-field3": "33"},
+        ),
+        SettingsInstrumented,
+    )
+
+
+def test_load_report(backend, monkeypatch):
+    monkeypatch.setenv("test_prefix_field2", "value2_from_environment")
+    SettingsInstrumented()
+    SettingsInstrumented()
+
+    first, second = reports
+    assert first.settings_name == "SettingsInstrumented"
+    assert set(first.durations) == {"secrets_dir", "environ", "keyvault", "validation"}
+    assert first.total >= first.durations["keyvault"]
+    assert set(first.secret_latencies) == {
+        "test-prefix-field1",
+        "test-prefix-field2",
+        "test-prefix-field3",
+    }
+    assert (first.cache_hits, first.cache_misses, first.not_found) == (0, 3, 1)
+    assert (second.cache_hits, second.cache_misses, second.not_found) == (3, 0, 0)
+    assert second.secret_latencies == {}
+    assert first.retries == 0
+    assert not hasattr(SettingsInstrumented(), "_azure_report")
+
+
+def test_load_report_on_validation_error(backend):
+    backend.delete("test-prefix-field3")
+    with pytest.raises(ValueError):
+        SettingsInstrumented()
+    assert len(reports) == 1
+    assert reports[0].not_found == 2
+
+
+def test_reports_contain_no_values(backend):
+    SettingsInstrumented()
+
+    text = repr(reports[0].as_dict()) + prometheus.render()
+    assert "test-prefix-field1" in text
+    assert "value1_from_azureKV" not in text
+
+
+def test_prometheus_reporter(backend):
+    reporter = PrometheusReporter(prefix="app")
+    SettingsInstrumented()
+    SettingsInstrumented()
+    for report in reports:
+        reporter(report)
+
+    lines = reporter.render().splitlines()
+    assert 'app_loads_total{settings="SettingsInstrumented"} 2' in lines
+    assert 'app_cache_hits_total{settings="SettingsInstrumented"} 3' in lines
+    assert 'app_not_found_total{settings="SettingsInstrumented"} 1' in lines
+    assert (
+        'app_secret_fetch_seconds_count{settings="SettingsInstrumented",'
+        'secret="test-prefix-field1"} 1'
+    ) in lines
+
+
+def test_opentelemetry_reporter(backend):
+    tracer = mock.Mock()
+    reporter = OpenTelemetryReporter(tracer)
+    SettingsInstrumented()
+    reporter(reports[0])
+
+    tracer.start_span.assert_called_once_with(
+        "SettingsInstrumented load", start_time=int(reports[0].started_at * 1e9)
+    )
+    span = tracer.start_span.return_value
+    span.set_attribute.assert_any_call("azure_keyvault.not_found", 1)
+    span.end.assert_called_once()
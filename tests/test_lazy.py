@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+
+import pickle
+import threading
+from typing import Any
+
+import pydantic
+import pytest
+
+from pydantic_azure_secrets import AzureVaultSettings
+from tests.conftest import VAULT_URL, FakeSecretClient
+
+
+class SettingsLazy(AzureVaultSettings):
+    """
+    Example of settings which fetch azure keyvault secrets on the first access
+    """
+
+    field1: Any = "default_value1"
+    field2: Any = "default_value2"
+    field3: int = 3
+    field_required: str
+
+    class Config:
+        env_prefix = "test_prefix_"
+        azure_keyvault = VAULT_URL
+        azure_keyvault_lazy = True
+
+
+@pytest.fixture
+def fake_client(patch_vault):
+    return patch_vault(
+        FakeSecretClient(
+            {
+                "test-prefix-field1": "value1_from_azureKV",
+                "test-prefix-field3": "33",
+                "test-prefix-field-required": "required_from_azureKV",
+            },
+            latency=0.01,
+        ),
+        SettingsLazy,
+    )
+
+
+def test_lazy_fields(fake_client, monkeypatch):
+    monkeypatch.setenv("test_prefix_field2", "value2_from_environment")
+    settings = SettingsLazy()
+    assert fake_client.calls == []
+    assert settings.field2 == "value2_from_environment"
+
+    assert settings.field1 == "value1_from_azureKV"
+    assert settings.field1 == "value1_from_azureKV"
+    assert fake_client.calls == ["test-prefix-field1"]
+
+    assert settings.field3 == 33
+    assert settings.__fields_set__ == {"field1", "field2", "field3"}
+    assert settings.dict() == {
+        "field1": "value1_from_azureKV",
+        "field2": "value2_from_environment",
+        "field3": 33,
+        "field_required": "required_from_azureKV",
+    }
+    assert len(fake_client.calls) == 3
+
+    settings = pickle.loads(pickle.dumps(SettingsLazy()))
+    assert settings.field_required == "required_from_azureKV"
+
+    with pytest.raises(AttributeError):
+        settings.unknown_field
+
+
+def test_lazy_fields_validation(fake_client):
+    fake_client.secrets["test-prefix-field3"] = "not a number"
+    del fake_client.secrets["test-prefix-field1"]
+    del fake_client.secrets["test-prefix-field-required"]
+
+    settings = SettingsLazy()
+    assert settings.field1 == "default_value1"
+    with pytest.raises(pydantic.ValidationError):
+        settings.field3
+    with pytest.raises(pydantic.ValidationError):
+        settings.field_required
+
+    settings = SettingsLazy(field_required="required_from_init")
+    assert settings.field_required == "required_from_init"
+    with pytest.raises(pydantic.ValidationError):
+        SettingsLazy(field2={"not": "a string"}, field_required=["a", "list"])
+
+
+def test_lazy_fields_concurrent_access(fake_client):
+    settings = SettingsLazy()
+    values = []
+
+    def read_field():
+        values.append(settings.field1)
+
+    threads = [threading.Thread(target=read_field) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert values == ["value1_from_azureKV"] * 8
+    assert fake_client.calls == ["test-prefix-field1"]
+
+
+class SettingsLazyConcurrent(SettingsLazy):
+    class Config:
+        azure_keyvault_max_workers = 4
+
+
+def test_lazy_fields_resolved_at_once(fake_client):
+    settings = SettingsLazyConcurrent(field2="value2_from_init")
+    assert settings.field1 == "value1_from_azureKV"
+    fake_client.calls.clear()
+    fake_client.threads.clear()
+
+    # the remaining fields are fetched in one pass, in parallel
+    assert settings.dict()["field3"] == 33
+    assert sorted(fake_client.calls) == [
+        "test-prefix-field-required",
+        "test-prefix-field3",
+    ]
+    assert len(fake_client.threads) == 2
+
+
+def test_lazy_fields_resolved_while_read(fake_client):
+    settings = SettingsLazy()
+    values = []
+
+    def read_field(name):
+        values.append(getattr(settings, name))
+
+    threads = [
+        threading.Thread(target=read_field, args=(name,))
+        for name in ("field1", "field3", "field_required")
+    ]
+    for thread in threads:
+        thread.start()
+    resolved = settings.dict()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(map(str, values)) == [
+        "33",
+        "required_from_azureKV",
+        "value1_from_azureKV",
+    ]
+    assert resolved["field3"] == 33
+    # every secret is fetched once
+    assert sorted(fake_client.calls) == sorted(set(fake_client.calls))
+    assert len(fake_client.calls) == 4
+
+
+def test_lazy_fields_repr(fake_client):
+    settings = SettingsLazy(field2="value2_from_init")
+    assert settings.field1 == "value1_from_azureKV"
+    assert repr(settings) == (
+        "SettingsLazy(field1='value1_from_azureKV', field2='value2_from_init', "
+        "field3=<deferred>, field_required=<deferred>)"
+    )
+    assert fake_client.calls == ["test-prefix-field1"]
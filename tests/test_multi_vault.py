@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+
+import time
+from typing import Any
+
+import pydantic
+import pytest
+
+from pydantic_azure_secrets import AzureVaultSettings, SettingsRefresher
+from tests.conftest import FakeAsyncSecretClient, FakeSecretClient, run_async
+
+SERVICE_VAULT = "https://service.vault.azure.net/"
+SHARED_VAULT = "https://shared.vault.azure.net/"
+OTHER_VAULT = "https://other.vault.azure.net/"
+
+
+class SettingsMultiVault(AzureVaultSettings):
+    """
+    Example of settings which look up several azure keyvaults
+    """
+
+    field1: Any = "default_value1"
+    field2: Any = "default_value2"
+    field3: Any = pydantic.Field("default_value3", azure_keyvault=OTHER_VAULT)
+    field4: Any = pydantic.Field("default_value4", azure_keyvault=[])
+
+    class Config:
+        env_prefix = "test_prefix_"
+        azure_keyvault = [SERVICE_VAULT, SHARED_VAULT]
+
+
+class SettingsMultiVaultLazy(SettingsMultiVault):
+    class Config:
+        azure_keyvault_lazy = True
+
+
+@pytest.fixture
+def fake_clients(patch_vault):
+    fake_clients = {
+        SERVICE_VAULT: FakeSecretClient(
+            {"test-prefix-field1": "value1_from_service"},
+            latency=0.1,
+            vault_url=SERVICE_VAULT,
+        ),
+        SHARED_VAULT: FakeSecretClient(
+            {
+                "test-prefix-field1": "value1_from_shared",
+                "test-prefix-field2": "value2_from_shared",
+                "test-prefix-field3": "value3_from_shared",
+            },
+            latency=0.1,
+            vault_url=SHARED_VAULT,
+        ),
+        OTHER_VAULT: FakeSecretClient(
+            {"test-prefix-field3": "value3_from_other"},
+            latency=0.1,
+            vault_url=OTHER_VAULT,
+        ),
+    }
+    return patch_vault(fake_clients, SettingsMultiVault, SettingsMultiVaultLazy)
+
+
+def test_vault_priority_and_routing(fake_clients):
+    started = time.perf_counter()
+    settings = SettingsMultiVault()
+    elapsed = time.perf_counter() - started
+
+    assert settings.dict() == {
+        "field1": "value1_from_service",
+        "field2": "value2_from_shared",
+        "field3": "value3_from_other",
+        "field4": "default_value4",
+    }
+    assert sorted(fake_clients[SERVICE_VAULT].calls) == [
+        "test-prefix-field1",
+        "test-prefix-field2",
+    ]
+    assert fake_clients[OTHER_VAULT].calls == ["test-prefix-field3"]
+    # the vaults are queried concurrently, each one sequentially
+    assert elapsed < 0.35
+    assert settings._azure_secrets[OTHER_VAULT]["test-prefix-field3"] is not None
+
+
+def test_init_vaults_override_config(fake_clients):
+    settings = SettingsMultiVault(_azure_keyvault=[SHARED_VAULT, SERVICE_VAULT])
+    assert settings.field1 == "value1_from_shared"
+    assert settings.field3 == "value3_from_other"
+
+
+def test_lazy_multi_vault(fake_clients):
+    settings = SettingsMultiVaultLazy()
+    assert all(not client.calls for client in fake_clients.values())
+
+    assert settings.field1 == "value1_from_service"
+    assert fake_clients[OTHER_VAULT].calls == []
+    assert settings.field3 == "value3_from_other"
+    assert settings.field4 == "default_value4"
+
+
+def test_aload_multi_vault(patch_vault):
+    fake_clients = {
+        SERVICE_VAULT: FakeAsyncSecretClient({"test-prefix-field1": "value1_service"}),
+        SHARED_VAULT: FakeAsyncSecretClient(
+            {"test-prefix-field1": "value1_shared", "test-prefix-field2": "value2"}
+        ),
+        OTHER_VAULT: FakeAsyncSecretClient({"test-prefix-field3": "value3_other"}),
+    }
+    patch_vault(fake_clients, SettingsMultiVault)
+    settings = run_async(SettingsMultiVault.aload())
+
+    assert (settings.field1, settings.field2, settings.field3) == (
+        "value1_service",
+        "value2",
+        "value3_other",
+    )
+    assert all(client.closed for client in fake_clients.values())
+
+
+def test_refresh_multi_vault(fake_clients):
+    refresher = SettingsRefresher(SettingsMultiVault)
+    assert refresher.refresh() is False
+
+    fake_clients[SHARED_VAULT].rotate("test-prefix-field2", "rotated_value2")
+    fake_clients[SHARED_VAULT].calls.clear()
+    assert refresher.refresh() is True
+    assert refresher.settings.field2 == "rotated_value2"
+    assert refresher.settings.field1 == "value1_from_service"
+    assert fake_clients[SHARED_VAULT].calls == [
+        "list_properties_of_secrets",
+        "test-prefix-field2",
+    ]
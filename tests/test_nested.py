@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+
+import json
+from typing import Dict, List, Optional
+
+import pydantic
+import pytest
+from pydantic.env_settings import SettingsError
+
+from pydantic_azure_secrets import AzureVaultSettings
+from tests.conftest import VAULT_URL, FakeAsyncSecretClient, FakeSecretClient, run_async
+
+
+class Pool(pydantic.BaseModel):
+    size: int = 5
+    timeout: float = 1.0
+
+
+class Database(pydantic.BaseModel):
+    host: str
+    port: int = 5432
+    pool: Pool = Pool()
+    options: Dict[str, str] = {}
+
+
+class SettingsNested(AzureVaultSettings):
+    """
+    Example of settings with nested models looked up in several secrets
+    """
+
+    database: Database
+    hosts: List[str] = []
+    replica: Optional[Database] = None
+
+    class Config:
+        env_prefix = "test_prefix_"
+        azure_keyvault = VAULT_URL
+        azure_keyvault_max_workers = 4
+        azure_keyvault_nested_delimiter = "--"
+
+
+def test_nested_secret_names():
+    assert [
+        (secret.path, secret.names, secret.is_complex)
+        for secret in SettingsNested.__azure_nested_secret_names__["database"]
+    ] == [
+        (("host",), ("test-prefix-database--host",), False),
+        (("port",), ("test-prefix-database--port",), False),
+        (("pool",), ("test-prefix-database--pool",), True),
+        (("pool", "size"), ("test-prefix-database--pool--size",), False),
+        (("pool", "timeout"), ("test-prefix-database--pool--timeout",), False),
+        (("options",), ("test-prefix-database--options",), True),
+    ]
+    # Optional[Database] is a model too, List[str] is not
+    assert "replica" in SettingsNested.__azure_nested_secret_names__
+    assert "hosts" not in SettingsNested.__azure_nested_secret_names__
+
+
+def test_nested_secrets_override_json_secret(patch_vault):
+    fake_client = FakeSecretClient(
+        {
+            "test-prefix-database": json.dumps(
+                {"host": "json-host", "port": 1, "pool": {"size": 10}}
+            ),
+            "test-prefix-database--port": "6432",
+            "test-prefix-database--pool--timeout": "2.5",
+            "test-prefix-database--options": '{"sslmode": "require"}',
+            "test-prefix-hosts": '["a", "b"]',
+            "test-prefix-replica--host": "replica-host",
+        }
+    )
+    patch_vault(fake_client, SettingsNested)
+    settings = SettingsNested()
+
+    assert settings.database == Database(
+        host="json-host",
+        port=6432,
+        pool=Pool(size=10, timeout=2.5),
+        options={"sslmode": "require"},
+    )
+    assert settings.hosts == ["a", "b"]
+    assert settings.replica == Database(host="replica-host")
+    # every secret is requested once, in the same pass
+    assert len(fake_client.calls) == len(set(fake_client.calls)) == 15
+
+
+def test_nested_secrets_aload(patch_vault):
+    patch_vault(
+        FakeAsyncSecretClient({"test-prefix-database--host": "db-host"}),
+        SettingsNested,
+    )
+    settings = run_async(SettingsNested.aload())
+    assert settings.database == Database(host="db-host")
+
+
+def test_invalid_json_secret(patch_vault):
+    patch_vault(
+        FakeSecretClient(
+            {"test-prefix-database--host": "db-host", "test-prefix-hosts": "[a, b"}
+        ),
+        SettingsNested,
+    )
+    with pytest.raises(SettingsError, match="test-prefix-hosts"):
+        SettingsNested()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+
+import json
+import os
+from typing import Any
+from unittest import mock
+
+import pytest
+
+from pydantic_azure_secrets import AzureVaultSettings, shared_clients, single_flight
+from tests.conftest import VAULT_URL, FakeAsyncSecretClient, FakeSecretClient, run_async
+
+
+class SettingsPreloaded(AzureVaultSettings):
+    """
+    Example of settings preloaded before the workers are forked
+    """
+
+    field1: Any = "default_value1"
+    field2: Any = "default_value2"
+
+    class Config:
+        env_prefix = "test_prefix_"
+        azure_keyvault = VAULT_URL
+        azure_keyvault_shared_client = True
+
+
+class SubSettingsPreloaded(SettingsPreloaded):
+    field3: Any = "default_value3"
+
+
+@pytest.fixture
+def fake_client(patch_vault):
+    yield patch_vault(
+        FakeSecretClient({"test-prefix-field1": "value1_from_azureKV"}),
+        SettingsPreloaded,
+    )
+    SettingsPreloaded.discard_preloaded()
+    shared_clients.reset()
+
+
+def test_preload(fake_client):
+    preloaded = SettingsPreloaded.preload()
+    assert preloaded.field1 == "value1_from_azureKV"
+    assert len(fake_client.calls) == 2
+
+    fake_client.calls.clear()
+    assert SettingsPreloaded() == preloaded
+    assert run_async(SettingsPreloaded.aload()) == preloaded
+    assert fake_client.calls == []
+
+    # a subclass is not preloaded
+    assert SubSettingsPreloaded().field1 == "value1_from_azureKV"
+    assert len(fake_client.calls) == 3
+
+    SettingsPreloaded.discard_preloaded()
+    fake_client.calls.clear()
+    SettingsPreloaded()
+    assert len(fake_client.calls) == 2
+
+
+def test_preload_fetches_only_missing_names(fake_client, patch_vault):
+    SettingsPreloaded.preload(field2="value2_from_init")
+    assert fake_client.calls == ["test-prefix-field1", "test-prefix-field2"]
+
+    with mock.patch.object(
+        SettingsPreloaded.__config__, "azure_keyvault_skip_resolved", True
+    ):
+        SettingsPreloaded.preload(field2="value2_from_init")
+        fake_client.calls.clear()
+        settings = SettingsPreloaded()
+    assert settings.field2 == "default_value2"
+    assert fake_client.calls == ["test-prefix-field2"]
+
+    async_client = patch_vault(
+        FakeAsyncSecretClient({"test-prefix-field2": "value2_from_azureKV"}),
+        SettingsPreloaded,
+    )
+    settings = run_async(SettingsPreloaded.aload())
+    assert settings.field2 == "value2_from_azureKV"
+    assert async_client.calls == ["test-prefix-field2"]
+
+
+@pytest.mark.skipif(
+    not hasattr(os, "register_at_fork"), reason="requires os.register_at_fork"
+)
+@mock.patch("pydantic_azure_secrets.azure_vault_settings.DefaultAzureCredential")
+@mock.patch("pydantic_azure_secrets.azure_vault_settings.SecretClient")
+def test_forked_child_uses_preloaded_secrets(secret_client_mock, creds_mock):
+    secret_client_mock.return_value.get_secret.side_effect = lambda name: (
+        FakeSecretClient({"test-prefix-field1": "value1_from_azureKV"}).get_secret(name)
+    )
+    try:
+        SettingsPreloaded.preload()
+        assert len(shared_clients) == 1
+        # an unfinished call of another thread of the parent
+        single_flight._calls["in-flight"] = mock.Mock()
+
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            try:
+                state = {
+                    "shared_clients": len(shared_clients),
+                    "single_flight": len(single_flight),
+                    "field1": SettingsPreloaded().field1,
+                    "get_secret": secret_client_mock.return_value.get_secret.call_count,
+                }
+                os.write(write_fd, json.dumps(state).encode())
+            finally:
+                os._exit(0)
+
+        os.close(write_fd)
+        os.waitpid(pid, 0)
+        with os.fdopen(read_fd) as pipe:
+            state = json.load(pipe)
+    finally:
+        single_flight._calls.pop("in-flight", None)
+        SettingsPreloaded.discard_preloaded()
+        shared_clients.reset()
+
+    assert state == {
+        "shared_clients": 0,
+        "single_flight": 0,
+        "field1": "value1_from_azureKV",
+        "get_secret": 2,
+    }
+    assert len(shared_clients) == 0
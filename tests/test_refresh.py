@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+
+from typing import Any
+
+import pydantic
+import pytest
+
+from pydantic_azure_secrets import (
+    AzureVaultSettings,
+    RefreshStats,
+    SecretCache,
+    SettingsRefresher,
+)
+from tests.conftest import VAULT_URL, FakeSecretClient
+
+
+class SettingsRefreshed(AzureVaultSettings):
+    """
+    Example of settings which are refreshed when the secrets are rotated
+    """
+
+    field1: Any = "default_value1"
+    field2: Any = "default_value2"
+    field3: int = 3
+
+    class Config:
+        env_prefix = "test_prefix_"
+        azure_keyvault = VAULT_URL
+
+
+@pytest.fixture
+def fake_client(patch_vault):
+    return patch_vault(
+        FakeSecretClient(
+            {
+                "test-prefix-field1": "value1_from_azureKV",
+                "test-prefix-field2": "value2",
+            }
+        ),
+        SettingsRefreshed,
+    )
+
+
+def test_refresh_only_changed_secrets(fake_client):
+    refresher = SettingsRefresher(SettingsRefreshed, interval=60)
+    settings = refresher.settings
+    assert settings.field1 == "value1_from_azureKV"
+    assert len(fake_client.calls) == 3
+
+    updates = []
+    unsubscribe = refresher.subscribe(lambda old, new: updates.append((old, new)))
+
+    fake_client.calls.clear()
+    assert not refresher.refresh()
+    assert refresher.settings is settings
+    assert fake_client.calls == ["list_properties_of_secrets"]
+
+    fake_client.calls.clear()
+    fake_client.rotate("test-prefix-field1", "rotated_value1")
+    fake_client.rotate("test-prefix-field3", "33")
+    assert refresher.refresh()
+    assert fake_client.calls == [
+        "list_properties_of_secrets",
+        "test-prefix-field1",
+        "test-prefix-field3",
+    ]
+    assert refresher.settings.field1 == "rotated_value1"
+    assert refresher.settings.field2 == "value2"
+    assert refresher.settings.field3 == 33
+    assert updates == [(settings, refresher.settings)]
+
+    unsubscribe()
+    fake_client.rotate("test-prefix-field2", "rotated_value2")
+    assert refresher.refresh()
+    assert refresher.settings.field2 == "rotated_value2"
+    assert len(updates) == 1
+
+
+def test_refresh_keeps_valid_settings(fake_client):
+    refresher = SettingsRefresher(SettingsRefreshed, field2="value2_from_init")
+    settings = refresher.settings
+    assert settings.field2 == "value2_from_init"
+
+    fake_client.rotate("test-prefix-field3", "not a number")
+    assert not refresher.refresh()
+    assert refresher.settings is settings
+
+
+def test_refresh_in_background(fake_client):
+    with SettingsRefresher(SettingsRefreshed, interval=0.01) as refresher:
+        fake_client.rotate("test-prefix-field1", "rotated_value1")
+        for _ in range(500):
+            if refresher.settings.field1 == "rotated_value1":
+                break
+            refresher._stopped.wait(0.01)
+    assert refresher.settings.field1 == "rotated_value1"
+    assert not refresher._thread.is_alive()
+
+
+def test_refresh_compares_timestamps(fake_client):
+    refresher = SettingsRefresher(SettingsRefreshed)
+    properties = refresher.settings.secret_properties()
+    assert sorted(properties) == ["field1", "field2"]
+    assert properties["field1"].version == "version1"
+
+    assert not refresher.refresh()
+    assert refresher.last_stats == RefreshStats(
+        checked=3, fetched=0, calls_saved=3, bytes_saved=len("value1_from_azureKV") + 6
+    )
+
+    fake_client.calls.clear()
+    fake_client.rotate("test-prefix-field2", "rotated_value2")
+    assert refresher.refresh()
+    assert fake_client.calls == ["list_properties_of_secrets", "test-prefix-field2"]
+    assert refresher.settings.field2 == "rotated_value2"
+    assert refresher.last_stats == RefreshStats(
+        checked=3, fetched=1, calls_saved=2, bytes_saved=len("value1_from_azureKV")
+    )
+    assert refresher.total_stats.calls_saved == 5
+    assert refresher.settings.secret_properties()["field2"].version == "version2"
+
+
+class SettingsRefreshedCached(AzureVaultSettings):
+    """
+    Example of case-sensitive settings which cache the secrets
+    """
+
+    token: str = pydantic.Field("default_token", env="APP_TOKEN")
+
+    class Config:
+        case_sensitive = True
+        azure_keyvault = VAULT_URL
+        azure_keyvault_cache = SecretCache()
+
+
+def test_refresh_invalidates_cache(patch_vault):
+    fake_client = patch_vault(
+        FakeSecretClient({"APP-TOKEN": "old"}), SettingsRefreshedCached
+    )
+    refresher = SettingsRefresher(SettingsRefreshedCached)
+    assert refresher.settings.token == "old"
+
+    fake_client.rotate("APP-TOKEN", "new")
+    assert refresher.refresh()
+    assert refresher.settings.token == "new"
+    assert not refresher.refresh()
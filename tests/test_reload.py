@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+
+from typing import Any
+
+import pydantic
+import pytest
+
+from pydantic_azure_secrets import AzureVaultSettings, SecretCache
+from tests.conftest import VAULT_URL, FakeSecretClient
+
+
+class SettingsReload(AzureVaultSettings):
+    """
+    Example of settings which are reloaded on a secret rotation
+    """
+
+    field1: Any = "default_value1"
+    field2: Any = "default_value2"
+    field3: Any = pydantic.Field("default_value3", env=["test_prefix_field3", "old"])
+    field4: int = 4
+
+    @pydantic.root_validator
+    def check_fields(cls, values):
+        assert values["field1"] != "invalid", "field1 is invalid"
+        return values
+
+    class Config:
+        env_prefix = "test_prefix_"
+        azure_keyvault = VAULT_URL
+        azure_keyvault_cache = SecretCache()
+
+
+class SettingsReloadLazy(SettingsReload):
+    class Config:
+        azure_keyvault_lazy = True
+
+
+@pytest.fixture
+def fake_client(patch_vault):
+    yield patch_vault(
+        FakeSecretClient(
+            {
+                "test-prefix-field1": "value1_from_azureKV",
+                "test-prefix-field2": "value2_from_azureKV",
+                "old": "value3_from_azureKV",
+            }
+        ),
+        SettingsReload,
+        SettingsReloadLazy,
+    )
+    SettingsReload.__config__.azure_keyvault_cache.clear()
+
+
+def test_reload_changed_secret_names(fake_client):
+    settings = SettingsReload(field4="44")
+    fake_client.rotate("test-prefix-field1", "value1_rotated")
+    fake_client.rotate("OLD", "value3_rotated")
+    fake_client.calls.clear()
+
+    reloaded = settings.reload(changed_secret_names=["Test-Prefix-Field1"])
+    assert fake_client.calls == ["test-prefix-field1"]
+    assert reloaded.field1 == "value1_rotated"
+    # the other values are shared
+    assert reloaded.field2 is settings.field2
+    assert reloaded.field3 == "value3_from_azureKV"
+    assert reloaded.field4 == 44
+    assert reloaded.__fields_set__ == settings.__fields_set__
+    assert settings.field1 == "value1_from_azureKV"
+
+    fake_client.calls.clear()
+    reloaded = reloaded.reload(fields=["field3"])
+    assert sorted(fake_client.calls) == ["old", "test-prefix-field3"]
+    assert reloaded.field3 == "value3_rotated"
+
+    # a secret of no field
+    assert reloaded.reload(changed_secret_names=["unknown"]) == reloaded
+    with pytest.raises(ValueError):
+        reloaded.reload(fields=["unknown"])
+
+
+def test_reload_all_sources(fake_client, monkeypatch):
+    settings = SettingsReload()
+    monkeypatch.setenv("test_prefix_field1", "value1_from_env")
+    fake_client.calls.clear()
+
+    reloaded = settings.reload(fields=["field1", "field4"])
+    assert reloaded.field1 == "value1_from_env"
+    assert reloaded.field4 == 4
+    assert sorted(fake_client.calls) == ["test-prefix-field1", "test-prefix-field4"]
+
+    monkeypatch.setenv("test_prefix_field1", "invalid")
+    with pytest.raises(pydantic.ValidationError, match="field1 is invalid"):
+        settings.reload(fields=["field1"])
+
+    fake_client.secrets["test-prefix-field4"] = "not an int"
+    with pytest.raises(pydantic.ValidationError):
+        settings.reload(changed_secret_names=["test-prefix-field4"])
+
+
+def test_reload_lazy(fake_client):
+    settings = SettingsReloadLazy()
+    assert settings.field2 == "value2_from_azureKV"
+    fake_client.rotate("test-prefix-field1", "value1_rotated")
+    fake_client.calls.clear()
+
+    reloaded = settings.reload(changed_secret_names=["test-prefix-field1"])
+    assert fake_client.calls == ["test-prefix-field1"]
+    assert reloaded.field2 is settings.field2
+    # still deferred
+    assert reloaded.field3 == "value3_from_azureKV"
+    assert reloaded.dict() == {
+        "field1": "value1_rotated",
+        "field2": "value2_from_azureKV",
+        "field3": "value3_from_azureKV",
+        "field4": 4,
+    }
+
+
+class SettingsReloadPreValidated(SettingsReload):
+    class Config:
+        extra = pydantic.Extra.allow
+
+    @pydantic.root_validator(pre=True)
+    def upper_field1(cls, values):
+        if "field1" in values:
+            values["field1"] = values["field1"].upper()
+        return values
+
+
+def test_reload_pre_root_validators(fake_client, patch_vault):
+    patch_vault(fake_client, SettingsReloadPreValidated)
+    settings = SettingsReloadPreValidated(extra_value="kept")
+    assert settings.field1 == "VALUE1_FROM_AZUREKV"
+    fake_client.rotate("test-prefix-field1", "z")
+
+    reloaded = settings.reload(fields=["field1"])
+    assert reloaded.field1 == "Z"
+    assert reloaded.extra_value == "kept"
+    assert reloaded.dict() == {**settings.dict(), "field1": "Z"}
+
+
+class SettingsReloadFieldValidated(SettingsReload):
+    @pydantic.validator("field2")
+    def check_field2(cls, value, values):
+        # like in the constructor, only the previous fields are validated
+        assert sorted(values) == ["field1"]
+        return value
+
+
+def test_reload_field_validators(fake_client, patch_vault):
+    patch_vault(fake_client, SettingsReloadFieldValidated)
+    settings = SettingsReloadFieldValidated()
+    fake_client.rotate("test-prefix-field2", "value2_rotated")
+
+    reloaded = settings.reload(fields=["field2"])
+    assert reloaded.field2 == "value2_rotated"
+    assert reloaded.dict() == {**settings.dict(), "field2": "value2_rotated"}
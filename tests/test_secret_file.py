@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+
+import gc
+import os
+import stat
+from typing import Optional
+
+import pytest
+
+from pydantic_azure_secrets import (
+    AzureVaultSettings,
+    InMemoryBackend,
+    RefreshStats,
+    SecretCache,
+    SecretFile,
+    SettingsRefresher,
+)
+from tests.conftest import VAULT_URL
+
+BUNDLE = "-----BEGIN CERTIFICATE-----\nü\n-----END CERTIFICATE-----\n" * 1000
+
+
+class SettingsSecretFile(AzureVaultSettings):
+    """
+    Example of settings with a large secret kept in a file
+    """
+
+    bundle: SecretFile
+    optional_bundle: Optional[SecretFile] = None
+    field1: str = "default_value1"
+
+    class Config:
+        env_prefix = "test_prefix_"
+        azure_keyvault = VAULT_URL
+        azure_keyvault_cache = SecretCache()
+
+
+class SettingsSharedCache(AzureVaultSettings):
+    """
+    Example of settings which declare the same large secret as a string,
+    and share the cache of `SettingsSecretFile`
+    """
+
+    bundle: str
+
+    class Config:
+        env_prefix = "test_prefix_"
+        azure_keyvault = VAULT_URL
+        azure_keyvault_cache = SettingsSecretFile.__config__.azure_keyvault_cache
+
+
+@pytest.fixture
+def backend(patch_vault, monkeypatch, tmp_path):
+    config = SettingsSecretFile.__config__
+    monkeypatch.setattr(config, "azure_keyvault_secret_files_dir", str(tmp_path))
+    yield patch_vault(
+        InMemoryBackend(
+            VAULT_URL,
+            {"test-prefix-bundle": BUNDLE, "test-prefix-field1": "value1_from_azureKV"},
+        ),
+        SettingsSecretFile,
+        SettingsSharedCache,
+    )
+    config.azure_keyvault_cache.clear()
+
+
+def test_secret_file(backend, tmp_path):
+    settings = SettingsSecretFile()
+    assert settings.optional_bundle is None
+    assert settings.field1 == "value1_from_azureKV"
+    bundle = settings.bundle
+    assert bundle.path.parent == tmp_path
+    assert bundle.read_text() == BUNDLE
+    assert bundle.size == len(BUNDLE.encode())
+    assert stat.S_IMODE(os.stat(bundle.path).st_mode) == 0o600
+    assert "BEGIN" not in repr(settings)
+
+    # only the handle is kept, by the settings and by the cache
+    vault_secrets = settings._azure_secrets[VAULT_URL]
+    assert vault_secrets["test-prefix-bundle"].value is bundle
+    cached = SettingsSecretFile.__config__.azure_keyvault_cache.get(
+        VAULT_URL, "test-prefix-bundle"
+    )
+    assert cached.secret.value is bundle
+
+    # the same version is written once
+    SettingsSecretFile.__config__.azure_keyvault_cache.clear()
+    assert SettingsSecretFile().bundle is bundle
+    assert len(os.listdir(tmp_path)) == 1
+
+    path = bundle.path
+    del settings, vault_secrets, cached, bundle
+    SettingsSecretFile.__config__.azure_keyvault_cache.clear()
+    gc.collect()
+    assert not path.exists()
+
+
+def test_secret_file_rotation(backend, tmp_path):
+    refresher = SettingsRefresher(SettingsSecretFile)
+    old_path = refresher.settings.bundle.path
+    backend.set("test-prefix-bundle", "rotated bundle")
+    assert refresher.refresh()
+    assert refresher.settings.bundle.read_text() == "rotated bundle"
+    gc.collect()
+    assert not old_path.exists()
+    assert os.listdir(tmp_path) == [refresher.settings.bundle.path.name]
+    # the backend can't list the properties, all the values are fetched again
+    assert not refresher.refresh()
+    assert refresher.last_stats == RefreshStats(checked=3, fetched=3)
+    assert refresher.settings.bundle.read_text() == "rotated bundle"
+
+
+def test_secret_file_from_other_sources(backend, tmp_path, monkeypatch):
+    path = tmp_path / "bundle.pem"
+    path.write_text(BUNDLE)
+    monkeypatch.setenv("test_prefix_bundle", str(path))
+    settings = SettingsSecretFile()
+    assert settings.bundle == SecretFile(path)
+    assert settings.bundle.read_bytes() == BUNDLE.encode()
+
+    del settings
+    gc.collect()
+    # not deleted, it is not a file of the key vault secret
+    assert path.exists()
+
+    monkeypatch.setenv("test_prefix_bundle", str(tmp_path / "missing.pem"))
+    with pytest.raises(ValueError, match="does not exist"):
+        SettingsSecretFile()
+
+
+def test_secret_file_shared_cache(backend):
+    cache = SettingsSecretFile.__config__.azure_keyvault_cache
+    bundle = SettingsSecretFile().bundle
+    assert SettingsSharedCache().bundle == BUNDLE
+    assert cache.hits == 1
+
+    cache.clear()
+    assert SettingsSharedCache().bundle == BUNDLE
+    assert SettingsSecretFile().bundle is bundle
+    assert cache.hits == 1
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+
+from typing import Any
+
+import pydantic
+import pytest
+
+from pydantic_azure_secrets import AzureVaultSettings
+from tests.conftest import VAULT_URL, FakeSecretClient
+
+
+class SettingsSecretNames(AzureVaultSettings):
+    """
+    Example of settings with several, duplicated and invalid secret names
+    """
+
+    field1: Any = pydantic.Field(
+        "default_value1",
+        env=["first_name", "first-name", "FIRST_NAME", "v1.name", "last"],
+    )
+    field2: Any = pydantic.Field(
+        "default_value2", azure_keyvault_names=["custom-name", "bad_name", "other"]
+    )
+    field3: Any = "default_value3"
+
+    class Config:
+        env_prefix = "test_prefix_"
+        azure_keyvault = VAULT_URL
+
+
+class SubSettingsSecretNames(SettingsSecretNames):
+    class Config:
+        env_prefix = "sub_"
+
+
+def test_secret_names_index():
+    assert dict(SettingsSecretNames.__azure_secret_names__) == {
+        "field1": ("last", "first-name"),
+        "field2": ("custom-name", "other"),
+        "field3": ("test-prefix-field3",),
+    }
+    assert SubSettingsSecretNames.__azure_secret_names__["field3"] == ("sub-field3",)
+    with pytest.raises(TypeError):
+        SettingsSecretNames.__azure_secret_names__["field3"] = ("other",)
+
+
+def test_secret_names_are_fetched_once_in_priority_order(patch_vault):
+    fake_client = patch_vault(
+        FakeSecretClient(
+            {
+                "first-name": "value1_first",
+                "last": "value1_last",
+                "other": "value2_other",
+            }
+        ),
+        SettingsSecretNames,
+    )
+    settings = SettingsSecretNames()
+
+    assert settings.field1 == "value1_last"
+    assert settings.field2 == "value2_other"
+    assert sorted(fake_client.calls) == [
+        "custom-name",
+        "first-name",
+        "last",
+        "other",
+        "test-prefix-field3",
+    ]
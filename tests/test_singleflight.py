@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+
+import asyncio
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+from pydantic_azure_secrets import AzureVaultSettings, SingleFlight, single_flight
+from tests.conftest import VAULT_URL, FakeAsyncSecretClient, FakeSecretClient, run_async
+
+THREADS = 32
+
+
+class SettingsSingleFlight(AzureVaultSettings):
+    """
+    Example of settings which share the concurrent key vault requests
+    """
+
+    field1: Any = "default_value1"
+    field2: Any = "default_value2"
+    field3: Any = "default_value3"
+
+    class Config:
+        env_prefix = "test_prefix_"
+        azure_keyvault = VAULT_URL
+        azure_keyvault_max_workers = 3
+        azure_keyvault_single_flight = True
+
+
+def test_concurrent_construction_calls_upstream_once(patch_vault):
+    fake_client = patch_vault(
+        FakeSecretClient({"test-prefix-field1": "value1_from_azureKV"}, latency=0.2),
+        SettingsSingleFlight,
+    )
+    barrier = threading.Barrier(THREADS)
+
+    def construct(_):
+        barrier.wait()
+        return SettingsSingleFlight()
+
+    with ThreadPoolExecutor(max_workers=THREADS) as executor:
+        results = list(executor.map(construct, range(THREADS)))
+
+    assert all(settings.field1 == "value1_from_azureKV" for settings in results)
+    assert all(settings.field2 == "default_value2" for settings in results)
+    assert Counter(fake_client.calls) == {
+        "test-prefix-field1": 1,
+        "test-prefix-field2": 1,
+        "test-prefix-field3": 1,
+    }
+    assert len(single_flight) == 0
+
+
+def test_errors_are_shared():
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def failing():
+        calls.append(1)
+        started.set()
+        release.wait()
+        raise RuntimeError("vault is down")
+
+    def call(_):
+        return flight.do("key", failing)
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        leader = executor.submit(call, 0)
+        started.wait()
+        waiters = [executor.submit(call, i) for i in range(3)]
+        while flight.shared < 3:
+            time.sleep(0.001)
+        release.set()
+        errors = [future.exception() for future in [leader] + waiters]
+
+    assert len(calls) == 1
+    assert all(isinstance(error, RuntimeError) for error in errors)
+    # the next call runs again
+    assert flight.do("key", lambda: "value") == "value"
+
+
+def test_async_calls_are_shared():
+    flight = SingleFlight()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "value"
+
+    async def main():
+        return await asyncio.gather(*(flight.ado("key", fetch) for _ in range(10)))
+
+    assert run_async(main()) == ["value"] * 10
+    assert len(calls) == 1
+    assert len(flight) == 0
+
+
+def test_aload_shares_requests(patch_vault):
+    fake_client = patch_vault(
+        FakeAsyncSecretClient(
+            {"test-prefix-field1": "value1_from_azureKV"}, latency=0.05
+        ),
+        SettingsSingleFlight,
+    )
+
+    async def main():
+        return await asyncio.gather(*(SettingsSingleFlight.aload() for _ in range(10)))
+
+    results = run_async(main())
+
+    assert {settings.field1 for settings in results} == {"value1_from_azureKV"}
+    assert len(fake_client.calls) == 3
+
+
+def test_sequential_calls_are_not_shared():
+    flight = SingleFlight()
+    calls = []
+    for _ in range(3):
+        flight.do("key", lambda: calls.append(1))
+    assert len(calls) == 3
+    assert flight.shared == 0
+
+
+def test_cancelled_caller_does_not_cancel_shared_call():
+    flight = SingleFlight()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "value"
+
+    async def main():
+        leader = asyncio.ensure_future(flight.ado("key", fetch))
+        await asyncio.sleep(0)
+        waiters = [asyncio.ensure_future(flight.ado("key", fetch)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        return await asyncio.gather(leader, *waiters, return_exceptions=True)
+
+    results = run_async(main())
+    assert isinstance(results[0], asyncio.CancelledError)
+    assert results[1:] == ["value"] * 3
+    assert len(calls) == 1
+    assert len(flight) == 0
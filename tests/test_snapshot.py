@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+
+import stat
+from typing import Any
+
+import pytest
+from azure.core.exceptions import ServiceRequestError
+
+from pydantic_azure_secrets import (
+    AzureVaultSettings,
+    RefreshStats,
+    SecretSnapshot,
+    SettingsRefresher,
+)
+from tests.conftest import VAULT_URL, FakeAsyncSecretClient, FakeSecretClient, run_async
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def settings_with_snapshot(snapshot):
+    class SettingsSnapshot(AzureVaultSettings):
+        """
+        Example of settings with an encrypted snapshot of azure keyvault
+        """
+
+        field1: Any = "default_value1"
+        field2: Any = "default_value2"
+
+        class Config:
+            env_prefix = "test_prefix_"
+            azure_keyvault = VAULT_URL
+            azure_keyvault_snapshot = snapshot
+
+    return SettingsSnapshot
+
+
+@pytest.fixture
+def fake_client():
+    return FakeSecretClient({"test-prefix-field1": "value1_from_azureKV"})
+
+
+def test_snapshot_warm_start(tmp_path, fake_client, patch_vault):
+    clock = FakeClock()
+    path = tmp_path / "snapshots" / "secrets.bin"
+    snapshot = SecretSnapshot(
+        path, SecretSnapshot.generate_key(), refresh_after=30, clock=clock
+    )
+    settings_cls = settings_with_snapshot(snapshot)
+    patch_vault(fake_client, settings_cls)
+
+    settings = settings_cls()
+    assert settings.field1 == "value1_from_azureKV"
+    assert settings.field2 == "default_value2"
+    assert len(fake_client.calls) == 2
+    assert stat.S_IMODE(path.stat().st_mode) == 0o600
+    assert b"value1_from_azureKV" not in path.read_bytes()
+    assert [p.name for p in path.parent.iterdir()] == ["secrets.bin"]
+
+    # the snapshot is used as is while it is recent
+    fake_client.secrets["test-prefix-field1"] = "rotated_value1"
+    for _ in range(5):
+        clock.now += 5
+        assert settings_cls().field1 == "value1_from_azureKV"
+    snapshot.wait_for_refresh(timeout=5)
+    assert len(fake_client.calls) == 2
+
+    # then it is used and refreshed in background, once
+    clock.now += 30
+    assert settings_cls().field1 == "value1_from_azureKV"
+    snapshot.wait_for_refresh(timeout=5)
+    for _ in range(5):
+        assert settings_cls().field1 == "rotated_value1"
+    assert len(fake_client.calls) == 4
+
+
+def test_snapshot_fallback(tmp_path, fake_client, patch_vault):
+    clock = FakeClock()
+    key = SecretSnapshot.generate_key()
+    snapshot = SecretSnapshot(
+        tmp_path / "secrets.bin", key, max_age=None, max_staleness=3600, clock=clock
+    )
+    settings_cls = settings_with_snapshot(snapshot)
+    patch_vault(fake_client, settings_cls)
+    settings_cls()
+
+    fake_client.error = ServiceRequestError("vault is unreachable")
+    clock.now += 3000
+    settings = settings_cls()
+    assert settings.field1 == "value1_from_azureKV"
+    assert settings.field2 == "default_value2"
+
+    clock.now += 1000
+    with pytest.raises(ServiceRequestError):
+        settings_cls()
+
+    # a snapshot encrypted with another key is ignored
+    other_snapshot = SecretSnapshot(
+        tmp_path / "secrets.bin", SecretSnapshot.generate_key()
+    )
+    assert other_snapshot.load(VAULT_URL, ["test-prefix-field1"]) == (0.0, None)
+
+
+def test_snapshot_aload(tmp_path, patch_vault):
+    clock = FakeClock()
+    snapshot = SecretSnapshot(
+        tmp_path / "secrets.bin",
+        SecretSnapshot.generate_key(),
+        refresh_after=30,
+        clock=clock,
+    )
+    settings_cls = settings_with_snapshot(snapshot)
+    fake_client = patch_vault(
+        FakeAsyncSecretClient({"test-prefix-field1": "value1_from_azureKV"}),
+        settings_cls,
+    )
+    assert run_async(settings_cls.aload()).field1 == "value1_from_azureKV"
+    assert len(fake_client.calls) == 2
+
+    # warm start
+    fake_client.secrets["test-prefix-field1"] = "rotated_value1"
+    clock.now += 10
+    assert run_async(settings_cls.aload()).field1 == "value1_from_azureKV"
+    assert len(fake_client.calls) == 2
+
+    # refreshed before aload() returns
+    clock.now += 30
+    assert run_async(settings_cls.aload()).field1 == "rotated_value1"
+    assert len(fake_client.calls) == 4
+
+    # fallback
+    fake_client.error = ServiceRequestError("vault is unreachable")
+    clock.now += 3600
+    assert run_async(settings_cls.aload()).field1 == "rotated_value1"
+    clock.now += 86400
+    with pytest.raises(ServiceRequestError):
+        run_async(settings_cls.aload())
+
+
+def test_refresh_after_snapshot_load(tmp_path, fake_client, patch_vault):
+    snapshot = SecretSnapshot(tmp_path / "secrets.bin", SecretSnapshot.generate_key())
+    settings_cls = settings_with_snapshot(snapshot)
+    patch_vault(fake_client, settings_cls)
+    settings_cls()
+
+    # the secrets of the snapshot keep their timestamps
+    fake_client.calls.clear()
+    refresher = SettingsRefresher(settings_cls)
+    assert fake_client.calls == []
+    assert not refresher.refresh()
+    assert fake_client.calls == ["list_properties_of_secrets"]
+    assert refresher.last_stats == RefreshStats(
+        checked=2, fetched=0, calls_saved=2, bytes_saved=len("value1_from_azureKV")
+    )
+
+    fake_client.rotate("test-prefix-field1", "rotated_value1")
+    assert refresher.refresh()
+    assert refresher.settings.field1 == "rotated_value1"
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+
+from typing import Any
+from unittest import mock
+
+import pytest
+from azure.core.exceptions import HttpResponseError
+
+from pydantic_azure_secrets import (
+    AzureVaultSettings,
+    DeadlineExceeded,
+    VaultScheduler,
+)
+from tests.conftest import VAULT_URL, FakeAsyncSecretClient, FakeSecretClient, run_async
+
+
+class FakeClock:
+    """
+    Clock which is advanced by the fake sleep
+    """
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class ThrottledResponse:
+    status_code = 429
+    reason = "Too Many Requests"
+    request = None
+
+    def __init__(self, retry_after):
+        self.headers = {} if retry_after is None else {"Retry-After": str(retry_after)}
+
+    def text(self):
+        return ""
+
+
+def throttled(retry_after=None):
+    return HttpResponseError(response=ThrottledResponse(retry_after))
+
+
+class ThrottlingSecretClient(FakeSecretClient):
+    """
+    Fake SecretClient which answers 429 to the first `throttled` requests
+    """
+
+    def __init__(self, secrets, throttled=0, retry_after=2):
+        super().__init__(secrets)
+        self.throttled = throttled
+        self.retry_after = retry_after
+        self.options = []
+
+    def get_secret(self, name, **kwargs):
+        self.options.append(kwargs)
+        with self._lock:
+            throttle = self.throttled > 0
+            self.throttled -= 1
+        if throttle:
+            raise throttled(self.retry_after)
+        return super().get_secret(name, **kwargs)
+
+
+class SettingsThrottled(AzureVaultSettings):
+    """
+    Example of settings which retry the throttled key vault requests
+    """
+
+    field1: Any = "default_value1"
+    field2: Any = "default_value2"
+
+    class Config:
+        env_prefix = "test_prefix_"
+        azure_keyvault = VAULT_URL
+        azure_keyvault_scheduler = VaultScheduler(rate=1000, backoff=0.01)
+
+
+def test_token_bucket_rate_limit():
+    clock = FakeClock()
+    scheduler = VaultScheduler(rate=10, burst=2, clock=clock, sleep=clock.sleep)
+    for _ in range(5):
+        scheduler.call(VAULT_URL, lambda: None)
+
+    # 2 requests of the burst, then one every 0.1s
+    assert clock.sleeps == pytest.approx([0, 0, 0.1, 0.1, 0.1])
+
+
+def test_retry_after_blocks_the_vault():
+    clock = FakeClock()
+    scheduler = VaultScheduler(rate=100, backoff=0.5, clock=clock, sleep=clock.sleep)
+    responses = [throttled(retry_after=3), throttled(retry_after=None), "value"]
+
+    def request():
+        response = responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    retries = []
+    assert scheduler.call(VAULT_URL, request, on_retry=lambda: retries.append(1)) == (
+        "value"
+    )
+    assert len(retries) == scheduler.throttled == 2
+    # Retry-After plus a jitter, then the exponential backoff plus a jitter
+    assert 3 <= clock.sleeps[1] <= 3.5
+    assert 1 <= clock.sleeps[2] <= 1.5
+    assert scheduler._bucket(VAULT_URL).rate < 100
+
+
+def test_give_up_after_max_retries_and_deadline():
+    clock = FakeClock()
+    scheduler = VaultScheduler(
+        max_retries=2, deadline=10, clock=clock, sleep=clock.sleep
+    )
+
+    def request():
+        raise throttled(retry_after=1)
+
+    with pytest.raises(HttpResponseError):
+        scheduler.call(VAULT_URL, request)
+    assert scheduler.throttled == 2
+
+    clock.now = 100
+    deadline = scheduler.start()
+
+    def long_throttled_request():
+        raise throttled(retry_after=60)
+
+    with pytest.raises(DeadlineExceeded):
+        scheduler.call(VAULT_URL, long_throttled_request, deadline=deadline)
+    assert clock.now < deadline
+
+
+def test_not_throttled_errors_are_not_retried():
+    scheduler = VaultScheduler()
+    error = HttpResponseError("Forbidden")
+    error.status_code = 403
+
+    def request():
+        raise error
+
+    with pytest.raises(HttpResponseError):
+        scheduler.call(VAULT_URL, request)
+    assert scheduler.throttled == 0
+
+
+def test_settings_retry_throttled_requests(patch_vault):
+    client = patch_vault(
+        ThrottlingSecretClient(
+            {"test-prefix-field1": "value1_from_azureKV"}, throttled=3, retry_after=0
+        ),
+        SettingsThrottled,
+    )
+    settings = SettingsThrottled()
+
+    assert settings.field1 == "value1_from_azureKV"
+    assert settings.field2 == "default_value2"
+    assert len(client.options) == 5
+    # the SDK does not retry the throttled requests on its own
+    assert all(options == {"retry_status": 0} for options in client.options)
+
+
+def test_settings_retry_throttled_requests_concurrently(patch_vault):
+    client = patch_vault(
+        ThrottlingSecretClient(
+            {"test-prefix-field1": "value1_from_azureKV"}, throttled=4, retry_after=0
+        ),
+        SettingsThrottled,
+    )
+    with mock.patch.object(
+        SettingsThrottled.__config__, "azure_keyvault_max_workers", 2
+    ):
+        settings = SettingsThrottled()
+    assert settings.field1 == "value1_from_azureKV"
+    assert len(client.options) == 6
+
+
+def test_aload_retries_throttled_requests(patch_vault):
+    client = FakeAsyncSecretClient({"test-prefix-field1": "value1_from_azureKV"})
+    errors = [throttled(retry_after=0)]
+    get_secret = client.get_secret
+
+    async def throttling_get_secret(name, **kwargs):
+        if errors:
+            raise errors.pop()
+        return await get_secret(name, **kwargs)
+
+    client.get_secret = throttling_get_secret
+    patch_vault(client, SettingsThrottled)
+    settings = run_async(SettingsThrottled.aload())
+    assert settings.field1 == "value1_from_azureKV"